@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Fallback extractor benchmark
+
+Compares the price-anchored container search with the previous fallback,
+which called get_text() on every div, on search pages whose product cards
+match none of the container selectors. Reports time and containers found
+for growing page sizes; the old scan grows with nesting depth times page
+size and returns every ancestor of each product as a container.
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from bs4 import BeautifulSoup
+from scrappers.price_anchors import price_anchored_containers
+
+def old_fallback(soup):
+    return [div for div in soup.find_all('div')
+            if 'Rs.' in div.get_text() and len(div.get_text()) > 10]
+
+def page(products, depth=8):
+    cards = []
+    for i in range(products):
+        card = (f'<div class="img"><a href="/products/item-i{i}.html"><img src="/{i}.jpg"></a></div>'
+                f'<div class="info"><a href="/products/item-i{i}.html">Gadget {i} with a long title</a></div>'
+                f'<div class="cost"><span>Rs. {1000 + i:,}</span><del>Rs. {1500 + i:,}</del></div>')
+        # Layout wrappers, as rendered by component frameworks
+        cards.append('<div class="w">' * depth + card + '</div>' * depth)
+    grid = '<div class="grid">' + ''.join(cards) + '</div>'
+    return f'<html><body><div class="app"><div class="main">{grid}</div></div></body></html>'
+
+def timed(function, soup, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function(soup)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(result)
+
+def main():
+    print(f"{'products':>8} {'old ms':>10} {'old found':>10} {'new ms':>10} {'new found':>10} {'speedup':>8}")
+    for products in (40, 160, 640):
+        soup = BeautifulSoup(page(products), 'html.parser')
+        old_time, old_found = timed(old_fallback, soup)
+        new_time, new_found = timed(price_anchored_containers, soup)
+        print(f"{products:>8} {old_time * 1000:>10.1f} {old_found:>10} {new_time * 1000:>10.1f} "
+              f"{new_found:>10} {old_time / new_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
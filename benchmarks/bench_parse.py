@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Parse throughput benchmark
+
+Parses search result pages in the calling thread and through ParsePool with
+an increasing number of worker processes, and reports pages per second.
+Pass a directory of recorded pages (*.html, e.g. saved from a browser) to
+benchmark real markup; without one, Daraz-shaped pages are generated.
+"""
+
+import glob
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from scrappers.daraz_scraper import DarazScraper
+from scrappers.parse_pool import ParsePool
+
+def synthetic_page(products=40, seed=0):
+    rng = random.Random(seed)
+    cards = []
+    for i in range(products):
+        price = rng.randint(500, 300000)
+        cards.append(
+            f'<div data-qa-locator="product-item"><div class="inner">'
+            f'<div class="img"><img src="//img.example.com/{seed}/{i}.jpg"></div>'
+            f'<div class="title"><a href="//www.daraz.com.np/products/item-{seed}-{i}.html">'
+            f'Product {seed}-{i} smartphone 8GB RAM 128GB storage</a></div>'
+            f'<div class="price"><span class="currency">Rs. {price:,}</span></div>'
+            f'<div class="rating">' + '<i class="star"></i>' * 5 + '</div></div></div>'
+        )
+    filler = '<div class="nav"><ul>' + '<li><a href="/c/x">Category</a></li>' * 1500 + '</ul></div>'
+    return f'<html><head><title>Search</title></head><body>{filler}{"".join(cards)}{filler}</body></html>'
+
+def load_pages(directory=None, count=48):
+    if directory:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return pages
+    return [synthetic_page(seed=i).encode('utf-8') for i in range(count)]
+
+def bench_inline(pages):
+    parser = DarazScraper()
+    start = time.perf_counter()
+    products = sum(len(parser.parse_search_results(html)) for html in pages)
+    return time.perf_counter() - start, products
+
+def bench_pool(pages, workers):
+    pool = ParsePool([DarazScraper], workers=workers)
+    try:
+        # Start the workers (and their warm-up) before timing
+        pool.parse_many(DarazScraper, pages[:workers])
+        start = time.perf_counter()
+        products = sum(len(result) for result in pool.parse_many(DarazScraper, pages))
+        return time.perf_counter() - start, products
+    finally:
+        pool.close()
+
+def main():
+    pages = load_pages(sys.argv[1] if len(sys.argv) > 1 else None)
+    if not pages:
+        print("No pages to parse.")
+        return
+    size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size_kb:.0f} KB average, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<20} {'seconds':>10} {'pages/s':>10} {'products':>10}")
+
+    # Parsing prints per-page progress; keep the report readable
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            results = [('inline', *bench_inline(pages))]
+            for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+                results.append((f"pool x{workers}", *bench_pool(pages, workers)))
+        finally:
+            sys.stdout = stdout
+
+    for mode, seconds, products in results:
+        print(f"{mode:<20} {seconds:>10.2f} {len(pages) / seconds:>10.1f} {products:>10}")
+
+if __name__ == "__main__":
+    main()
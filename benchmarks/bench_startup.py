@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the CLI
+
+Runs non-scraping commands in fresh interpreters and reports the median wall
+time of each against the 200 ms target.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MS = 200
+
+COMMANDS = [
+    ['run.py', '--help'],
+    ['run.py', 'search', '--help'],
+    ['run.py', 'watch', 'list'],
+]
+
+def time_command(args, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    # Warm the OS file cache and create the database once
+    time_command(COMMANDS[-1], 1)
+    
+    print(f"{'command':<30} {'median':>10} {'min':>10}")
+    for args in COMMANDS:
+        timings = time_command(args, runs)
+        median = statistics.median(timings)
+        status = 'ok' if median <= TARGET_MS else 'SLOW'
+        print(f"{' '.join(args):<30} {median:>8.1f}ms {min(timings):>8.1f}ms  {status}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Autocomplete latency benchmark
+
+Builds a SuggestionIndex over generated listing names and past queries and
+times suggest() for prefixes of increasing length, including one- and
+two-letter prefixes that match a large part of the index. Reports build
+time and p50/p99 latency per prefix length.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from loadtest.marketplace import make_catalog
+from utils.autocomplete import SuggestionIndex
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+def main(listings=50000, queries=2000, lookups=2000):
+    catalog = make_catalog(listings)
+    rng = random.Random(0)
+    now = datetime.utcnow()
+
+    start = time.perf_counter()
+    index = SuggestionIndex()
+    for product in catalog:
+        index.add_listing(product['name'], rng.randint(1, 50))
+    for product in rng.sample(catalog, queries):
+        words = product['name'].lower().split()
+        index.add_query(' '.join(words[:rng.randint(1, 3)]), rng.randint(1, 20),
+                        now - timedelta(minutes=rng.randint(0, 600)))
+    index.suggest('warm up')
+    print(f"Built index of {len(index)} entries in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    names = [product['name'] for product in catalog]
+    print(f"{'prefix len':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for length in (1, 2, 3, 5, 8, 15):
+        timings = []
+        for _ in range(lookups):
+            # A prefix starting at any word of a known name
+            words = rng.choice(names).split()
+            prefix = ' '.join(words[rng.randrange(len(words)):])[:length]
+            started = time.perf_counter()
+            index.suggest(prefix)
+            timings.append(time.perf_counter() - started)
+        print(f"{length:>10} {percentile(timings, 50) * 1000:>8.3f} {percentile(timings, 99) * 1000:>8.3f}")
+
+if __name__ == "__main__":
+    main()
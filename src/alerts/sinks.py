@@ -0,0 +1,45 @@
+import json
+import os
+import threading
+from typing import Dict
+
+DEFAULT_ALERTS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'alerts.jsonl'
+)
+
+
+class FileSink:
+    """Append each alert as a JSON line to a local file"""
+
+    def __init__(self, path: str = DEFAULT_ALERTS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, alert: Dict):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(alert, default=str) + '\n')
+
+
+class WebhookSink:
+    """POST each alert as JSON to a webhook URL"""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+        import requests
+        self.session = requests.Session()
+
+    def send(self, alert: Dict):
+        response = self.session.post(self.url, data=json.dumps(alert, default=str),
+                                     headers={'Content-Type': 'application/json'},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+
+class PrintSink:
+    """Print alerts to stdout"""
+
+    def send(self, alert: Dict):
+        print(f"Price alert: '{alert['name']}' is Rs. {alert['price']:,.2f} on {alert['site']} "
+              f"(target Rs. {alert['threshold']:,.2f})")
@@ -0,0 +1,211 @@
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+
+from database.models import WatchRule
+from database.init_db import get_session
+from database.aggregates import listing_key, cluster_key
+
+
+class WatchRuleIndex:
+    """Watch rules indexed by key, with thresholds kept sorted per key.
+
+    A key is ``'listing:<listing key>'`` or ``'query:<cluster key>'``.
+    Matching an observation is a dict lookup plus a bisect, so its cost
+    depends on the number of rules that fire, not the number registered.
+    """
+
+    def __init__(self):
+        # key -> (sorted thresholds, rule ids in the same order)
+        self._buckets: Dict[str, Tuple[List[float], List[int]]] = {}
+        self._rule_keys: Dict[int, str] = {}
+
+    def __len__(self):
+        return len(self._rule_keys)
+
+    def build(self, rules: List[Tuple[int, str, float]]):
+        """Replace the index with ``(rule_id, key, threshold)`` triples"""
+        grouped = {}
+        for rule_id, key, threshold in rules:
+            grouped.setdefault(key, []).append((threshold, rule_id))
+        self._buckets = {}
+        self._rule_keys = {}
+        for key, entries in grouped.items():
+            entries.sort()
+            self._buckets[key] = ([t for t, _ in entries], [r for _, r in entries])
+            for _, rule_id in entries:
+                self._rule_keys[rule_id] = key
+
+    def add(self, rule_id: int, key: str, threshold: float):
+        thresholds, ids = self._buckets.setdefault(key, ([], []))
+        i = bisect.bisect_right(thresholds, threshold)
+        thresholds.insert(i, threshold)
+        ids.insert(i, rule_id)
+        self._rule_keys[rule_id] = key
+
+    def remove(self, rule_id: int):
+        key = self._rule_keys.pop(rule_id, None)
+        if key is None:
+            return
+        thresholds, ids = self._buckets[key]
+        i = ids.index(rule_id)
+        del thresholds[i]
+        del ids[i]
+        if not ids:
+            del self._buckets[key]
+
+    def match(self, key: str, price: float) -> List[int]:
+        """Ids of rules on ``key`` whose threshold is at or above ``price``"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return []
+        thresholds, ids = bucket
+        return ids[bisect.bisect_left(thresholds, price):]
+
+
+def _rule_index_key(rule) -> str:
+    if rule.listing_key:
+        return f"listing:{rule.listing_key}"
+    return f"query:{rule.query}"
+
+
+class AlertEngine:
+    """Evaluate ingested products against the stored watch rules.
+
+    Rules are loaded into a ``WatchRuleIndex`` and reloaded when the rule
+    table changes. A rule fires when a price is at or below its threshold
+    and lower than the price it last notified about.
+
+    A listing rule is checked against every batch containing that listing.
+    A query rule is checked only against batches from its query, and only
+    with the batch's cheapest product: that product is the one reported,
+    and if it doesn't reach the threshold no other listing can.
+    """
+
+    def __init__(self, engine, sinks: List = None):
+        self.engine = engine
+        self.sinks = sinks or []
+        self.index = WatchRuleIndex()
+        self._rules: Dict[int, Dict] = {}
+        self._version = None
+        # Guards the rule cache and index; concurrent batches would otherwise
+        # rebuild them under each other and notify the same drop twice
+        self._lock = threading.Lock()
+
+    def _table_version(self, session):
+        return session.query(func.count(WatchRule.id), func.max(WatchRule.id),
+                             func.max(WatchRule.created_at)).one()
+
+    def _refresh(self, session):
+        version = tuple(self._table_version(session))
+        if version == self._version:
+            return
+        rules = session.query(WatchRule.id, WatchRule.query, WatchRule.listing_key,
+                              WatchRule.threshold, WatchRule.label, WatchRule.last_notified_price).all()
+        self._rules = {rule.id: {'threshold': rule.threshold, 'label': rule.label,
+                                 'last_notified_price': rule.last_notified_price}
+                       for rule in rules}
+        self.index.build([(rule.id, _rule_index_key(rule), rule.threshold) for rule in rules])
+        self._version = version
+
+    def add_rule(self, threshold: float, query: str = None, url: str = None,
+                 site: str = 'Daraz', label: str = None) -> int:
+        """Register a rule on a search query or a single listing URL"""
+        if bool(query) == bool(url):
+            raise ValueError("Watch rules need exactly one of query or url")
+        session = get_session(self.engine)
+        try:
+            rule = WatchRule(
+                query=cluster_key(query) if query else None,
+                listing_key=listing_key({'site': site, 'url': url}) if url else None,
+                threshold=threshold,
+                label=label or query or url
+            )
+            session.add(rule)
+            session.commit()
+            return rule.id
+        finally:
+            session.close()
+
+    def remove_rule(self, rule_id: int) -> bool:
+        session = get_session(self.engine)
+        try:
+            deleted = session.query(WatchRule).filter_by(id=rule_id).delete()
+            session.commit()
+            return bool(deleted)
+        finally:
+            session.close()
+
+    def list_rules(self) -> List[WatchRule]:
+        session = get_session(self.engine)
+        try:
+            return session.query(WatchRule).order_by(WatchRule.id).all()
+        finally:
+            session.close()
+
+    def evaluate(self, products: List[Dict], query: str = None) -> List[Dict]:
+        """Match a batch against the rules and notify the sinks"""
+        if not products:
+            return []
+        session = get_session(self.engine)
+        try:
+            with self._lock:
+                alerts = self._match(session, products, query)
+        finally:
+            session.close()
+
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    print(f"Error sending price alert: {str(e)}")
+        return alerts
+
+    def _match(self, session, products: List[Dict], query: str = None) -> List[Dict]:
+        """Alerts for a batch, with the notified prices stored"""
+        self._refresh(session)
+        if not len(self.index):
+            return []
+
+        # Lowest price seen per rule in this batch
+        best = {}
+        for product in products:
+            for rule_id in self.index.match(f"listing:{listing_key(product)}", product['price']):
+                if rule_id not in best or product['price'] < best[rule_id]['price']:
+                    best[rule_id] = product
+        if query:
+            cheapest = min(products, key=lambda p: p['price'])
+            for rule_id in self.index.match(f"query:{cluster_key(query)}", cheapest['price']):
+                if rule_id not in best or cheapest['price'] < best[rule_id]['price']:
+                    best[rule_id] = cheapest
+
+        alerts = []
+        now = datetime.utcnow()
+        for rule_id, product in best.items():
+            rule = self._rules[rule_id]
+            last = rule['last_notified_price']
+            if last is not None and product['price'] >= last:
+                continue
+            rule['last_notified_price'] = product['price']
+            alerts.append({
+                'rule_id': rule_id,
+                'label': rule['label'],
+                'threshold': rule['threshold'],
+                'name': product['name'],
+                'price': product['price'],
+                'site': product['site'],
+                'url': product.get('url'),
+                'triggered_at': now.isoformat()
+            })
+
+        if alerts:
+            for alert in alerts:
+                session.query(WatchRule).filter_by(id=alert['rule_id']).update(
+                    {'last_notified_price': alert['price']}, synchronize_session=False
+                )
+            session.commit()
+        return alerts
@@ -0,0 +1,133 @@
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Bodies smaller than this aren't worth the compression overhead
+MINIMUM_SIZE = 500
+
+# Already-compressed payloads
+_SKIPPED_TYPES = ('image/', 'video/', 'audio/', 'application/gzip', 'application/zip')
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can produce, preferred first"""
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts (by q-value, then server preference)"""
+    offered = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        offered[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = offered.get(encoding, offered.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress and flush, so the client can decode everything sent so far"""
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, as the client's Accept-Encoding allows.
+
+    Whole responses below ``minimum_size`` are sent as they are. Streamed
+    responses (NDJSON, Server-Sent Events) are compressed chunk by chunk and
+    every chunk is flushed, so compression never holds back a result the
+    client could already show. Brotli is used only if the ``brotli`` package
+    is installed.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                passthrough = ('content-encoding' in headers
+                               or headers.get('content-type', '').startswith(_SKIPPED_TYPES))
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more = message.get('more_body', False)
+            if compressor is None:
+                if not more and len(body) < self.minimum_size:
+                    await send(start)
+                    await send(message)
+                    passthrough = True
+                    return
+                compressor = _Compressor(encoding, self.level)
+                headers = MutableHeaders(raw=start['headers'])
+                headers['Content-Encoding'] = encoding
+                headers.add_vary_header('Accept-Encoding')
+                if more:
+                    del headers['Content-Length']
+                else:
+                    body = compressor.finish(body)
+                    headers['Content-Length'] = str(len(body))
+                    await send(start)
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+                await send(start)
+
+            data = compressor.chunk(body) if more else compressor.finish(body)
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more})
+
+        await self.app(scope, receive, send_compressed)
@@ -4,18 +4,21 @@ import os
 # Add the parent directory to the path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Dict
 from scrappers.scraper_manager import ScraperManager
-from database.models import Product
-from database.init_db import get_session, init_db
+from api.compression import CompressionMiddleware
+from api.serialization import (FastJSONResponse, ndjson_lines, sse_messages,
+                               NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE)
 from pydantic import BaseModel
-import pandas as pd
+from datetime import datetime, timedelta
 
-app = FastAPI(title="Electronics Price Tracker API")
+app = FastAPI(title="Electronics Price Tracker API", default_response_class=FastJSONResponse)
+# gzip, or brotli if installed, as the client accepts
+app.add_middleware(CompressionMiddleware)
 
-# Initialize database and scraper manager
-engine = init_db()
+# The scraper manager creates its database engine and browsers on first use
 scraper_manager = ScraperManager()
 
 class ProductSearchRequest(BaseModel):
@@ -37,46 +40,153 @@ class ProductResponse(BaseModel):
 async def root():
     return {"message": "Electronics Price Tracker API"}
 
+def profiled_response(content, capture) -> FastJSONResponse:
+    """JSON response; a profiled call also reports its stage timings and profile file"""
+    response = FastJSONResponse(content)
+    if capture is not None:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in capture.timings.items()
+        )
+        if capture.path:
+            response.headers["X-Profile"] = os.path.basename(capture.path)
+    return response
+
+@app.get("/suggest")
+def suggest(q: str, limit: int = 8):
+    """Completions of a partly typed search
+    
+    Past queries come first, those with results fresher than 15 minutes
+    (``fresh: true``, answerable with ``compare?max_age=900``) ahead of
+    the rest, followed by names of known listings. Served from memory.
+    """
+    if limit < 1 or limit > 50:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 50")
+    return {"query": q, "suggestions": scraper_manager.suggest(q, limit)}
+
 @app.get("/products/search/{query}")
-async def search_products(query: str, limit: int = 10):
-    """Search for products across all sites"""
+def search_products(query: str, limit: int = 10, profile: bool = None):
+    """Search for products across all sites
+    
+    ``profile=true`` writes a profile of this request (see ``compare``).
+    """
     try:
-        products = scraper_manager.search_all_sites(query)
-        # Save to database
-        scraper_manager.save_products_to_db(products)
+        with scraper_manager.profiler.capture('search', query, force=profile) as capture:
+            products = scraper_manager.search_all_sites(query)
+            # Save to database
+            scraper_manager.save_products_to_db(products, query)
         
-        # Return limited results
-        return {"query": query, "products": products[:limit]}
+        # Records are encoded as they are, without an intermediate dict per product
+        return profiled_response({"query": query, "products": products[:limit]}, capture)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def comparison(query: str, max_age: int = None) -> Dict:
+    if max_age is not None:
+        summary = scraper_manager.get_comparison_summary(query, timedelta(seconds=max_age))
+        if summary:
+            products = [
+                {"name": stats["best_name"], "price": stats["best_price"], "site": site, "url": stats["best_url"]}
+                for site, stats in summary["by_site"].items()
+            ]
+            return {"query": query, "products": products, "summary": summary, "cached": True}
+    
+    products = scraper_manager.search_all_sites(query)
+    
+    if not products:
+        return {"query": query, "products": [], "message": "No products found"}
+    
+    scraper_manager.save_products_to_db(products, query)
+    products.sort(key=lambda product: product['price'])
+    
+    # Summary comes from the aggregates maintained at ingest
+    summary = scraper_manager.get_comparison_summary(query)
+    
+    return {
+        "query": query,
+        "products": products,
+        "summary": summary
+    }
+
 @app.get("/products/compare/{query}")
-async def compare_products(query: str):
-    """Compare prices for a product across sites"""
+def compare_products(query: str, max_age: int = None, profile: bool = None):
+    """Compare prices for a product across sites
+    
+    With ``max_age`` (seconds), a query compared recently enough is answered
+    from the stored aggregates without scraping again.
+    
+    ``profile=true`` captures a wall-clock and CPU profile of the fetch,
+    parse and db stages into the profile directory; the response then has
+    a ``Server-Timing`` header with the stage times and the file name in
+    ``X-Profile``. Without it, requests are profiled at PROFILE_RATE.
+    """
     try:
-        df = scraper_manager.compare_products(query)
-        
-        if df.empty:
-            return {"query": query, "products": [], "message": "No products found"}
-        
-        # Convert to dict format
-        products = df.to_dict('records')
-        
-        # Generate summary
-        summary = {
-            "total_products": len(products),
-            "sites": df['site'].unique().tolist(),
-            "price_range": {
-                "min": float(df['price'].min()),
-                "max": float(df['price'].max()),
-                "average": float(df['price'].mean())
-            }
-        }
-        
-        return {
-            "query": query,
-            "products": products,
-            "summary": summary
-        }
+        with scraper_manager.profiler.capture('compare', query, force=profile) as capture:
+            content = comparison(query, max_age)
+        return profiled_response(content, capture)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def compare_events(query: str, chunk_size: int):
+    """Events for a streamed comparison: product chunks per site as each finishes, then the summary"""
+    for site, products, error in scraper_manager.iter_site_results(query):
+        if error:
+            yield {"type": "error", "site": site, "error": error}
+            continue
+        if products:
+            scraper_manager.save_products_to_db(products, query)
+        products.sort(key=lambda product: product['price'])
+        for i in range(0, len(products), chunk_size):
+            yield {"type": "products", "site": site, "products": products[i:i + chunk_size]}
+        yield {"type": "site_done", "site": site, "count": len(products)}
+    yield {"type": "summary", "query": query, "summary": scraper_manager.get_comparison_summary(query)}
+
+@app.get("/products/compare/{query}/stream")
+async def stream_compare(query: str, request: Request, format: str = None, chunk_size: int = 100):
+    """Compare prices, streaming results as each site completes
+    
+    Sends NDJSON (one event per line) by default, or Server-Sent Events
+    with ``format=sse`` or ``Accept: text/event-stream``. Events are
+    ``products`` (up to ``chunk_size`` products of one site, cheapest
+    first), ``site_done``, ``error`` and a final ``summary``.
+    """
+    if format is None:
+        format = 'sse' if SSE_MEDIA_TYPE in request.headers.get('accept', '') else 'ndjson'
+    if format not in ('ndjson', 'sse'):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+    
+    events = compare_events(query, chunk_size)
+    if format == 'sse':
+        # Proxies must not buffer the event stream
+        return StreamingResponse(sse_messages(events), media_type=SSE_MEDIA_TYPE,
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    return StreamingResponse(ndjson_lines(events), media_type=NDJSON_MEDIA_TYPE)
+
+@app.get("/listings/history")
+def listing_history(url: str, site: str = "Daraz", start: datetime = None, end: datetime = None,
+                    points: int = 200, resolution: str = None):
+    """OHLC price history of one listing
+    
+    The resolution (hour, day or week) is the finest one that covers
+    ``start``..``end`` in at most ``points`` buckets, unless given.
+    """
+    try:
+        history = scraper_manager.get_price_history(url, site, start, end, max_points=points,
+                                                    resolution=resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if history is None:
+        raise HTTPException(status_code=404, detail="Listing not tracked yet")
+    return history
+
+@app.get("/prices/outliers")
+def price_outliers(since: datetime = None, reason: str = None, limit: int = 100):
+    """Scraped prices that failed validation, newest first
+    
+    ``reason`` is ``invalid``, ``jump`` (far from the listing's last price)
+    or ``cluster`` (far from the median of comparable listings).
+    """
+    if limit < 1 or limit > 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    return {"outliers": scraper_manager.get_price_outliers(since, reason, limit)}
@@ -0,0 +1,55 @@
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, Mapping
+
+from starlette.responses import Response
+
+from scrappers.product_record import ProductRecord
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+SSE_MEDIA_TYPE = 'text/event-stream'
+
+
+def _default(value: Any):
+    # Records are encoded directly, with no records_to_rows pass over the result set
+    if isinstance(value, ProductRecord):
+        return value.to_row()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        # numpy scalars, e.g. from a DataFrame row
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with ``dumps`` instead of FastAPI's encoder"""
+
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def ndjson_lines(events: Iterable[Mapping]) -> Iterator[bytes]:
+    """One JSON document per line"""
+    for event in events:
+        yield dumps(event) + b'\n'
+
+
+def sse_messages(events: Iterable[Mapping]) -> Iterator[bytes]:
+    """Server-Sent Events, named after each event's ``type``"""
+    for event in events:
+        yield b'event: ' + event['type'].encode('utf-8') + b'\ndata: ' + dumps(event) + b'\n\n'
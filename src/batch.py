@@ -0,0 +1,206 @@
+"""
+Batch query mode
+
+Reads search queries and product URLs from a file (or stdin), runs them
+across sites on a shared worker pool with per-site rate limits, streams the
+results to one output and checkpoints finished tasks so an interrupted run
+can be resumed.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Tuple
+
+# Add the parent directory to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.rate_limit import RateLimiter
+from src.utils.urls import canonical_url
+
+# Columns of the products table; detail pages return extra attributes
+PRODUCT_FIELDS = ['name', 'price', 'currency', 'site', 'url', 'image_url', 'brand', 'category', 'description']
+
+def read_tasks(lines: Iterable[str], sites: List[str]) -> List[Tuple[str, str, str]]:
+    """Turn input lines into (kind, site, target) tasks
+
+    A line starting with http is a product URL and is fetched from the site
+    it belongs to; any other line is a query searched on every site. Blank
+    lines and lines starting with # are ignored.
+    """
+    tasks = []
+    for line in lines:
+        target = line.strip()
+        if not target or target.startswith('#'):
+            continue
+        if target.startswith('http'):
+            site = next((s for s in sites if s.lower() in target.lower()), None)
+            if site is None:
+                print(f"Skipping URL for unsupported site: {target}")
+                continue
+            tasks.append(('url', site, canonical_url(target)))
+        else:
+            tasks.extend(('query', site, target) for site in sites)
+    # The same line may appear more than once in large inputs
+    return list(dict.fromkeys(tasks))
+
+def task_id(task: Tuple[str, str, str]) -> str:
+    return ':'.join(task)
+
+class Checkpoint:
+    """Append-only log of finished task ids"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.rstrip('\n') for line in f if line.strip()}
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def mark(self, task):
+        with self._lock:
+            self._file.write(task_id(task) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.done.add(task_id(task))
+
+    def close(self):
+        self._file.close()
+
+class DatabaseSink:
+    """Save results through ScraperManager (aggregates and alerts included)"""
+
+    def __init__(self, scraper_manager):
+        self.scraper_manager = scraper_manager
+        self._lock = threading.Lock()
+
+    def write(self, products: List[Dict], query: str = None):
+        rows = [{field: product.get(field, '') for field in PRODUCT_FIELDS} for product in products]
+        # SQLite allows one writer at a time
+        with self._lock:
+            self.scraper_manager.save_products_to_db(rows, query)
+
+    def close(self):
+        pass
+
+class JsonlSink:
+    """Append results to a JSON lines file"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, products: List[Dict], query: str = None):
+        with self._lock:
+            for product in products:
+                self._file.write(json.dumps(dict(product, query=query), default=str) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class ParquetSink:
+    """Append results to a partitioned Parquet dataset directory"""
+
+    def __init__(self, path: str):
+        from database.parquet_archive import ParquetArchive
+        self.archive = ParquetArchive(path)
+        self._lock = threading.Lock()
+
+    def write(self, products: List[Dict], query: str = None):
+        with self._lock:
+            self.archive.write_products(products)
+
+    def close(self):
+        pass
+
+def make_sink(output: str, scraper_manager):
+    """Pick the sink for an output spec: 'db', *.jsonl or *.parquet"""
+    if not output or output == 'db':
+        return DatabaseSink(scraper_manager)
+    if output.endswith('.jsonl'):
+        return JsonlSink(output)
+    if output.endswith('.parquet'):
+        return ParquetSink(output)
+    raise ValueError(f"Unsupported batch output: {output} (use db, *.jsonl or *.parquet)")
+
+class BatchRunner:
+    """Run many tasks over shared per-site scraper pools and rate limits"""
+
+    def __init__(self, scraper_manager, sink, checkpoint: Checkpoint = None,
+                 workers: int = 4, rate: float = 0.5):
+        self.scraper_manager = scraper_manager
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.limiters = {site: RateLimiter(rate) for site in scraper_manager.site_names}
+
+    def _run_task(self, task) -> List[Dict]:
+        kind, site, target = task
+        self.limiters[site].acquire()
+        with self.scraper_manager.get_pool(site).scraper() as scraper:
+            if kind == 'query':
+                return scraper.search_products(target)
+            detail = scraper.get_product_details(target)
+            return [detail] if detail and detail.get('price') else []
+
+    def run(self, tasks: List[Tuple[str, str, str]]) -> Dict:
+        done = self.checkpoint.done if self.checkpoint else set()
+        pending = [task for task in tasks if task_id(task) not in done]
+        skipped = len(tasks) - len(pending)
+        if skipped:
+            print(f"Resuming: {skipped} of {len(tasks)} tasks already done")
+
+        stats = {'tasks': len(pending), 'completed': 0, 'failed': 0, 'products': 0}
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._run_task, task): task for task in pending}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    products = future.result()
+                    if products:
+                        self.sink.write(products, task[2] if task[0] == 'query' else None)
+                    if self.checkpoint:
+                        self.checkpoint.mark(task)
+                    stats['completed'] += 1
+                    stats['products'] += len(products)
+                except Exception as e:
+                    stats['failed'] += 1
+                    print(f"Error running {task[0]} '{task[2]}' on {task[1]}: {str(e)}")
+
+                finished = stats['completed'] + stats['failed']
+                if finished % 10 == 0 or finished == len(pending):
+                    print(f"Progress: {finished}/{len(pending)} tasks, {stats['products']} products")
+
+        stats['seconds'] = round(time.time() - start, 1)
+        return stats
+
+def run_batch(source: str, output: str = 'db', checkpoint_path: str = None,
+              workers: int = 4, rate: float = 0.5, parse_workers: int = 0) -> Dict:
+    """Run a batch from a file path (or '-' for stdin)"""
+    from src.scrappers.scraper_manager import ScraperManager
+
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    scraper_manager = ScraperManager(detail_workers=workers, parse_workers=parse_workers)
+    checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+    sink = make_sink(output, scraper_manager)
+    try:
+        tasks = read_tasks(lines, scraper_manager.site_names)
+        runner = BatchRunner(scraper_manager, sink, checkpoint, workers=workers, rate=rate)
+        return runner.run(tasks)
+    finally:
+        sink.close()
+        if checkpoint:
+            checkpoint.close()
+        scraper_manager.close()
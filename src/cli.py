@@ -1,4 +1,5 @@
 import argparse
+import csv
 import sys
 import os
 import time
@@ -6,28 +7,85 @@ import time
 # Add the parent directory to the path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.scrappers.scraper_manager import ScraperManager
-from src.utils.data_processor import generate_price_comparison_report, format_price
-import pandas as pd
+from src.utils.data_processor import format_price
+from src.daemon import daemon_request
+
+# Scraping, database and pandas modules are imported by the commands that need
+# them, so --help and argument errors return immediately
+
+def _scraper_manager():
+    """Create a ScraperManager, importing the scraping stack on demand"""
+    from src.scrappers.scraper_manager import ScraperManager
+    return ScraperManager()
+
+class LocalBackend:
+    """Runs comparisons in this process"""
+    
+    def __init__(self):
+        self.scraper_manager = None
+    
+    def compare(self, query, enrich=False):
+        """Return (product records, summary) for a query"""
+        if self.scraper_manager is None:
+            self.scraper_manager = _scraper_manager()
+        df = self.scraper_manager.compare_products(query, enrich=enrich)
+        if df.empty:
+            return [], None
+        return df.to_dict('records'), self.scraper_manager.get_comparison_summary(query)
+    
+    def close(self):
+        if self.scraper_manager is not None:
+            self.scraper_manager.close()
+
+class DaemonBackend:
+    """Forwards comparisons to a running scraping daemon"""
+    
+    def compare(self, query, enrich=False):
+        response = daemon_request({'command': 'compare', 'query': query, 'enrich': enrich})
+        if response is None:
+            raise RuntimeError("Scraping daemon stopped responding")
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['products'], response['summary']
+    
+    def close(self):
+        pass
+
+def _backend(args):
+    """Use the daemon when it is running, otherwise scrape in-process"""
+    if not getattr(args, 'no_daemon', False) and daemon_request({'command': 'ping'}, timeout=2):
+        return DaemonBackend()
+    return LocalBackend()
+
+def _save_results(products, path):
+    """Write product records to a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(products).to_parquet(path, index=False)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(products[0]))
+            writer.writeheader()
+            writer.writerows(products)
 
 def search_command(args):
     """Handle the search command"""
-    scraper_manager = ScraperManager()
+    backend = _backend(args)
     try:
         print(f"Searching for '{args.query}' across all sites...")
-        df = scraper_manager.compare_products(args.query)
+        products, _ = backend.compare(args.query, enrich=args.enrich)
         
-        if df.empty:
+        if not products:
             print("No products found!")
             return
         
         # Display results
-        print(f"\nFound {len(df)} products:")
+        print(f"\nFound {len(products)} products:")
         print("=" * 80)
         
         # Show top 10 cheapest products
-        df_sorted = df.sort_values('price').head(10)
-        for idx, (_, product) in enumerate(df_sorted.iterrows()):
+        cheapest = sorted(products, key=lambda p: p['price'])[:10]
+        for idx, product in enumerate(cheapest):
             print(f"{idx+1}. {product['name'][:50]}...")
             print(f"   Price: {format_price(product['price'])} | Site: {product['site']}")
             print(f"   URL: {product['url']}")
@@ -35,48 +93,203 @@ def search_command(args):
         
         # Save to file if requested
         if args.output:
-            df.to_csv(args.output, index=False)
+            _save_results(products, args.output)
             print(f"Results saved to {args.output}")
     except Exception as e:
         print(f"Error during search: {e}")
     finally:
-        scraper_manager.close()
+        backend.close()
 
 def compare_command(args):
     """Handle the compare command"""
-    scraper_manager = ScraperManager()
+    backend = _backend(args)
     try:
         print(f"Comparing prices for '{args.query}'...")
-        df = scraper_manager.compare_products(args.query)
+        products, summary = backend.compare(args.query)
         
-        if df.empty:
+        if not products:
             print("No products found!")
             return
         
-        # Generate report
-        report = generate_price_comparison_report(df)
+        # Report from the aggregates maintained at ingest
+        if not summary:
+            print("Comparison could not be stored; see errors above.")
+            return
         
         print("\nPrice Comparison Report:")
         print("=" * 40)
-        print(f"Total products found: {report['total_products']}")
-        print(f"Sites searched: {', '.join(report['sites'])}")
-        print(f"Lowest price: {format_price(report['price_stats']['min_price'])}")
-        print(f"Highest price: {format_price(report['price_stats']['max_price'])}")
-        print(f"Average price: {format_price(report['price_stats']['avg_price'])}")
+        print(f"Total products found: {summary['total_products']}")
+        print(f"Sites searched: {', '.join(summary['sites'])}")
+        print(f"Lowest price: {format_price(summary['price_range']['min'])}")
+        print(f"Highest price: {format_price(summary['price_range']['max'])}")
+        print(f"Average price: {format_price(summary['price_range']['average'])}")
         
         # Show price by site
         print("\nProducts per site:")
-        for site, count in report['products_by_site'].items():
-            avg_price = df[df['site'] == site]['price'].mean()
-            print(f"  {site}: {count} products (avg: {format_price(avg_price)})")
+        for site, stats in summary['by_site'].items():
+            print(f"  {site}: {stats['count']} products (avg: {format_price(stats['average'])}, "
+                  f"best: {format_price(stats['best_price'])})")
     except Exception as e:
         print(f"Error during comparison: {e}")
     finally:
+        backend.close()
+
+def export_command(args):
+    """Handle the export command"""
+    scraper_manager = _scraper_manager()
+    try:
+        scraper_manager.export_history(args.archive_dir)
+    except Exception as e:
+        print(f"Error during export: {e}")
+    finally:
+        scraper_manager.close()
+
+def compact_command(args):
+    """Handle the compact command"""
+    scraper_manager = _scraper_manager()
+    try:
+        report = scraper_manager.compact_history(args.archive_dir, raw_days=args.raw_days,
+                                                 hourly_days=args.hourly_days,
+                                                 outlier_days=args.outlier_days)
+        if 'size_bytes' in report:
+            print(f"Database size: {report['size_bytes'] / 1024 / 1024:.1f} MB")
+    except Exception as e:
+        print(f"Error during compaction: {e}")
+    finally:
+        scraper_manager.close()
+
+def watch_command(args):
+    """Handle the watch command"""
+    scraper_manager = _scraper_manager()
+    try:
+        alerts = scraper_manager.alerts
+        if args.watch_action == 'add':
+            rule_id = alerts.add_rule(args.below, query=args.query, url=args.url)
+            print(f"Added watch rule {rule_id}: notify when {args.query or args.url} "
+                  f"drops to {format_price(args.below)}")
+        elif args.watch_action == 'remove':
+            if alerts.remove_rule(args.rule_id):
+                print(f"Removed watch rule {args.rule_id}")
+            else:
+                print(f"No watch rule with id {args.rule_id}")
+        else:
+            rules = alerts.list_rules()
+            if not rules:
+                print("No watch rules registered.")
+            for rule in rules:
+                notified = format_price(rule.last_notified_price) if rule.last_notified_price else 'never'
+                print(f"{rule.id}. {rule.label} <= {format_price(rule.threshold)} (last alert: {notified})")
+    except Exception as e:
+        print(f"Error managing watch rules: {e}")
+    finally:
+        scraper_manager.close()
+
+def batch_command(args):
+    """Handle the batch command"""
+    from src.batch import run_batch
+    
+    checkpoint = args.checkpoint
+    if checkpoint is None and args.input != '-':
+        checkpoint = args.input + '.checkpoint'
+    try:
+        stats = run_batch(args.input, output=args.output, checkpoint_path=checkpoint,
+                          workers=args.workers, rate=args.rate, parse_workers=args.parse_workers)
+        print(f"\nBatch finished: {stats['completed']} tasks done, {stats['failed']} failed, "
+              f"{stats['products']} products in {stats['seconds']}s")
+        if stats['failed'] and checkpoint:
+            print(f"Re-run the same command to retry failed tasks (progress kept in {checkpoint})")
+    except Exception as e:
+        print(f"Error during batch run: {e}")
+
+def frontier_command(args):
+    """Handle the frontier command"""
+    from src.scrappers.scraper_manager import ScraperManager, SITE_HOSTS
+    # Imported after scraper_manager, which puts src/ on the path
+    from frontier.crawl_frontier import CrawlFrontier, DEFAULT_SEEN_DIR
+    from frontier.worker import FrontierWorker, enqueue_tasks
+    from utils.bloom import ScalableBloomFilter
+    from src.batch import read_tasks
+    
+    scraper_manager = ScraperManager(db_url=args.db_url)
+    # Only enqueue writes the seen-set; workers dedupe through the database
+    seen = ScalableBloomFilter(args.seen_dir or DEFAULT_SEEN_DIR) if args.frontier_action == 'enqueue' else None
+    frontier = CrawlFrontier(scraper_manager.engine, host_interval=args.host_interval,
+                             visibility_timeout=args.visibility_timeout, seen=seen)
+    try:
+        if args.frontier_action == 'enqueue':
+            if args.input == '-':
+                lines = sys.stdin.read().splitlines()
+            else:
+                with open(args.input, encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            tasks = read_tasks(lines, scraper_manager.site_names)
+            queued = enqueue_tasks(frontier, tasks, SITE_HOSTS, priority=args.priority,
+                                   revisit=args.revisit)
+            print(f"Queued {queued} of {len(tasks)} tasks ({len(tasks) - queued} already queued)")
+        elif args.frontier_action == 'work':
+            worker = FrontierWorker(frontier, scraper_manager, worker_id=args.worker_id)
+            print(f"Worker {worker.worker_id} polling the crawl frontier...")
+            stats = worker.run(max_tasks=args.max_tasks, exit_when_empty=args.exit_when_empty)
+            print(f"Worker finished: {stats['completed']} tasks done, {stats['failed']} failed, "
+                  f"{stats['products']} products")
+        else:
+            stats = frontier.stats()
+            if not stats:
+                print("The crawl frontier is empty.")
+            for status in ('pending', 'leased', 'done', 'failed'):
+                if status in stats:
+                    print(f"{status}: {stats[status]}")
+    except KeyboardInterrupt:
+        print("\nWorker stopped; leased tasks return to the queue when their lease expires.")
+    except Exception as e:
+        print(f"Error using the crawl frontier: {e}")
+    finally:
+        if seen is not None:
+            seen.close()
         scraper_manager.close()
 
-def interactive_mode():
+def loadtest_command(args):
+    """Handle the loadtest command"""
+    import src.scrappers.scraper_manager
+    # Imported after scraper_manager, which puts src/ on the path
+    from loadtest.harness import run_load_test, format_report, parse_mix, DEFAULT_QUERIES
+    
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    queries = [query.strip() for query in args.queries.split(',')] if args.queries else DEFAULT_QUERIES
+    print(f"Load-testing the API with {args.users} users for {args.duration:.0f}s against a local "
+          f"stand-in marketplace ({args.catalog_size} listings, {args.latency * 1000:.0f} ms latency, "
+          f"{args.error_rate:.0%} errors)...")
+    report = run_load_test(users=args.users, duration=args.duration, mix=mix, queries=queries,
+                           catalog_size=args.catalog_size, latency=args.latency,
+                           error_rate=args.error_rate, browser=args.browser, db_url=args.db_url,
+                           challenge_rate=args.challenge_rate)
+    print()
+    print(format_report(report))
+
+def daemon_command(args):
+    """Handle the daemon command"""
+    if args.daemon_action == 'start':
+        from src.daemon import serve
+        serve(cache_ttl=args.cache_ttl)
+    elif args.daemon_action == 'stop':
+        if daemon_request({'command': 'shutdown'}, timeout=10):
+            print("Scraping daemon stopping.")
+        else:
+            print("Scraping daemon is not running.")
+    else:
+        response = daemon_request({'command': 'ping'}, timeout=5)
+        if response:
+            print(f"Scraping daemon running (pid {response['pid']}).")
+        else:
+            print("Scraping daemon is not running.")
+
+def interactive_mode(args):
     """Run in interactive mode"""
-    scraper_manager = ScraperManager()
+    backend = _backend(args)
     try:
         print("Electronics Price Tracker - Interactive Mode")
         print("=" * 50)
@@ -98,18 +311,18 @@ def interactive_mode():
                     continue
                 
                 print(f"Searching for '{query}'...")
-                df = scraper_manager.compare_products(query)
+                products, _ = backend.compare(query)
                 
-                if df.empty:
+                if not products:
                     print("No products found!")
                     continue
                 
                 # Show best deals
                 print(f"\nBest deals for '{query}':")
                 print("=" * 40)
-                df_sorted = df.sort_values('price').head(5)
+                cheapest = sorted(products, key=lambda p: p['price'])[:5]
                 
-                for idx, (_, product) in enumerate(df_sorted.iterrows()):
+                for idx, product in enumerate(cheapest):
                     print(f"{idx+1}. {product['name'][:60]}...")
                     print(f"   {format_price(product['price'])} | {product['site']}")
                     print()
@@ -127,29 +340,132 @@ def interactive_mode():
     except Exception as e:
         print(f"Error in interactive mode: {e}")
     finally:
-        scraper_manager.close()
+        backend.close()
 
 def main():
     parser = argparse.ArgumentParser(description='Electronics Price Tracker')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Scrape in this process even if the daemon is running')
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # Search command
     search_parser = subparsers.add_parser('search', help='Search for products')
     search_parser.add_argument('query', help='Product to search for')
-    search_parser.add_argument('-o', '--output', help='Output CSV file')
+    search_parser.add_argument('-o', '--output', help='Output file (.csv or .parquet)')
+    search_parser.add_argument('--enrich', action='store_true',
+                               help='Fetch detail pages for brand, category, images and specs')
     
     # Compare command
     compare_parser = subparsers.add_parser('compare', help='Compare prices for a product')
     compare_parser.add_argument('query', help='Product to compare')
     
+    # Export command
+    export_parser = subparsers.add_parser('export', help='Export price history to the Parquet archive')
+    export_parser.add_argument('--archive-dir', help='Archive directory (default: data/archive)')
+    
+    # Compact command
+    compact_parser = subparsers.add_parser('compact', help='Archive and compact old price history, then vacuum')
+    compact_parser.add_argument('--archive-dir', help='Archive directory (default: data/archive)')
+    compact_parser.add_argument('--raw-days', type=int, default=30,
+                                help='Days of observations kept at full resolution (default: 30)')
+    compact_parser.add_argument('--hourly-days', type=int, default=30,
+                                help='Days of hourly price buckets kept (default: 30)')
+    compact_parser.add_argument('--outlier-days', type=int, default=90,
+                                help='Days of recorded price outliers kept (default: 90)')
+    
+    # Watch command
+    watch_parser = subparsers.add_parser('watch', help='Manage price-drop alerts')
+    watch_subparsers = watch_parser.add_subparsers(dest='watch_action')
+    watch_add_parser = watch_subparsers.add_parser('add', help='Add a watch rule')
+    watch_target = watch_add_parser.add_mutually_exclusive_group(required=True)
+    watch_target.add_argument('--query', help='Search query to watch')
+    watch_target.add_argument('--url', help='Product URL to watch')
+    watch_add_parser.add_argument('--below', type=float, required=True, help='Target price')
+    watch_remove_parser = watch_subparsers.add_parser('remove', help='Remove a watch rule')
+    watch_remove_parser.add_argument('rule_id', type=int, help='Rule id')
+    watch_subparsers.add_parser('list', help='List watch rules')
+    
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Run many queries/URLs from a file in one process')
+    batch_parser.add_argument('input', help="File with one query or product URL per line ('-' for stdin)")
+    batch_parser.add_argument('-o', '--output', default='db',
+                              help="Where to stream results: db (default), *.jsonl or *.parquet")
+    batch_parser.add_argument('--checkpoint', help='Progress file for resuming (default: <input>.checkpoint)')
+    batch_parser.add_argument('--workers', type=int, default=4, help='Concurrent workers per site')
+    batch_parser.add_argument('--rate', type=float, default=0.5, help='Max requests per second per site')
+    batch_parser.add_argument('--parse-workers', type=int, default=0,
+                              help='Processes for parsing result pages (default: parse in fetch threads)')
+    
+    # Frontier command
+    frontier_parser = subparsers.add_parser('frontier', help='Shared crawl queue for multiple worker processes')
+    frontier_parser.add_argument('--db-url', help='Shared database URL (default: DATABASE_URL or local SQLite)')
+    frontier_parser.add_argument('--host-interval', type=float, default=5.0,
+                                 help='Min seconds between requests to one host across all workers')
+    frontier_parser.add_argument('--visibility-timeout', type=float, default=300,
+                                 help='Seconds before an unacknowledged task is handed to another worker')
+    frontier_subparsers = frontier_parser.add_subparsers(dest='frontier_action')
+    frontier_enqueue_parser = frontier_subparsers.add_parser('enqueue', help='Queue queries/URLs from a file')
+    frontier_enqueue_parser.add_argument('input', help="File with one query or product URL per line ('-' for stdin)")
+    frontier_enqueue_parser.add_argument('--priority', type=int, default=0, help='Higher runs first')
+    frontier_enqueue_parser.add_argument('--revisit', action='store_true',
+                                         help='Queue product URLs again even if they were queued before')
+    frontier_enqueue_parser.add_argument('--seen-dir',
+                                         help='Persistent seen-set of product URLs (default: data/frontier_seen)')
+    frontier_work_parser = frontier_subparsers.add_parser('work', help='Run a worker until stopped')
+    frontier_work_parser.add_argument('--worker-id', help='Worker name (default: host:pid)')
+    frontier_work_parser.add_argument('--max-tasks', type=int, help='Exit after this many tasks')
+    frontier_work_parser.add_argument('--exit-when-empty', action='store_true',
+                                      help='Exit once no tasks are left instead of polling')
+    frontier_subparsers.add_parser('stats', help='Show task counts by status')
+    
+    # Load test command
+    loadtest_parser = subparsers.add_parser('loadtest', help='Load-test the API against a local stand-in marketplace')
+    loadtest_parser.add_argument('--users', type=int, default=8, help='Concurrent clients')
+    loadtest_parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    loadtest_parser.add_argument('--mix', default='compare=1,stream=1',
+                                 help='Endpoint weights: search, compare, cached, stream (default: compare=1,stream=1)')
+    loadtest_parser.add_argument('--queries', help='Comma-separated queries (default: a built-in list)')
+    loadtest_parser.add_argument('--catalog-size', type=int, default=2000, help='Listings in the stand-in catalog')
+    loadtest_parser.add_argument('--latency', type=float, default=0.2, help='Stand-in response time in seconds')
+    loadtest_parser.add_argument('--error-rate', type=float, default=0.0,
+                                 help='Fraction of stand-in responses that fail with 503')
+    loadtest_parser.add_argument('--challenge-rate', type=float, default=0.0,
+                                 help='Chance that a visitor without the stand-in\'s cookie gets a captcha page')
+    loadtest_parser.add_argument('--browser', action='store_true',
+                                 help='Fetch through Chrome as in production instead of plain HTTP')
+    loadtest_parser.add_argument('--db-url', help='Database to write to (default: a scratch SQLite file)')
+    
+    # Daemon command
+    daemon_parser = subparsers.add_parser('daemon', help='Run a warm scraping daemon for faster CLI calls')
+    daemon_subparsers = daemon_parser.add_subparsers(dest='daemon_action')
+    daemon_start_parser = daemon_subparsers.add_parser('start', help='Start the daemon in the foreground')
+    daemon_start_parser.add_argument('--cache-ttl', type=float, default=60,
+                                     help='Seconds to reuse results for repeated queries')
+    daemon_subparsers.add_parser('stop', help='Stop the running daemon')
+    daemon_subparsers.add_parser('status', help='Show whether the daemon is running')
+    
     args = parser.parse_args()
     
     if args.command == 'search':
         search_command(args)
     elif args.command == 'compare':
         compare_command(args)
+    elif args.command == 'export':
+        export_command(args)
+    elif args.command == 'compact':
+        compact_command(args)
+    elif args.command == 'watch':
+        watch_command(args)
+    elif args.command == 'batch':
+        batch_command(args)
+    elif args.command == 'frontier':
+        frontier_command(args)
+    elif args.command == 'loadtest':
+        loadtest_command(args)
+    elif args.command == 'daemon':
+        daemon_command(args)
     else:
-        interactive_mode()
+        interactive_mode(args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
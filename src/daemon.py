@@ -0,0 +1,131 @@
+"""
+Long-lived scraping daemon
+
+Keeps a warm ScraperManager (browsers, HTTP sessions, DB engine and a short
+result cache) behind a Unix socket so repeated CLI invocations skip startup.
+The protocol is one JSON request line and one JSON response line per
+connection.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+# Add the parent directory to the path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    'SCRAPER_DAEMON_SOCKET',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'scraper.sock')
+)
+
+def daemon_request(payload: dict, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 600):
+    """Send a request to the daemon; return its response, or None if it isn't running"""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+        if not line:
+            return None
+        return json.loads(line)
+    except (OSError, ValueError):
+        # A stale socket file left by a daemon that is no longer running, or
+        # one that is stuck, was denied or died mid-reply; callers fall back
+        return None
+
+def _records(df):
+    """JSON-safe records from a comparison DataFrame"""
+    return json.loads(df.to_json(orient='records')) if not df.empty else []
+
+class DaemonState:
+    """Warm scraping state shared by all daemon connections"""
+
+    def __init__(self, cache_ttl: float):
+        from src.scrappers.scraper_manager import ScraperManager
+        from src.utils.result_cache import ResultCache
+
+        self.scraper_manager = ScraperManager()
+        # Scrapers are not thread-safe, so live scrapes run one at a time
+        self.scrape_lock = threading.Lock()
+        self.results = ResultCache(ttl=cache_ttl)
+        # Create the engine now so the first request doesn't pay for it
+        self.scraper_manager.engine
+
+    def compare(self, query: str, enrich: bool = False, refresh: bool = False) -> dict:
+        def scrape():
+            with self.scrape_lock:
+                df = self.scraper_manager.compare_products(query, enrich=enrich)
+            return {
+                'products': _records(df),
+                'summary': self.scraper_manager.get_comparison_summary(query) if not df.empty else None
+            }
+
+        key = self.scraper_manager.normalize_query(query)
+        return self.results.get_or_compute(key, scrape, force=refresh or enrich)
+
+    def close(self):
+        self.scraper_manager.close()
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            response = self.server.dispatch(request)
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, state: DaemonState):
+        self.state = state
+        super().__init__(socket_path, DaemonHandler)
+
+    def dispatch(self, request: dict) -> dict:
+        command = request.get('command')
+        if command == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if command == 'compare':
+            result = self.state.compare(request['query'], enrich=request.get('enrich', False),
+                                        refresh=request.get('refresh', False))
+            return {'ok': True, **result}
+        if command == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+        return {'ok': False, 'error': f"Unknown command: {command}"}
+
+def serve(socket_path: str = DEFAULT_SOCKET_PATH, cache_ttl: float = 60):
+    """Run the daemon in the foreground until stopped"""
+    if not hasattr(socket, 'AF_UNIX'):
+        print("The scraping daemon needs Unix domain sockets, which this platform lacks.")
+        return
+    if daemon_request({'command': 'ping'}, socket_path, timeout=5):
+        print(f"Daemon already running on {socket_path}")
+        return
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+    state = DaemonState(cache_ttl)
+    server = DaemonServer(socket_path, state)
+    os.chmod(socket_path, 0o600)
+    print(f"Scraping daemon listening on {socket_path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("Scraping daemon stopped.")
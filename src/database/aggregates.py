@@ -0,0 +1,141 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from utils.urls import listing_identity
+from .models import ListingPriceStats, ClusterSitePrice
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+def listing_key(product: Dict) -> str:
+    """Stable identifier for a listing: site plus item id (or canonical URL)"""
+    url = product.get('url') or ''
+    identity = listing_identity(url) if url else product.get('name', '')
+    return f"{product.get('site', '').lower()}:{identity}"
+
+
+def cluster_key(query: str) -> str:
+    """Normalize a search query so equivalent searches share aggregates"""
+    return re.sub(r'\s+', ' ', query or '').strip().lower()
+
+
+def update_aggregates(session, products: List[Dict], query: str = None, changed: List[Dict] = None):
+    """Fold a scraped batch into the aggregate tables (caller commits)
+
+    ``changed`` are the batch's new or changed listings, when the caller
+    knows them; the other listings' stats rows only get ``last_seen`` and
+    their observation count bumped, in one UPDATE per chunk.
+    """
+    now = datetime.utcnow()
+
+    # Per-listing current/min/max/last-changed
+    latest = {}
+    for product in products:
+        latest[listing_key(product)] = product
+    if changed is not None:
+        changed = {listing_key(product): product for product in changed}
+        unchanged = [key for key in latest if key not in changed]
+        for i in range(0, len(unchanged), _IN_CHUNK):
+            session.query(ListingPriceStats).filter(
+                ListingPriceStats.listing_key.in_(unchanged[i:i + _IN_CHUNK])
+            ).update({ListingPriceStats.last_seen: now,
+                      ListingPriceStats.observations: ListingPriceStats.observations + 1},
+                     synchronize_session=False)
+    else:
+        changed = latest
+    keys = list(changed)
+    existing = {}
+    for i in range(0, len(keys), _IN_CHUNK):
+        for row in session.query(ListingPriceStats).filter(
+                ListingPriceStats.listing_key.in_(keys[i:i + _IN_CHUNK])):
+            existing[row.listing_key] = row
+
+    for key, product in changed.items():
+        price = product['price']
+        row = existing.get(key)
+        if row is None:
+            session.add(ListingPriceStats(
+                listing_key=key, site=product['site'], name=product['name'], url=product.get('url'),
+                current_price=price, min_price=price, max_price=price, observations=1,
+                first_seen=now, last_seen=now, last_changed=now
+            ))
+            continue
+        if price != row.current_price:
+            row.current_price = price
+            row.last_changed = now
+        row.min_price = min(row.min_price, price)
+        row.max_price = max(row.max_price, price)
+        row.observations = (row.observations or 0) + 1
+        row.last_seen = now
+        row.name = product['name']
+
+    # Per-cluster per-site snapshot of the latest search results
+    if query:
+        key = cluster_key(query)
+        by_site = {}
+        for product in latest.values():
+            by_site.setdefault(product['site'], []).append(product)
+        rows = {row.site: row for row in
+                session.query(ClusterSitePrice).filter_by(cluster_key=key)}
+        for site, site_products in by_site.items():
+            best = min(site_products, key=lambda p: p['price'])
+            row = rows.get(site)
+            if row is None:
+                row = ClusterSitePrice(cluster_key=key, site=site)
+                session.add(row)
+            row.product_count = len(site_products)
+            row.best_price = best['price']
+            row.best_name = best['name']
+            row.best_url = best.get('url')
+            row.max_price = max(p['price'] for p in site_products)
+            row.price_sum = sum(p['price'] for p in site_products)
+            row.updated_at = now
+
+
+def get_comparison_summary(session, query: str, max_age: timedelta = None) -> Optional[Dict]:
+    """Read the stored comparison for a query; None if untracked or stale"""
+    rows = session.query(ClusterSitePrice).filter_by(cluster_key=cluster_key(query)).all()
+    if not rows:
+        return None
+    updated_at = max(row.updated_at for row in rows)
+    if max_age is not None and datetime.utcnow() - updated_at > max_age:
+        return None
+
+    total = sum(row.product_count for row in rows)
+    return {
+        "total_products": total,
+        "sites": [row.site for row in rows],
+        "price_range": {
+            "min": min(row.best_price for row in rows),
+            "max": max(row.max_price for row in rows),
+            "average": sum(row.price_sum for row in rows) / total if total else 0.0
+        },
+        "by_site": {
+            row.site: {
+                "count": row.product_count,
+                "best_price": row.best_price,
+                "best_name": row.best_name,
+                "best_url": row.best_url,
+                "average": row.price_sum / row.product_count if row.product_count else 0.0
+            }
+            for row in rows
+        },
+        "updated_at": updated_at.isoformat()
+    }
+
+
+def load_suggestions(session, index):
+    """Fill a SuggestionIndex from the stored queries and listings"""
+    queries = session.query(
+        ClusterSitePrice.cluster_key, func.count(ClusterSitePrice.site), func.max(ClusterSitePrice.updated_at)
+    ).group_by(ClusterSitePrice.cluster_key)
+    for query, sites, updated_at in queries:
+        index.add_query(query, sites, updated_at)
+    for name, observations in session.query(ListingPriceStats.name, ListingPriceStats.observations).yield_per(1000):
+        if name:
+            index.add_listing(name, observations or 1)
+    return index
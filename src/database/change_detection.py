@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Mapping, Tuple
+
+from utils.urls import canonical_url
+from .models import ListingFingerprint, ListingPriceStats, QueryListing
+from .aggregates import listing_key, cluster_key
+
+DEFAULT_CHANGES_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'changes.jsonl'
+)
+
+# Fields that make up a listing's content besides its price
+HASH_FIELDS = ('name', 'url', 'image_url', 'brand', 'category', 'description')
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+def content_hash(product: Mapping) -> str:
+    values = [str(product.get(field) or '') for field in HASH_FIELDS]
+    # Tracking parameters change between crawls without the listing changing
+    values[HASH_FIELDS.index('url')] = canonical_url(values[HASH_FIELDS.index('url')])
+    content = '\x1f'.join(values)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ChangeDetector:
+    """Tell which scraped listings actually changed since they were last seen.
+
+    The last price, content hash and stock state of every listing are kept in
+    the ``listing_fingerprints`` table and cached in memory, so a repeated
+    crawl costs one lookup per unseen listing and nothing for the rest.
+    Only new or changed listings need a price-history row. Each search's
+    result set is remembered per query, which is how listings that dropped
+    out of the results are noticed.
+
+    Deltas are dicts with ``type`` one of ``new``, ``price_change``,
+    ``updated`` (same price, other fields changed), ``out_of_stock`` or
+    ``gone``. Search pages don't report stock; ``apply_stock`` takes it
+    from enriched detail pages.
+    """
+
+    def __init__(self):
+        self._known: Dict[str, Tuple[float, str, bool]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, session, keys: List[str]):
+        missing = [key for key in keys if key not in self._known]
+        for i in range(0, len(missing), _IN_CHUNK):
+            for row in session.query(ListingFingerprint).filter(
+                    ListingFingerprint.listing_key.in_(missing[i:i + _IN_CHUNK])):
+                self._known[row.listing_key] = (row.price, row.content_hash, row.in_stock)
+
+    def _delta(self, change_type: str, key: str, product: Mapping, query: str, now: datetime,
+               old_price: float = None) -> Dict:
+        return {
+            'type': change_type,
+            'listing_key': key,
+            'site': product.get('site'),
+            'name': product.get('name'),
+            'url': product.get('url'),
+            'price': product.get('price'),
+            'old_price': old_price,
+            'query': query,
+            'detected_at': now.isoformat()
+        }
+
+    def apply(self, session, products: List[Mapping], query: str = None,
+              members: List[Mapping] = ()) -> Tuple[List[Mapping], List[Dict]]:
+        """Compare a batch with the stored state and record the new state
+
+        Returns the products that are new or changed and the deltas.
+        ``members`` are further listings of the query's results that are not
+        recorded (e.g. quarantined prices) but must not be reported gone.
+        The caller commits the session; call ``reset`` if it rolls back.
+        """
+        now = datetime.utcnow()
+        latest = {}
+        for product in products:
+            latest[listing_key(product)] = product
+
+        changed, deltas = [], []
+        with self._lock:
+            self._load(session, list(latest))
+            for key, product in latest.items():
+                price = product['price']
+                digest = content_hash(product)
+                in_stock = product.get('in_stock')
+                previous = self._known.get(key)
+
+                if previous is None:
+                    deltas.append(self._delta('new', key, product, query, now))
+                else:
+                    old_price, old_digest, was_in_stock = previous
+                    if price != old_price:
+                        deltas.append(self._delta('price_change', key, product, query, now, old_price))
+                    elif digest != old_digest:
+                        deltas.append(self._delta('updated', key, product, query, now, old_price))
+                    elif in_stock is None or in_stock == was_in_stock:
+                        continue
+                    if in_stock is False and was_in_stock is not False:
+                        deltas.append(self._delta('out_of_stock', key, product, query, now, old_price))
+
+                if in_stock is None and previous is not None:
+                    # Listing pages don't report stock; keep what detail pages said
+                    in_stock = previous[2]
+                session.merge(ListingFingerprint(listing_key=key, price=price, content_hash=digest,
+                                                 in_stock=in_stock, updated_at=now))
+                self._known[key] = (price, digest, in_stock)
+                changed.append(product)
+
+        current = set(latest).union(listing_key(product) for product in members)
+        if query and current:
+            deltas.extend(self._update_membership(session, cluster_key(query), current, query, now))
+        return changed, deltas
+
+    def apply_stock(self, session, details: List[Mapping]) -> List[Dict]:
+        """Record the stock state reported by detail pages; returns ``out_of_stock`` deltas
+
+        Only stock is compared: detail pages word names and other fields
+        differently from search results, so their content can't be checked
+        against the stored hash. Listings never recorded by ``apply`` are
+        not tracked. The caller commits the session.
+        """
+        now = datetime.utcnow()
+        latest = {listing_key(detail): detail for detail in details if detail.get('in_stock') is not None}
+        deltas = []
+        with self._lock:
+            self._load(session, list(latest))
+            for key, detail in latest.items():
+                previous = self._known.get(key)
+                in_stock = detail['in_stock']
+                if previous is None or in_stock == previous[2]:
+                    continue
+                price, digest, was_in_stock = previous
+                if in_stock is False:
+                    deltas.append(self._delta('out_of_stock', key, detail, None, now, price))
+                session.query(ListingFingerprint).filter_by(listing_key=key).update(
+                    {'in_stock': in_stock, 'updated_at': now}, synchronize_session=False)
+                self._known[key] = (price, digest, in_stock)
+        return deltas
+
+    def _update_membership(self, session, key: str, current: set, query: str, now: datetime) -> List[Dict]:
+        # Sites are saved separately when results stream in, so only this
+        # batch's sites can have lost listings
+        sites = {listing.split(':', 1)[0] + ':' for listing in current}
+        previous = {row.listing_key for row in
+                    session.query(QueryListing.listing_key).filter_by(cluster_key=key)
+                    if row.listing_key.startswith(tuple(sites))}
+        gone = list(previous - current)
+        deltas = []
+        for i in range(0, len(gone), _IN_CHUNK):
+            chunk = gone[i:i + _IN_CHUNK]
+            for row in session.query(ListingPriceStats).filter(ListingPriceStats.listing_key.in_(chunk)):
+                product = {'site': row.site, 'name': row.name, 'url': row.url, 'price': row.current_price}
+                deltas.append(self._delta('gone', row.listing_key, product, query, now))
+            session.query(QueryListing).filter(
+                QueryListing.cluster_key == key, QueryListing.listing_key.in_(chunk)
+            ).delete(synchronize_session=False)
+        for listing in current - previous:
+            session.add(QueryListing(cluster_key=key, listing_key=listing))
+        return deltas
+
+    def reset(self):
+        """Drop the in-memory state, e.g. after a failed commit"""
+        with self._lock:
+            self._known.clear()
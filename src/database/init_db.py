@@ -3,18 +3,43 @@ import sys
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from .models import Base
+from .migrations import run_migrations
 
-def init_db():
-    """Initialize the database and create tables if they don't exist"""
+def _prepare_sqlite(engine):
+    """Use WAL, so readers carry on during writes and compaction, and
+    incremental auto-vacuum, so the retention job can return free pages to
+    the OS without a full VACUUM (only takes effect in a new file)"""
+    with engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+
+def init_db(db_url: str = None):
+    """Initialize the database and create tables if they don't exist
+    
+    ``db_url`` (or the DATABASE_URL environment variable) selects another
+    database, e.g. a shared Postgres server for multi-node crawling. The
+    default is the local SQLite file in data/.
+    """
+    db_url = db_url or os.environ.get('DATABASE_URL')
+    if db_url:
+        engine = create_engine(db_url)
+        if engine.dialect.name == 'sqlite':
+            _prepare_sqlite(engine)
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        return engine
+    
     # Create data directory if it doesn't exist
     data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
     
-    # Database setup
+    # Database setup; wait for locks held by other processes instead of failing
     db_path = os.path.join(data_dir, 'products.db')
-    engine = create_engine(f'sqlite:///{db_path}')
+    engine = create_engine(f'sqlite:///{db_path}', connect_args={'timeout': 30})
+    _prepare_sqlite(engine)
     Base.metadata.create_all(engine)
+    run_migrations(engine)
     
     return engine
 
@@ -0,0 +1,132 @@
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy.exc import IntegrityError
+
+from .models import (SchemaMigration, ListingPriceStats, ListingFingerprint, QueryListing, PriceRollup,
+                     WatchRule, PriceOutlier)
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+def _merge_stats(rows):
+    survivor = max(rows, key=lambda row: row.last_seen or datetime.min)
+    survivor.min_price = min(row.min_price for row in rows)
+    survivor.max_price = max(row.max_price for row in rows)
+    survivor.observations = sum(row.observations or 0 for row in rows)
+    survivor.first_seen = min((row.first_seen for row in rows if row.first_seen), default=survivor.first_seen)
+    return survivor
+
+
+def _merge_rollups(rows):
+    survivor = rows[0]
+    survivor.high = max(row.high for row in rows)
+    survivor.low = min(row.low for row in rows)
+    survivor.observations = sum(row.observations or 0 for row in rows)
+    return survivor
+
+
+# Model, the other columns of its unique key, and how rows that end up
+# under the same key are merged (None: the key isn't unique)
+_KEYED_TABLES = (
+    (ListingPriceStats, (), _merge_stats),
+    (ListingFingerprint, (), lambda rows: max(rows, key=lambda row: row.updated_at or datetime.min)),
+    (QueryListing, ('cluster_key',), lambda rows: rows[0]),
+    (PriceRollup, ('resolution', 'bucket_start'), _merge_rollups),
+    (WatchRule, None, None),
+    (PriceOutlier, None, None),
+)
+
+
+def rekeyed(key: str) -> str:
+    """The current listing key for one stored as ``site:<scheme://host/path>``
+
+    Listing keys used to be the site plus the URL without its query; they
+    are now the site plus ``listing_identity``, the item id of product pages.
+    """
+    from utils.urls import listing_identity
+
+    site, _, identity = key.partition(':')
+    if identity.startswith(('http://', 'https://', '//')):
+        return f"{site}:{listing_identity(identity)}"
+    return key
+
+
+def _rekey_table(session, model, unique, merge, mapping: Dict[str, str]) -> int:
+    column = model.listing_key
+    if unique is None:
+        moved = 0
+        old_keys = list(mapping)
+        for i in range(0, len(old_keys), _IN_CHUNK):
+            for row in session.query(model).filter(column.in_(old_keys[i:i + _IN_CHUNK])):
+                row.listing_key = mapping[row.listing_key]
+                moved += 1
+        session.flush()
+        return moved
+
+    # Rows already under a new key take part in merges too
+    keys = list(set(mapping) | set(mapping.values()))
+    groups = {}
+    for i in range(0, len(keys), _IN_CHUNK):
+        for row in session.query(model).filter(column.in_(keys[i:i + _IN_CHUNK])):
+            new_key = mapping.get(row.listing_key, row.listing_key)
+            slot = (new_key,) + tuple(getattr(row, name) for name in unique)
+            groups.setdefault(slot, []).append(row)
+
+    survivors = []
+    for (new_key, *_), rows in groups.items():
+        survivor = merge(rows) if len(rows) > 1 else rows[0]
+        for row in rows:
+            if row is not survivor:
+                session.delete(row)
+        if survivor.listing_key != new_key:
+            survivors.append((survivor, new_key))
+    # Duplicates go first so the new keys are free
+    session.flush()
+    for survivor, new_key in survivors:
+        survivor.listing_key = new_key
+    session.flush()
+    return len(survivors)
+
+
+def migrate_listing_keys(session) -> int:
+    """Move rows stored under URL listing keys to item-id keys, merging duplicates (caller commits)"""
+    old_keys = set()
+    for model, _, _ in _KEYED_TABLES:
+        for (key,) in session.query(model.listing_key).filter(model.listing_key.like('%//%')).distinct():
+            old_keys.add(key)
+    mapping = {key: rekeyed(key) for key in old_keys}
+    mapping = {old: new for old, new in mapping.items() if old != new}
+    if not mapping:
+        return 0
+    return sum(_rekey_table(session, model, unique, merge, mapping) for model, unique, merge in _KEYED_TABLES)
+
+
+# Data migrations in the order they were introduced; each runs once per database
+MIGRATIONS = (
+    ('listing_keys_item_id', migrate_listing_keys),
+)
+
+
+def run_migrations(engine):
+    """Apply data migrations not yet recorded in ``schema_migrations``"""
+    from .init_db import get_session
+
+    session = get_session(engine)
+    try:
+        applied = {name for (name,) in session.query(SchemaMigration.name)}
+        for name, migrate in MIGRATIONS:
+            if name in applied:
+                continue
+            migrate(session)
+            session.add(SchemaMigration(name=name))
+            session.commit()
+    except IntegrityError:
+        # Another process applied it at the same time
+        session.rollback()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -20,4 +20,185 @@ class Product(Base):
     scraped_at = Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f"<Product(name='{self.name}', price={self.price}, site='{self.site}')>"
\ No newline at end of file
+        return f"<Product(name='{self.name}', price={self.price}, site='{self.site}')>"
+
+class ProductDetail(Base):
+    __tablename__ = 'product_details'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    url = Column(Text, nullable=False, unique=True)
+    site = Column(String(100), nullable=False)
+    name = Column(String(500))
+    brand = Column(String(100))
+    category = Column(String(100))
+    image_url = Column(Text)
+    images = Column(Text)  # JSON list of image URLs
+    specs = Column(Text)  # JSON object of specification name -> value
+    description = Column(Text)
+    rating = Column(Float)
+    review_count = Column(Integer, default=0)
+    in_stock = Column(Boolean)
+    enriched_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<ProductDetail(url='{self.url}', brand='{self.brand}', enriched_at={self.enriched_at})>"
+
+
+class ListingPriceStats(Base):
+    __tablename__ = 'listing_price_stats'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    listing_key = Column(String(500), nullable=False, unique=True)
+    site = Column(String(100), nullable=False)
+    name = Column(String(500))
+    url = Column(Text)
+    current_price = Column(Float, nullable=False)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    observations = Column(Integer, default=1)
+    first_seen = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.utcnow)
+    last_changed = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ListingPriceStats(listing_key='{self.listing_key}', current_price={self.current_price})>"
+
+
+class ClusterSitePrice(Base):
+    __tablename__ = 'cluster_site_prices'
+    __table_args__ = (UniqueConstraint('cluster_key', 'site'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cluster_key = Column(String(500), nullable=False, index=True)  # Normalized search query
+    site = Column(String(100), nullable=False)
+    product_count = Column(Integer, default=0)
+    best_price = Column(Float)
+    best_name = Column(String(500))
+    best_url = Column(Text)
+    max_price = Column(Float)
+    price_sum = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ClusterSitePrice(cluster_key='{self.cluster_key}', site='{self.site}', best_price={self.best_price})>"
+
+
+class WatchRule(Base):
+    __tablename__ = 'watch_rules'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    query = Column(String(500), index=True)  # Cluster key of a search query
+    listing_key = Column(String(500), index=True)  # A single listing
+    threshold = Column(Float, nullable=False)  # Notify when price <= threshold
+    label = Column(String(200))
+    last_notified_price = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<WatchRule(id={self.id}, query='{self.query}', listing_key='{self.listing_key}', threshold={self.threshold})>"
+
+
+class FrontierTask(Base):
+    __tablename__ = 'frontier_tasks'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dedupe_key = Column(String(1000), nullable=False, unique=True)  # kind:site:target
+    site = Column(String(100), nullable=False)
+    kind = Column(String(10), nullable=False)  # 'query' or 'url'
+    target = Column(Text, nullable=False)
+    host = Column(String(255), nullable=False, index=True)
+    priority = Column(Integer, default=0, index=True)  # Higher runs first
+    not_before = Column(DateTime, default=datetime.utcnow, index=True)
+    status = Column(String(20), default='pending', index=True)  # pending, leased, done, failed
+    lease_owner = Column(String(100))
+    lease_expires = Column(DateTime)
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<FrontierTask(id={self.id}, kind='{self.kind}', target='{self.target}', status='{self.status}')>"
+
+
+class HostPoliteness(Base):
+    __tablename__ = 'host_politeness'
+    
+    host = Column(String(255), primary_key=True)
+    next_allowed_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<HostPoliteness(host='{self.host}', next_allowed_at={self.next_allowed_at})>"
+
+
+class ListingFingerprint(Base):
+    __tablename__ = 'listing_fingerprints'
+    
+    listing_key = Column(String(500), primary_key=True)
+    price = Column(Float, nullable=False)
+    content_hash = Column(String(32), nullable=False)  # Hash of the listing's other fields
+    in_stock = Column(Boolean)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ListingFingerprint(listing_key='{self.listing_key}', price={self.price})>"
+
+
+class QueryListing(Base):
+    __tablename__ = 'query_listings'
+    
+    cluster_key = Column(String(500), primary_key=True)  # Normalized search query
+    listing_key = Column(String(500), primary_key=True)  # Listing in its latest results
+    
+    def __repr__(self):
+        return f"<QueryListing(cluster_key='{self.cluster_key}', listing_key='{self.listing_key}')>"
+
+
+class PriceRollup(Base):
+    __tablename__ = 'price_rollups'
+    __table_args__ = (UniqueConstraint('listing_key', 'resolution', 'bucket_start'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    listing_key = Column(String(500), nullable=False)
+    resolution = Column(String(10), nullable=False)  # 'hour', 'day' or 'week'
+    bucket_start = Column(DateTime, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    observations = Column(Integer, default=0)
+    
+    def __repr__(self):
+        return (f"<PriceRollup(listing_key='{self.listing_key}', resolution='{self.resolution}', "
+                f"bucket_start={self.bucket_start}, close={self.close})>")
+
+
+class PriceOutlier(Base):
+    __tablename__ = 'price_outliers'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    listing_key = Column(String(500), nullable=False, index=True)
+    site = Column(String(100))
+    name = Column(String(500))
+    url = Column(Text)
+    price = Column(Float, nullable=False)
+    query = Column(String(500))  # Cluster key of the search it came from
+    reason = Column(String(20), nullable=False)  # 'invalid', 'jump' or 'cluster'
+    score = Column(Float)  # Robust z-score, or ratio to the last price for jumps
+    reference = Column(Float)  # Cluster median or the listing's last price
+    action = Column(String(20), nullable=False)  # 'flagged' or 'quarantined'
+    detected_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return (f"<PriceOutlier(listing_key='{self.listing_key}', price={self.price}, "
+                f"reason='{self.reason}', action='{self.action}')>")
+
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+    
+    name = Column(String(100), primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SchemaMigration(name='{self.name}', applied_at={self.applied_at})>"
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .models import Product
+from .init_db import get_session
+
+DEFAULT_ARCHIVE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'archive'
+)
+
+# Low-cardinality strings are dictionary-encoded; site and date are hive partitions
+_dict_string = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ('name', pa.string()),
+    ('price', pa.float64()),
+    ('currency', _dict_string),
+    ('url', pa.string()),
+    ('brand', pa.string()),
+    ('category', pa.string()),
+    ('scraped_at', pa.timestamp('us')),
+    ('site', _dict_string),
+    ('date', pa.string()),
+])
+
+PARTITION_COLUMNS = ['site', 'date']
+
+# Partition values are read back dictionary-encoded as well
+READ_PARTITIONING = ds.HivePartitioning.discover(infer_dictionary=True)
+
+COLUMNS = [field.name for field in SCHEMA]
+
+
+class ParquetArchive:
+    """Columnar archive of product observations, partitioned by site and day.
+
+    Layout is ``<root>/site=<site>/date=<YYYY-MM-DD>/part-*.parquet``, so
+    readers filtering on site or date only open the matching directories and
+    other predicates are pushed down to Parquet row-group statistics.
+    """
+
+    def __init__(self, root: str = DEFAULT_ARCHIVE_DIR, rows_per_chunk: int = 50000):
+        self.root = root
+        self.rows_per_chunk = rows_per_chunk
+        self.checkpoint_path = os.path.join(root, '_checkpoint.json')
+        # Concurrent exports would read the same checkpoint and archive rows twice
+        self._export_lock = threading.Lock()
+
+    def _table(self, columns: Dict[str, list]) -> pa.Table:
+        stamps = columns['scraped_at']
+        columns['date'] = [stamp.date().isoformat() for stamp in stamps]
+        arrays = []
+        for field in SCHEMA:
+            values = columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+    def _write(self, table: pa.Table):
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=PARTITION_COLUMNS,
+            partitioning_flavor='hive',
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+
+    def write_products(self, products: List[Dict], scraped_at: datetime = None) -> int:
+        """Append freshly scraped products to the archive"""
+        if not products:
+            return 0
+        scraped_at = scraped_at or datetime.utcnow()
+        columns = {name: [] for name in COLUMNS if name != 'date'}
+        for product in products:
+            for name in ('name', 'price', 'currency', 'url', 'brand', 'category', 'site'):
+                columns[name].append(product.get(name) or None)
+            columns['scraped_at'].append(scraped_at)
+        self._write(self._table(columns))
+        return len(products)
+
+    def exported_through(self) -> int:
+        """Id of the last product row exported, 0 if none"""
+        return self._last_exported_id()
+
+    def _last_exported_id(self) -> int:
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f).get('last_product_id', 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_checkpoint(self, last_id: int):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_product_id': last_id}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def export_from_db(self, engine) -> int:
+        """Incrementally export product rows not yet in the archive"""
+        with self._export_lock:
+            return self._export_from_db(engine)
+
+    def _export_from_db(self, engine) -> int:
+        last_id = self._last_exported_id()
+        exported = 0
+        session = get_session(engine)
+        try:
+            while True:
+                rows = session.query(
+                    Product.id, Product.name, Product.price, Product.currency, Product.url,
+                    Product.brand, Product.category, Product.scraped_at, Product.site
+                ).filter(Product.id > last_id).order_by(Product.id).limit(self.rows_per_chunk).all()
+                if not rows:
+                    break
+
+                columns = {name: [] for name in COLUMNS if name != 'date'}
+                for row in rows:
+                    columns['name'].append(row.name)
+                    columns['price'].append(row.price)
+                    columns['currency'].append(row.currency)
+                    columns['url'].append(row.url)
+                    columns['brand'].append(row.brand or None)
+                    columns['category'].append(row.category or None)
+                    columns['scraped_at'].append(row.scraped_at or datetime.utcnow())
+                    columns['site'].append(row.site)
+                self._write(self._table(columns))
+
+                last_id = rows[-1].id
+                exported += len(rows)
+                self._save_checkpoint(last_id)
+        finally:
+            session.close()
+        return exported
+
+    def dataset(self) -> Optional[ds.Dataset]:
+        """Open the archive as a pyarrow dataset, or None if nothing is archived"""
+        if not os.path.isdir(self.root):
+            return None
+        return ds.dataset(self.root, format='parquet', partitioning=READ_PARTITIONING,
+                          ignore_prefixes=['_', '.'])
+
+    def read(self, columns: List[str] = None, site: str = None, start: date = None,
+             end: date = None, min_price: float = None, max_price: float = None,
+             filter: ds.Expression = None) -> pa.Table:
+        """Read archived rows, pushing site/date/price predicates into the scan"""
+        dataset = self.dataset()
+        if dataset is None:
+            return SCHEMA.empty_table() if columns is None else SCHEMA.empty_table().select(columns)
+
+        expression = filter
+        conditions = []
+        if site is not None:
+            conditions.append(ds.field('site') == site)
+        if start is not None:
+            conditions.append(ds.field('date') >= start.isoformat())
+        if end is not None:
+            conditions.append(ds.field('date') <= end.isoformat())
+        if min_price is not None:
+            conditions.append(ds.field('price') >= min_price)
+        if max_price is not None:
+            conditions.append(ds.field('price') <= max_price)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        return dataset.to_table(columns=columns, filter=expression)
@@ -0,0 +1,184 @@
+import math
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Mapping, Tuple
+
+from .models import ListingPriceStats, PriceOutlier, QueryListing
+from .aggregates import listing_key, cluster_key
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MODES = ('off', 'flag', 'quarantine')
+
+# Scale that makes the MAD of normal data comparable to a standard deviation
+_MAD_SCALE = 0.6745
+# Floor for the MAD of log prices, so near-identical references don't flag small differences
+_MIN_LOG_MAD = 0.05
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+def robust_z(prices: 'np.ndarray', reference: 'np.ndarray') -> Tuple['np.ndarray', float]:
+    """Modified z-scores of log prices against a reference sample, and the reference median
+
+    Prices spread multiplicatively (a premium laptop costs several times a
+    budget one), so scores are computed on log prices.
+    """
+    import numpy as np
+
+    logs = np.log(reference)
+    median = np.median(logs)
+    mad = max(float(np.median(np.abs(logs - median))), _MIN_LOG_MAD)
+    return _MAD_SCALE * (np.log(prices) - median) / mad, math.exp(median)
+
+
+class PriceValidator:
+    """Score each scraped batch against robust price statistics.
+
+    A price is an outlier when it is not a positive number, when it differs
+    from the listing's last stored price by more than ``max_jump`` times, or
+    when its robust z-score against its group exceeds ``threshold``. The
+    group is the search's cluster, with the stored prices of the cluster's
+    listings as history. Batches without a query are grouped by category.
+    A group needs ``min_samples`` prices to be judged.
+
+    Outliers are recorded in ``price_outliers``. With ``mode='quarantine'``
+    they are also kept out of the price history, aggregates and alerts. If
+    the same listing shows up again at the same price, the outlier is
+    confirmed and the price is accepted. This is how genuine price changes
+    and high-end products get through.
+    """
+
+    def __init__(self, mode: str = 'quarantine', threshold: float = 3.5, max_jump: float = 5.0,
+                 min_samples: int = 8):
+        if mode not in MODES:
+            raise ValueError(f"Unknown validation mode: {mode} (use {', '.join(MODES)})")
+        self.mode = mode
+        self.threshold = threshold
+        self.max_jump = max_jump
+        self.min_samples = min_samples
+
+    def _in_chunks(self, session, column, keys: List[str], *columns):
+        for i in range(0, len(keys), _IN_CHUNK):
+            yield from session.query(column, *columns).filter(column.in_(keys[i:i + _IN_CHUNK]))
+
+    def check(self, session, products: List[Mapping], query: str = None) -> Tuple[List[Mapping], List[Dict]]:
+        """Split a batch into accepted products and outliers (recorded in the session)
+
+        In ``flag`` mode every product is accepted; the caller commits.
+        """
+        if self.mode == 'off' or not products:
+            return list(products), []
+        # Imported here so CLI commands that never save a batch start faster
+        import numpy as np
+
+        count = len(products)
+        prices = np.fromiter((float(product['price'] or 0) for product in products), float, count)
+        keys = [listing_key(product) for product in products]
+        reasons = np.full(count, None, dtype=object)
+        scores = np.full(count, np.nan)
+        references = np.full(count, np.nan)
+
+        invalid = ~np.isfinite(prices) | (prices <= 0)
+        reasons[invalid] = 'invalid'
+        valid = ~invalid
+        safe_prices = np.where(valid, prices, 1.0)
+
+        # Against each listing's last stored price
+        last = dict(self._in_chunks(session, ListingPriceStats.listing_key, list(set(keys)),
+                                    ListingPriceStats.current_price))
+        last_prices = np.array([last.get(key) or np.nan for key in keys])
+        ratios = safe_prices / last_prices
+        with np.errstate(invalid='ignore'):
+            jumps = valid & ((ratios > self.max_jump) | (ratios < 1 / self.max_jump))
+        reasons[jumps] = 'jump'
+        scores[jumps] = ratios[jumps]
+        references[jumps] = last_prices[jumps]
+
+        # Against the group's robust statistics
+        if query:
+            key = cluster_key(query)
+            batch = set(keys)
+            # Listings of this batch are judged by their new price only
+            history = np.array([price for stored_key, price in session.query(
+                ListingPriceStats.listing_key, ListingPriceStats.current_price
+            ).join(QueryListing, QueryListing.listing_key == ListingPriceStats.listing_key).filter(
+                QueryListing.cluster_key == key
+            ) if stored_key not in batch and price and price > 0], dtype=float)
+            groups = {key: (np.flatnonzero(valid), history)}
+        else:
+            categories = np.array([product.get('category') or '' for product in products], dtype=object)
+            groups = {category: (np.flatnonzero(valid & (categories == category)), np.empty(0))
+                      for category in set(categories[valid]) if category}
+        for members, history in groups.values():
+            reference = np.concatenate([history, prices[members]])
+            if len(reference) < self.min_samples:
+                continue
+            z, median = robust_z(prices[members], reference)
+            # Listings already flagged keep their first reason
+            hit = (np.abs(z) > self.threshold) & (reasons[members] == None)  # noqa: E711
+            flagged = members[hit]
+            reasons[flagged] = 'cluster'
+            scores[flagged] = z[hit]
+            references[flagged] = median
+
+        outlier_rows = np.flatnonzero(reasons != None)  # noqa: E711
+        if not len(outlier_rows):
+            return list(products), []
+
+        # A repeat sighting at the price that was flagged before confirms it
+        previous = {}
+        for row_key, price in self._in_chunks(session, PriceOutlier.listing_key,
+                                              list({keys[i] for i in outlier_rows}), PriceOutlier.price):
+            previous.setdefault(row_key, []).append(price)
+
+        now = datetime.utcnow()
+        action = 'quarantined' if self.mode == 'quarantine' else 'flagged'
+        rejected = set()
+        outliers = []
+        for i in outlier_rows:
+            product = products[i]
+            if reasons[i] != 'invalid' and any(math.isclose(prices[i], price, rel_tol=0.01)
+                                               for price in previous.get(keys[i], ())):
+                continue
+            outlier = {
+                'listing_key': keys[i],
+                'site': product.get('site'),
+                'name': product.get('name'),
+                'url': product.get('url'),
+                'price': float(prices[i]),
+                'query': cluster_key(query) if query else None,
+                'reason': reasons[i],
+                'score': None if np.isnan(scores[i]) else float(scores[i]),
+                'reference': None if np.isnan(references[i]) else float(references[i]),
+                'action': action,
+            }
+            session.add(PriceOutlier(detected_at=now, **outlier))
+            outliers.append(outlier)
+            if self.mode == 'quarantine':
+                rejected.add(i)
+        accepted = [product for i, product in enumerate(products) if i not in rejected]
+        return accepted, outliers
+
+
+def get_outliers(session, since: datetime = None, reason: str = None, limit: int = 100) -> List[Dict]:
+    """Recorded outliers, newest first"""
+    rows = session.query(PriceOutlier)
+    if since is not None:
+        rows = rows.filter(PriceOutlier.detected_at >= since)
+    if reason:
+        rows = rows.filter(PriceOutlier.reason == reason)
+    return [{
+        'listing_key': row.listing_key,
+        'site': row.site,
+        'name': row.name,
+        'url': row.url,
+        'price': row.price,
+        'query': row.query,
+        'reason': row.reason,
+        'score': row.score,
+        'reference': row.reference,
+        'action': row.action,
+        'detected_at': row.detected_at.isoformat(),
+    } for row in rows.order_by(PriceOutlier.detected_at.desc(), PriceOutlier.id.desc()).limit(limit)]
@@ -0,0 +1,155 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from .models import Product, PriceRollup, PriceOutlier
+from .aggregates import listing_key
+from .init_db import get_session
+
+# Raw observations kept at full resolution
+DEFAULT_RAW_DAYS = 30
+# Hourly OHLC buckets kept; daily and weekly ones are kept for good
+DEFAULT_HOURLY_DAYS = 30
+# Recorded price outliers kept for review
+DEFAULT_OUTLIER_DAYS = 90
+
+
+class RetentionJob:
+    """Keep the hot database small while the full history stays in the archive.
+
+    Each run:
+
+    1. exports product rows not yet archived to the Parquet archive;
+    2. compacts archived rows older than ``raw_days`` to change-points,
+       the first observation of a listing and every one where its price
+       changed (the daily/weekly OHLC rollups keep the shape of the rest);
+    3. drops hourly rollups older than ``hourly_days`` and outliers older
+       than ``outlier_days``;
+    4. returns freed pages to the OS and refreshes planner statistics.
+
+    Rows are deleted in short transactions of ``batch_size`` with a pause
+    in between, so scrapes keep writing while it runs. With SQLite in WAL
+    mode (see ``init_db``) readers are never blocked.
+    """
+
+    def __init__(self, engine, archive=None, raw_days: int = DEFAULT_RAW_DAYS,
+                 hourly_days: int = DEFAULT_HOURLY_DAYS, outlier_days: int = DEFAULT_OUTLIER_DAYS,
+                 batch_size: int = 1000, pause: float = 0.05, vacuum_pages: int = 1000):
+        if archive is None:
+            from .parquet_archive import ParquetArchive
+            archive = ParquetArchive()
+        self.engine = engine
+        self.archive = archive
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.outlier_days = outlier_days
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+
+    def run(self, now: datetime = None) -> Dict:
+        """Archive, compact, prune and vacuum; returns what was done"""
+        now = now or datetime.utcnow()
+        started = time.perf_counter()
+        report = {'archived': self.archive.export_from_db(self.engine)}
+        report['compacted'] = self.compact_products(now - timedelta(days=self.raw_days),
+                                                    self.archive.exported_through())
+        report['hourly_pruned'] = self._delete_before(
+            PriceRollup, PriceRollup.bucket_start, now - timedelta(days=self.hourly_days),
+            PriceRollup.resolution == 'hour')
+        report['outliers_pruned'] = self._delete_before(
+            PriceOutlier, PriceOutlier.detected_at, now - timedelta(days=self.outlier_days))
+        report.update(self.vacuum())
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        return report
+
+    def _delete_ids(self, model, ids: List[int]):
+        for i in range(0, len(ids), self.batch_size):
+            session = get_session(self.engine)
+            try:
+                session.query(model).filter(model.id.in_(ids[i:i + self.batch_size])).delete(
+                    synchronize_session=False)
+                session.commit()
+            finally:
+                session.close()
+            time.sleep(self.pause)
+
+    def _delete_before(self, model, column, cutoff: datetime, *conditions) -> int:
+        session = get_session(self.engine)
+        try:
+            ids = [row.id for row in session.query(model.id).filter(column < cutoff, *conditions)]
+        finally:
+            session.close()
+        self._delete_ids(model, ids)
+        return len(ids)
+
+    def compact_products(self, cutoff: datetime, archived_through: int) -> int:
+        """Delete archived rows older than ``cutoff`` that repeat their listing's previous price"""
+        last_prices = {}
+        redundant = []
+        last_id = 0
+        while True:
+            # Keyset pages in short read transactions
+            session = get_session(self.engine)
+            try:
+                rows = session.query(Product.id, Product.site, Product.url, Product.price).filter(
+                    Product.id > last_id, Product.id <= archived_through, Product.scraped_at < cutoff
+                ).order_by(Product.id).limit(self.batch_size).all()
+            finally:
+                session.close()
+            if not rows:
+                break
+            for row in rows:
+                key = listing_key({'site': row.site, 'url': row.url})
+                if last_prices.get(key) == row.price:
+                    redundant.append(row.id)
+                else:
+                    last_prices[key] = row.price
+            last_id = rows[-1].id
+        self._delete_ids(Product, redundant)
+        return len(redundant)
+
+    def vacuum(self) -> Dict:
+        """Return free pages to the OS and refresh statistics without blocking readers"""
+        if self.engine.dialect.name == 'sqlite':
+            return self._vacuum_sqlite()
+        if self.engine.dialect.name == 'postgresql':
+            # Plain VACUUM runs alongside reads and writes; it can't run in a transaction
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                for table in (Product.__tablename__, PriceRollup.__tablename__, PriceOutlier.__tablename__):
+                    connection.exec_driver_sql(f'VACUUM (ANALYZE) {table}')
+            return {'analyzed': True}
+        return {}
+
+    def _vacuum_sqlite(self) -> Dict:
+        report = {}
+        with self.engine.connect() as connection:
+            if connection.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+                # Files created before init_db enabled incremental mode need
+                # one full VACUUM to switch; readers carry on under WAL
+                connection.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+                connection.exec_driver_sql('VACUUM')
+                report['converted'] = True
+            freed = 0
+            while True:
+                free = connection.exec_driver_sql('PRAGMA freelist_count').scalar()
+                if not free:
+                    break
+                # A few pages per step keeps each write lock short. The pragma frees
+                # one page per step of the statement, which executescript runs to the end
+                connection.commit()
+                connection.connection.driver_connection.executescript(
+                    f'PRAGMA incremental_vacuum({self.vacuum_pages});')
+                freed += min(free, self.vacuum_pages)
+                time.sleep(self.pause)
+            report['pages_freed'] = freed
+            # Approximate statistics from a sample of each index are enough for the planner
+            connection.exec_driver_sql('PRAGMA analysis_limit=1000')
+            connection.exec_driver_sql('ANALYZE')
+            connection.commit()
+            # Copy the WAL into the file and truncate it; this waits for writers, not readers
+            connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+            report['analyzed'] = True
+            report['size_bytes'] = (connection.exec_driver_sql('PRAGMA page_count').scalar() *
+                                    connection.exec_driver_sql('PRAGMA page_size').scalar())
+        return report
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Mapping, Optional
+
+from sqlalchemy import func
+
+from .models import ListingPriceStats, PriceRollup
+from .aggregates import listing_key
+
+# Bucket widths, finest first
+RESOLUTIONS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+DEFAULT_MAX_POINTS = 200
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+def bucket_start(stamp: datetime, resolution: str) -> datetime:
+    """Start of the bucket containing ``stamp``; weeks start on Monday"""
+    start = stamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'hour':
+        return start
+    start = start.replace(hour=0)
+    if resolution == 'day':
+        return start
+    return start - timedelta(days=start.weekday())
+
+
+def update_rollups(session, products: List[Mapping], now: datetime = None):
+    """Fold a scraped batch into the hourly/daily/weekly OHLC rows (caller commits)"""
+    now = now or datetime.utcnow()
+    prices = {}
+    for product in products:
+        prices.setdefault(listing_key(product), []).append(product['price'])
+    keys = list(prices)
+
+    for resolution in RESOLUTIONS:
+        start = bucket_start(now, resolution)
+        existing = {}
+        for i in range(0, len(keys), _IN_CHUNK):
+            for row in session.query(PriceRollup).filter(
+                    PriceRollup.resolution == resolution,
+                    PriceRollup.bucket_start == start,
+                    PriceRollup.listing_key.in_(keys[i:i + _IN_CHUNK])):
+                existing[row.listing_key] = row
+
+        for key, observed in prices.items():
+            row = existing.get(key)
+            if row is None:
+                session.add(PriceRollup(
+                    listing_key=key, resolution=resolution, bucket_start=start,
+                    open=observed[0], high=max(observed), low=min(observed), close=observed[-1],
+                    observations=len(observed)
+                ))
+                continue
+            row.high = max(row.high, *observed)
+            row.low = min(row.low, *observed)
+            row.close = observed[-1]
+            row.observations = (row.observations or 0) + len(observed)
+
+
+def pick_resolution(start: datetime, end: datetime, max_points: int = DEFAULT_MAX_POINTS) -> str:
+    """Finest resolution whose bucket count over the range fits the point budget"""
+    span = end - start
+    for resolution, width in RESOLUTIONS.items():
+        if span / width <= max_points:
+            return resolution
+    return list(RESOLUTIONS)[-1]
+
+
+def _covering_resolution(session, key: str, resolution: str, start: datetime) -> str:
+    """``resolution`` or, where the retention job dropped its old buckets, the
+    finest coarser one that has no data the finer one is missing"""
+    names = list(RESOLUTIONS)
+    index = names.index(resolution)
+    for finer, coarser in zip(names[index:], names[index + 1:]):
+        earliest = session.query(func.min(PriceRollup.bucket_start)).filter(
+            PriceRollup.listing_key == key, PriceRollup.resolution == finer
+        ).scalar()
+        missing = session.query(PriceRollup.id).filter(
+            PriceRollup.listing_key == key,
+            PriceRollup.resolution == coarser,
+            PriceRollup.bucket_start >= bucket_start(start, coarser),
+            PriceRollup.bucket_start < (bucket_start(earliest, coarser) if earliest else datetime.max)
+        ).first()
+        if missing is None:
+            return finer
+    return names[-1]
+
+
+def get_price_history(session, key: str, start: datetime = None, end: datetime = None,
+                      max_points: int = DEFAULT_MAX_POINTS, resolution: str = None) -> Optional[Dict]:
+    """OHLC series for a listing at a resolution suited to the range; None if unknown
+
+    Without ``start`` the series begins when the listing was first seen.
+    Ingest only folds in new or changed listings, so a bucket without a
+    point means the price held at the previous close.
+    """
+    stats = session.query(ListingPriceStats).filter_by(listing_key=key).first()
+    if stats is None:
+        return None
+    end = end or datetime.utcnow()
+    start = start or stats.first_seen or end - timedelta(days=7)
+    if resolution is None:
+        resolution = _covering_resolution(session, key, pick_resolution(start, end, max_points), start)
+    elif resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution} (use {', '.join(RESOLUTIONS)})")
+
+    rows = session.query(PriceRollup).filter(
+        PriceRollup.listing_key == key,
+        PriceRollup.resolution == resolution,
+        PriceRollup.bucket_start >= bucket_start(start, resolution),
+        PriceRollup.bucket_start <= end
+    ).order_by(PriceRollup.bucket_start).all()
+    # An explicit resolution may exceed the budget; keep the most recent buckets
+    rows = rows[-max_points:]
+
+    return {
+        "listing_key": key,
+        "name": stats.name,
+        "site": stats.site,
+        "url": stats.url,
+        "resolution": resolution,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": [
+            {
+                "time": row.bucket_start.isoformat(),
+                "open": row.open,
+                "high": row.high,
+                "low": row.low,
+                "close": row.close,
+                "observations": row.observations
+            }
+            for row in rows
+        ]
+    }
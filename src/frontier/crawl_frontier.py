@@ -0,0 +1,207 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from database.models import FrontierTask, HostPoliteness
+from database.init_db import get_session
+from utils.urls import canonical_url, listing_identity
+
+DEFAULT_SEEN_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'frontier_seen'
+)
+
+
+def task_dedupe_key(kind: str, site: str, target: str) -> str:
+    if kind == 'url':
+        # Tracking parameters and slug variants of one product share a key
+        target = listing_identity(target)
+    return f"{kind}:{site}:{target}"
+
+
+class CrawlFrontier:
+    """Durable work queue of crawl tasks shared by many worker processes.
+
+    Tasks are leased rather than popped: a lease expires after the
+    visibility timeout, after which another worker may take the task. Every
+    state change is a conditional UPDATE, so the queue stays consistent with
+    concurrent workers on SQLite or Postgres. Politeness is enforced per
+    host across all workers: a host is claimed by moving its
+    ``next_allowed_at`` forward before one of its tasks is leased.
+
+    ``seen`` is an optional persistent set (e.g. ScalableBloomFilter) of
+    product URL keys ever queued, checked before touching the database so
+    re-discovered listings cost no queries.
+    """
+
+    def __init__(self, engine, host_interval: float = 5.0, visibility_timeout: float = 300,
+                 max_attempts: int = 3, retry_delay: float = 60, seen=None):
+        self.engine = engine
+        self.seen = seen
+        self.host_interval = timedelta(seconds=host_interval)
+        self.visibility_timeout = timedelta(seconds=visibility_timeout)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def enqueue(self, site: str, kind: str, target: str, host: str = None,
+                priority: int = 0, not_before: datetime = None, revisit: bool = False) -> bool:
+        """Add a task; re-queue it if it already finished. Returns True if queued
+
+        Product URLs already in the seen-set are skipped unless ``revisit``.
+        """
+        if kind == 'url':
+            target = canonical_url(target)
+        host = host or urlsplit(target).netloc
+        key = task_dedupe_key(kind, site, target)
+        use_seen = self.seen is not None and kind == 'url'
+        if use_seen and not revisit and key in self.seen:
+            return False
+        now = datetime.utcnow()
+        session = get_session(self.engine)
+        try:
+            session.add(FrontierTask(
+                dedupe_key=key, site=site, kind=kind, target=target, host=host,
+                priority=priority, not_before=not_before or now, created_at=now, updated_at=now
+            ))
+            session.commit()
+            queued = True
+        except IntegrityError:
+            session.rollback()
+            # Already known: revive finished tasks, never touch leased ones
+            revived = session.execute(
+                update(FrontierTask)
+                .where(FrontierTask.dedupe_key == key, FrontierTask.status.in_(['done', 'failed']))
+                .values(status='pending', priority=priority, not_before=not_before or now,
+                        attempts=0, last_error=None, updated_at=now)
+            ).rowcount
+            session.commit()
+            queued = bool(revived)
+        finally:
+            session.close()
+        # Only once the task is stored, so a failed insert can be retried
+        if use_seen:
+            self.seen.add(key)
+        return queued
+
+    def _claimable(self, now: datetime):
+        return and_(
+            FrontierTask.not_before <= now,
+            or_(FrontierTask.status == 'pending',
+                and_(FrontierTask.status == 'leased', FrontierTask.lease_expires < now))
+        )
+
+    def _claim_host(self, session, host: str, now: datetime) -> bool:
+        """Atomically reserve the next request slot for a host"""
+        claimed = session.execute(
+            update(HostPoliteness)
+            .where(HostPoliteness.host == host, HostPoliteness.next_allowed_at <= now)
+            .values(next_allowed_at=now + self.host_interval)
+        ).rowcount
+        session.commit()
+        if claimed:
+            return True
+        if session.get(HostPoliteness, host) is not None:
+            return False
+        try:
+            session.add(HostPoliteness(host=host, next_allowed_at=now + self.host_interval))
+            session.commit()
+            return True
+        except IntegrityError:
+            # Another worker registered the host first
+            session.rollback()
+            return False
+
+    def lease(self, worker_id: str, max_tasks: int = 1) -> List[FrontierTask]:
+        """Lease up to ``max_tasks`` ready tasks, at most one per host"""
+        now = datetime.utcnow()
+        leased = []
+        session = get_session(self.engine)
+        try:
+            candidates = session.query(FrontierTask.id, FrontierTask.host).filter(
+                self._claimable(now)
+            ).order_by(FrontierTask.priority.desc(), FrontierTask.not_before).limit(max_tasks * 20).all()
+            session.commit()
+
+            by_host = {}
+            for candidate in candidates:
+                by_host.setdefault(candidate.host, []).append(candidate.id)
+
+            for host, task_ids in by_host.items():
+                if len(leased) >= max_tasks:
+                    break
+                if not self._claim_host(session, host, now):
+                    continue
+                for task_id in task_ids:
+                    claimed = session.execute(
+                        update(FrontierTask)
+                        .where(FrontierTask.id == task_id, self._claimable(now))
+                        .values(status='leased', lease_owner=worker_id,
+                                lease_expires=now + self.visibility_timeout,
+                                attempts=FrontierTask.attempts + 1, updated_at=now)
+                    ).rowcount
+                    session.commit()
+                    if claimed:
+                        leased.append(task_id)
+                        break
+            if not leased:
+                return []
+            tasks = {task.id: task for task in session.query(FrontierTask).filter(FrontierTask.id.in_(leased))}
+            session.expunge_all()
+            return [tasks[task_id] for task_id in leased]
+        finally:
+            session.close()
+
+    def _finish(self, task: FrontierTask, worker_id: str, **values) -> bool:
+        session = get_session(self.engine)
+        try:
+            updated = session.execute(
+                update(FrontierTask)
+                .where(FrontierTask.id == task.id, FrontierTask.status == 'leased',
+                       FrontierTask.lease_owner == worker_id)
+                .values(updated_at=datetime.utcnow(), **values)
+            ).rowcount
+            session.commit()
+            return bool(updated)
+        finally:
+            session.close()
+
+    def ack(self, task: FrontierTask, worker_id: str) -> bool:
+        """Mark a leased task done; False if the lease was lost to another worker"""
+        return self._finish(task, worker_id, status='done', lease_owner=None, lease_expires=None)
+
+    def nack(self, task: FrontierTask, worker_id: str, error: str = None) -> bool:
+        """Return a failed task to the queue with backoff, or fail it for good"""
+        if (task.attempts or 0) >= self.max_attempts:
+            return self._finish(task, worker_id, status='failed', last_error=error,
+                                lease_owner=None, lease_expires=None)
+        delay = timedelta(seconds=self.retry_delay * 2 ** max((task.attempts or 1) - 1, 0))
+        return self._finish(task, worker_id, status='pending', last_error=error,
+                            not_before=datetime.utcnow() + delay, lease_owner=None, lease_expires=None)
+
+    def extend(self, task: FrontierTask, worker_id: str) -> bool:
+        """Push a lease's expiry forward for long-running tasks"""
+        return self._finish(task, worker_id, lease_expires=datetime.utcnow() + self.visibility_timeout)
+
+    def stats(self) -> Dict[str, int]:
+        session = get_session(self.engine)
+        try:
+            rows = session.query(FrontierTask.status, func.count(FrontierTask.id)).group_by(
+                FrontierTask.status).all()
+            return {status: count for status, count in rows}
+        finally:
+            session.close()
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until the earliest pending task becomes ready, None if queue is empty"""
+        session = get_session(self.engine)
+        try:
+            earliest = session.query(func.min(FrontierTask.not_before)).filter(
+                FrontierTask.status.in_(['pending', 'leased'])).scalar()
+            if earliest is None:
+                return None
+            return max((earliest - datetime.utcnow()).total_seconds(), 0.0)
+        finally:
+            session.close()
@@ -0,0 +1,78 @@
+import os
+import socket
+import time
+from typing import Dict, Iterable, List
+
+from frontier.crawl_frontier import CrawlFrontier
+from scrappers.base_scraper import FetchError
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_tasks(frontier: CrawlFrontier, tasks: Iterable, hosts: Dict[str, str],
+                  priority: int = 0, revisit: bool = False) -> int:
+    """Queue (kind, site, target) tasks as read by batch.read_tasks"""
+    queued = 0
+    for kind, site, target in tasks:
+        host = hosts.get(site) if kind == 'query' else None
+        if frontier.enqueue(site, kind, target, host=host, priority=priority, revisit=revisit):
+            queued += 1
+    return queued
+
+
+class FrontierWorker:
+    """Lease tasks from the frontier, scrape them and save the results"""
+
+    def __init__(self, frontier: CrawlFrontier, scraper_manager, worker_id: str = None,
+                 poll_interval: float = 1.0):
+        self.frontier = frontier
+        self.scraper_manager = scraper_manager
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+
+    def _run_task(self, task) -> List[Dict]:
+        from batch import PRODUCT_FIELDS
+
+        with self.scraper_manager.get_pool(task.site).scraper() as scraper:
+            if task.kind == 'query':
+                products = scraper.search_products(task.target)
+            else:
+                detail = scraper.get_product_details(task.target)
+                if not detail:
+                    raise FetchError(f"Could not fetch {task.target}")
+                products = [detail] if detail.get('price') else []
+        rows = [{field: product.get(field, '') for field in PRODUCT_FIELDS} for product in products]
+        if rows:
+            self.scraper_manager.save_products_to_db(rows, task.target if task.kind == 'query' else None)
+        return rows
+
+    def run(self, max_tasks: int = None, exit_when_empty: bool = False) -> Dict:
+        stats = {'completed': 0, 'failed': 0, 'lost': 0, 'products': 0}
+        while max_tasks is None or stats['completed'] + stats['failed'] < max_tasks:
+            leased = self.frontier.lease(self.worker_id)
+            if not leased:
+                wait = self.frontier.next_ready_in()
+                if wait is None and exit_when_empty:
+                    break
+                # Ready tasks may still be held back by host politeness
+                time.sleep(min(max(wait or 0, self.poll_interval), 30))
+                continue
+
+            task = leased[0]
+            try:
+                products = self._run_task(task)
+            except Exception as e:
+                print(f"Error running {task.kind} '{task.target}' on {task.site}: {str(e)}")
+                self.frontier.nack(task, self.worker_id, str(e))
+                stats['failed'] += 1
+                continue
+
+            if self.frontier.ack(task, self.worker_id):
+                stats['completed'] += 1
+                stats['products'] += len(products)
+            else:
+                # The lease expired and another worker took the task over
+                stats['lost'] += 1
+        return stats
@@ -0,0 +1,341 @@
+import math
+import os
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List, Sequence
+from urllib.parse import quote
+
+from sqlalchemy import event
+
+from loadtest.marketplace import StandInMarketplace
+
+DEFAULT_QUERIES = ('samsung smartphone', 'laptop', 'xiaomi', 'headphones', 'apple tablet',
+                   'jbl speaker', 'smartwatch', 'dell laptop pro', 'sony headphones', 'realme')
+
+# API endpoint per workload name
+ENDPOINTS = {
+    'search': '/products/search/{query}',
+    'compare': '/products/compare/{query}',
+    'cached': '/products/compare/{query}?max_age=300',
+    'stream': '/products/compare/{query}/stream',
+}
+
+DEFAULT_MIX = {'compare': 1, 'stream': 1}
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values (0.0 if empty)"""
+    if not values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'compare=2,stream=1' -> {'compare': 2.0, 'stream': 1.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (use {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _rss(pid) -> int:
+    """Resident memory of a process in bytes, 0 if it is gone"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _descendants(pid) -> List[int]:
+    found, pending = [], [pid]
+    while pending:
+        parent = pending.pop()
+        try:
+            tasks = os.listdir(f'/proc/{parent}/task')
+        except OSError:
+            continue
+        for task in tasks:
+            try:
+                with open(f'/proc/{parent}/task/{task}/children') as f:
+                    children = [int(child) for child in f.read().split()]
+            except OSError:
+                continue
+            found.extend(children)
+            pending.extend(children)
+    return found
+
+
+class MemorySampler:
+    """Peak resident memory of this process and its children (browsers) while running
+
+    Reads /proc, so it reports nothing on systems without it.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_children_rss = 0
+        self.peak_children = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        pid = os.getpid()
+        children = _descendants(pid)
+        self.peak_rss = max(self.peak_rss, _rss(pid))
+        self.peak_children_rss = max(self.peak_children_rss, sum(_rss(child) for child in children))
+        self.peak_children = max(self.peak_children, len(children))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def start(self) -> 'MemorySampler':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+class DBContention:
+    """Statement timings, lock errors and connection use of an engine
+
+    With SQLite a writer waits for the file lock inside the statement (up to
+    the busy timeout), so slow writes and ``database is locked`` errors are
+    where contention between concurrent requests shows up.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.write_times: List[float] = []
+        self.read_times: List[float] = []
+        self.lock_errors = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+        event.listen(engine, 'handle_error', self._error)
+        event.listen(engine.pool, 'checkout', self._checkout)
+        event.listen(engine.pool, 'checkin', self._checkin)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('loadtest_start', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['loadtest_start'].pop()
+        write = not statement.lstrip().upper().startswith('SELECT')
+        with self._lock:
+            (self.write_times if write else self.read_times).append(elapsed)
+
+    def _error(self, context):
+        starts = context.connection.info.get('loadtest_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+        if 'locked' in str(context.original_exception):
+            with self._lock:
+                self.lock_errors += 1
+
+    def _checkout(self, dbapi_connection, record, proxy):
+        with self._lock:
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _checkin(self, dbapi_connection, record):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def report(self) -> Dict:
+        writes, reads = sorted(self.write_times), sorted(self.read_times)
+        return {
+            'writes': len(writes),
+            'write_p50_ms': percentile(writes, 50) * 1000,
+            'write_p99_ms': percentile(writes, 99) * 1000,
+            'write_max_ms': (writes[-1] if writes else 0.0) * 1000,
+            'reads': len(reads),
+            'read_p99_ms': percentile(reads, 99) * 1000,
+            'lock_errors': self.lock_errors,
+            'peak_connections': self.peak_checked_out,
+        }
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class _APIServer:
+    """The FastAPI app served by uvicorn in a background thread"""
+
+    def __init__(self, app, host: str = '127.0.0.1'):
+        import uvicorn
+        self.url = f"http://{host}:{_free_port(host)}"
+        port = int(self.url.rsplit(':', 1)[1])
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level='warning'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("API server failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def _user(base_url: str, mix: Dict[str, float], queries: Sequence[str], deadline: float,
+          seed: int, results: List, timeout: float):
+    import requests
+
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    with requests.Session() as session:
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            url = base_url + ENDPOINTS[name].format(query=quote(rng.choice(queries)))
+            start = time.perf_counter()
+            first = None
+            try:
+                with session.get(url, stream=True, timeout=timeout) as response:
+                    for chunk in response.iter_content(chunk_size=None):
+                        if first is None and chunk:
+                            first = time.perf_counter() - start
+                    ok = response.status_code == 200
+            except Exception:
+                ok = False
+            results.append((name, time.perf_counter() - start, first, ok))
+
+
+def _latency_summary(samples: List[tuple], elapsed: float) -> Dict:
+    latencies = sorted(latency for _, latency, _, _ in samples)
+    firsts = sorted(first for _, _, first, _ in samples if first is not None)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if not sample[3]),
+        'throughput': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'first_byte_p50_ms': percentile(firsts, 50) * 1000,
+    }
+
+
+def run_load_test(users: int = 8, duration: float = 30.0, mix: Dict[str, float] = None,
+                  queries: Sequence[str] = DEFAULT_QUERIES, catalog_size: int = 2000,
+                  latency: float = 0.2, error_rate: float = 0.0, browser: bool = False,
+                  db_url: str = None, timeout: float = 60.0, seed: int = 0,
+                  challenge_rate: float = 0.0) -> Dict:
+    """Load-test the API against a local stand-in marketplace
+
+    Starts the stand-in, points the Daraz scraper at it (over plain HTTP, or
+    through Chrome with ``browser``), serves the API on a local port and
+    runs ``users`` concurrent clients for ``duration`` seconds. Politeness
+    delays are off since the only server is local. Without ``db_url`` a
+    scratch SQLite database is used and deleted afterwards. Scraper sessions
+    always start from a scratch directory, since the stand-in's cookies
+    don't outlive it.
+    """
+    from scrappers.scraper_manager import ScraperManager
+    from api import main as api_main
+
+    mix = mix or DEFAULT_MIX
+    tmpdir = tempfile.mkdtemp(prefix='loadtest-')
+    if db_url is None:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'products.db')}"
+
+    marketplace = StandInMarketplace(catalog_size=catalog_size, latency=latency, error_rate=error_rate,
+                                     seed=seed, challenge_rate=challenge_rate).start()
+    manager = ScraperManager(
+        scraper_options={'Daraz': {'base_url': marketplace.base_url, 'use_selenium': browser,
+                                   'delay_range': (0, 0)}},
+        db_url=db_url, alert_sinks=[], change_sinks=[], site_delay=0,
+        session_dir=os.path.join(tmpdir, 'sessions')
+    )
+    contention = DBContention(manager.engine)
+    original_manager, api_main.scraper_manager = api_main.scraper_manager, manager
+    server = _APIServer(api_main.app)
+    memory = MemorySampler()
+    results: List[tuple] = []
+    try:
+        server.start()
+        memory.start()
+        started = time.monotonic()
+        deadline = started + duration
+        threads = [threading.Thread(target=_user, args=(server.url, mix, queries, deadline, seed + i,
+                                                        results, timeout))
+                   for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        memory.stop()
+    finally:
+        server.stop()
+        api_main.scraper_manager = original_manager
+        manager.close()
+        manager.engine.dispose()
+        marketplace.stop()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    by_endpoint = {}
+    for sample in results:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        'users': users,
+        'duration': elapsed,
+        'overall': _latency_summary(results, elapsed),
+        'endpoints': {name: _latency_summary(samples, elapsed) for name, samples in sorted(by_endpoint.items())},
+        'memory': {
+            'peak_rss_mb': memory.peak_rss / 2 ** 20,
+            'peak_browser_rss_mb': memory.peak_children_rss / 2 ** 20,
+            'peak_child_processes': memory.peak_children,
+        },
+        'db': contention.report(),
+        'marketplace': dict(marketplace.stats),
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"{report['users']} users for {report['duration']:.1f}s", '']
+    header = f"{'endpoint':<10} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttfb ms':>8}"
+    lines.append(header)
+    rows = list(report['endpoints'].items()) + [('all', report['overall'])]
+    for name, stats in rows:
+        lines.append(f"{name:<10} {stats['requests']:>8} {stats['errors']:>6} {stats['throughput']:>7.2f} "
+                     f"{stats['p50_ms']:>8.0f} {stats['p95_ms']:>8.0f} {stats['p99_ms']:>8.0f} "
+                     f"{stats['first_byte_p50_ms']:>8.0f}")
+    memory, db, marketplace = report['memory'], report['db'], report['marketplace']
+    lines += [
+        '',
+        f"Memory: {memory['peak_rss_mb']:.0f} MB peak RSS; child processes (browsers): "
+        f"{memory['peak_child_processes']} using {memory['peak_browser_rss_mb']:.0f} MB at peak",
+        f"Database: {db['writes']} writes (p50 {db['write_p50_ms']:.1f} ms, p99 {db['write_p99_ms']:.1f} ms, "
+        f"max {db['write_max_ms']:.1f} ms), {db['reads']} reads (p99 {db['read_p99_ms']:.1f} ms), "
+        f"{db['lock_errors']} lock errors, {db['peak_connections']} connections at peak",
+        f"Stand-in marketplace: {marketplace['requests']} pages served, {marketplace['errors']} error responses, "
+        f"{marketplace['challenges']} challenge pages",
+    ]
+    return '\n'.join(lines)
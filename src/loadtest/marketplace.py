@@ -0,0 +1,216 @@
+import html
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+BRANDS = ('Samsung', 'Xiaomi', 'Apple', 'Realme', 'Lenovo', 'HP', 'Dell', 'Asus', 'Sony', 'JBL')
+CATEGORIES = (
+    ('smartphone', 15000, 180000),
+    ('laptop', 45000, 350000),
+    ('headphones', 1200, 45000),
+    ('smartwatch', 2500, 60000),
+    ('tablet', 18000, 150000),
+    ('speaker', 1500, 40000),
+)
+VARIANTS = ('4GB/64GB', '8GB/128GB', '12GB/256GB', 'Pro', 'Lite', 'Max', '2024 Edition')
+
+# Products per search result page, as on the real site
+PAGE_SIZE = 40
+
+# Served instead of content to challenged visitors, like Daraz's slider captcha
+CHALLENGE_PAGE = ('<html><head><title>Verify</title></head><body>'
+                  '<script>location.href="/_____tmd_____/punish?x5secdata=stand-in"</script></body></html>')
+
+
+def make_catalog(size: int, seed: int = 0) -> List[Dict]:
+    """Deterministic catalog of electronics listings"""
+    rng = random.Random(seed)
+    catalog = []
+    for item_id in range(1, size + 1):
+        brand = rng.choice(BRANDS)
+        category, low, high = rng.choice(CATEGORIES)
+        name = f"{brand} {category.title()} {rng.choice(VARIANTS)} Model {item_id}"
+        price = rng.randrange(low, high, 10)
+        catalog.append({
+            'id': item_id,
+            'name': name,
+            'brand': brand,
+            'category': category,
+            'price': price,
+            'original_price': price + rng.randrange(0, price // 4 + 10, 10),
+            'slug': re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-'),
+        })
+    return catalog
+
+
+class StandInMarketplace:
+    """Local HTTP server that serves Daraz-shaped search and product pages.
+
+    Used to load-test the scrapers and API without network access. Every
+    response is delayed by ``latency`` seconds (uniformly jittered by
+    ``jitter`` of that) and fails with a 503 with probability
+    ``error_rate``. Searches match catalog names word by word; queries with
+    few matches are padded with other listings so every page is full, as
+    marketplaces do.
+
+    With ``challenge_rate``, visitors without a clearance cookie get a
+    captcha page with that probability. Every page served sets the cookie,
+    so clients that keep their cookies are not challenged again.
+    """
+
+    def __init__(self, catalog_size: int = 2000, latency: float = 0.2, error_rate: float = 0.0,
+                 jitter: float = 0.5, host: str = '127.0.0.1', port: int = 0, seed: int = 0,
+                 challenge_rate: float = 0.0):
+        self.catalog = make_catalog(catalog_size, seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.challenge_rate = challenge_rate
+        self._cleared = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'challenges': 0, 'bytes': 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StandInMarketplace':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def search(self, query: str) -> List[Dict]:
+        words = [word for word in query.lower().split() if word]
+        matches = [product for product in self.catalog
+                   if all(word in product['name'].lower() for word in words)]
+        if len(matches) < PAGE_SIZE:
+            # Stable padding per query, like a marketplace's "related items"
+            rng = random.Random(query)
+            others = rng.sample(self.catalog, min(PAGE_SIZE, len(self.catalog)))
+            matches += [product for product in others if product not in matches]
+        return matches[:PAGE_SIZE]
+
+    def product(self, item_id: int) -> Dict:
+        if 1 <= item_id <= len(self.catalog):
+            return self.catalog[item_id - 1]
+        return None
+
+    def _card(self, product: Dict) -> str:
+        url = f"{self.base_url}/products/{product['slug']}-i{product['id']}.html"
+        name = html.escape(product['name'])
+        return (
+            f'<div data-qa-locator="product-item" data-item-id="{product["id"]}"><div class="inner">'
+            f'<div class="img"><a href="{url}"><img src="{self.base_url}/img/{product["id"]}.jpg"></a></div>'
+            f'<div class="title"><a href="{url}" title="{name}">{name}</a></div>'
+            f'<div class="price"><span class="currency">Rs. {product["price"]:,}</span></div>'
+            f'<div class="origin-price"><del>Rs. {product["original_price"]:,}</del></div>'
+            f'<div class="rating">' + '<i class="star"></i>' * 4 + '</div></div></div>'
+        )
+
+    def search_page(self, query: str) -> str:
+        cards = ''.join(self._card(product) for product in self.search(query))
+        nav = '<div class="nav"><ul>' + '<li><a href="/c/electronics">Electronics</a></li>' * 200 + '</ul></div>'
+        return (f'<html><head><title>{html.escape(query)} - Buy {html.escape(query)} at Best Price</title></head>'
+                f'<body>{nav}<div class="grid">{cards}</div>{nav}</body></html>')
+
+    def product_page(self, product: Dict) -> str:
+        data = {
+            '@context': 'https://schema.org', '@type': 'Product', 'name': product['name'],
+            'brand': {'@type': 'Brand', 'name': product['brand']}, 'category': product['category'],
+            'offers': {'@type': 'Offer', 'price': product['price'], 'priceCurrency': 'NPR'},
+        }
+        return (f'<html><head><title>{html.escape(product["name"])}</title>'
+                f'<script type="application/ld+json">{json.dumps(data)}</script></head>'
+                f'<body><h1 class="pdp-mod-product-badge-title">{html.escape(product["name"])}</h1>'
+                f'<span class="pdp-price">Rs. {product["price"]:,}</span></body></html>')
+
+    def _delay_and_fail(self) -> bool:
+        """Sleep for the configured latency; True if this request should fail"""
+        with self._lock:
+            delay = self.latency * (1 + self.jitter * (2 * self._rng.random() - 1))
+            fail = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def _clearance(self, cookie_header: str):
+        """The visitor's clearance token, a new one, or None to challenge them"""
+        if not self.challenge_rate:
+            return ''
+        token = re.search(r'x5sec=(\w+)', cookie_header or '')
+        with self._lock:
+            if token and token.group(1) in self._cleared:
+                return token.group(1)
+            if self._rng.random() < self.challenge_rate:
+                return None
+            token = uuid.uuid4().hex
+            self._cleared.add(token)
+            return token
+
+    def _handler_class(self):
+        marketplace = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fail = marketplace._delay_and_fail()
+                parsed = urlparse(self.path)
+                item = re.search(r'-i(\d+)\.html$', parsed.path)
+                token = marketplace._clearance(self.headers.get('Cookie'))
+                if fail:
+                    self._send(503, '<html><body>Service Unavailable</body></html>', error=True)
+                elif token is None:
+                    with marketplace._lock:
+                        marketplace.stats['challenges'] += 1
+                    self._send(200, CHALLENGE_PAGE)
+                elif parsed.path.rstrip('/') == '/catalog':
+                    query = parse_qs(parsed.query).get('q', [''])[0]
+                    self._send(200, marketplace.search_page(query), token=token)
+                elif item and marketplace.product(int(item.group(1))):
+                    self._send(200, marketplace.product_page(marketplace.product(int(item.group(1)))),
+                               token=token)
+                else:
+                    self._send(404, '<html><body>Not Found</body></html>', error=True)
+
+            def _send(self, status: int, body: str, error: bool = False, token: str = None):
+                payload = body.encode('utf-8')
+                with marketplace._lock:
+                    marketplace.stats['requests'] += 1
+                    marketplace.stats['errors'] += error
+                    marketplace.stats['bytes'] += len(payload)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                if status == 503:
+                    self.send_header('Retry-After', '1')
+                if token:
+                    self.send_header('Set-Cookie', f'x5sec={token}; Path=/; Max-Age=86400')
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -6,7 +6,6 @@ This script compares prices of electronics products across multiple Nepalese e-c
 
 import sys
 import argparse
-import pandas as pd
 import os
 
 # Add the parent directory to the path for imports
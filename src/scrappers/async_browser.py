@@ -0,0 +1,146 @@
+import asyncio
+import random
+import threading
+from typing import List, Optional
+
+from fake_useragent import UserAgent
+
+
+class AsyncBrowserPool:
+    """A single headless browser process rendering many pages concurrently.
+
+    Every page is rendered in its own isolated browser context (separate
+    cookies/storage), and at most ``max_tabs`` contexts are open at once.
+    A context is given the user agent, headers and cookies of the scraper's
+    identity when it has one, and the cookies it ends with are kept.
+    The asyncio loop runs in a background thread so synchronous scrapers
+    can call ``fetch``/``fetch_many`` without becoming async themselves.
+    """
+
+    _shared = None
+    _shared_refs = 0
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_tabs: int = 4, headless: bool = True,
+                 delay_range=(2, 5), nav_timeout: int = 15000):
+        self.max_tabs = max_tabs
+        self.headless = headless
+        self.delay_range = delay_range
+        self.nav_timeout = nav_timeout
+        self.ua = UserAgent()
+
+        self._playwright = None
+        self._browser = None
+        self._semaphore = None
+        self._startup = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls, **kwargs) -> 'AsyncBrowserPool':
+        """Return the process-wide pool, creating it on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**kwargs)
+            cls._shared_refs += 1
+            return cls._shared
+
+    @classmethod
+    def release_shared(cls):
+        """Drop a reference to the shared pool and close it when unused"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                return
+            cls._shared_refs -= 1
+            if cls._shared_refs <= 0:
+                cls._shared.close()
+                cls._shared = None
+                cls._shared_refs = 0
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _ensure_browser(self):
+        if self._browser is None:
+            if self._startup is None:
+                self._startup = asyncio.Lock()
+            # The first fetch_many starts many renders at once; only one launches
+            async with self._startup:
+                if self._browser is None:
+                    # Imported lazily so the Selenium path does not require Playwright
+                    from playwright.async_api import async_playwright
+
+                    self._playwright = await async_playwright().start()
+                    self._semaphore = asyncio.Semaphore(self.max_tabs)
+                    self._browser = await self._playwright.chromium.launch(
+                        headless=self.headless,
+                        args=['--no-sandbox', '--disable-dev-shm-usage']
+                    )
+        return self._browser
+
+    async def _new_context(self, browser, identity):
+        if identity is None:
+            return await browser.new_context(user_agent=self.ua.random)
+        headers = {name: value for name, value in identity.headers.items() if name != 'User-Agent'}
+        context = await browser.new_context(user_agent=identity.user_agent, extra_http_headers=headers)
+        cookies = [{'name': c['name'], 'value': c['value'], 'domain': c['domain'], 'path': c.get('path') or '/',
+                    'expires': c.get('expires') or -1, 'secure': bool(c.get('secure'))}
+                   for c in identity.cookies if c.get('domain')]
+        if cookies:
+            await context.add_cookies(cookies)
+        return context
+
+    async def _render(self, url: str, identity=None) -> Optional[str]:
+        browser = await self._ensure_browser()
+        async with self._semaphore:
+            context = await self._new_context(browser, identity)
+            try:
+                page = await context.new_page()
+                await page.goto(url, wait_until='domcontentloaded', timeout=self.nav_timeout)
+                # Give client-side rendering a moment, like the Selenium path does
+                await asyncio.sleep(random.uniform(*self.delay_range))
+                try:
+                    await page.wait_for_selector('body', timeout=10000)
+                except Exception:
+                    pass  # Continue even if wait times out
+                html = await page.content()
+                if identity is not None:
+                    identity.cookies = [{'name': c['name'], 'value': c['value'], 'domain': c['domain'],
+                                         'path': c['path'], 'secure': c['secure'],
+                                         'expires': c['expires'] if c['expires'] > 0 else None}
+                                        for c in await context.cookies()]
+                return html
+            except Exception as e:
+                print(f"Browser error fetching {url}: {str(e)}")
+                return None
+            finally:
+                await context.close()
+
+    async def _render_many(self, urls: List[str], identity=None) -> List[Optional[str]]:
+        return await asyncio.gather(*(self._render(url, identity) for url in urls))
+
+    def fetch(self, url: str, identity=None) -> Optional[str]:
+        """Render a single page and return its HTML"""
+        return self._run(self._render(url, identity))
+
+    def fetch_many(self, urls: List[str], identity=None) -> List[Optional[str]]:
+        """Render several pages concurrently, preserving input order"""
+        return self._run(self._render_many(urls, identity))
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """Close the browser and stop the event loop"""
+        try:
+            self._run(self._shutdown())
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
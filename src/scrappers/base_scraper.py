@@ -1,40 +1,127 @@
-import requests
 from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 import time
-from typing import List, Dict
+from typing import List, Dict, Union
 from urllib.parse import urljoin
+import os
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
 import re
+import threading
+from .selector_ranking import SelectorRanking
+from .session_pool import Identity, is_challenge
+from utils.profiling import stage
+
+# requests, fake_useragent and selenium are imported when first needed so that
+# constructing a scraper (and importing this module) stays cheap
+
+class FetchError(Exception):
+    """A page could not be fetched, or a challenge page was served in its place"""
 
 class BaseScraper:
-    def __init__(self, use_selenium=False):
-        self.use_selenium = use_selenium
-        if use_selenium:
-            self.driver = self._init_selenium()
-        else:
-            self.session = requests.Session()
-            self.ua = UserAgent()
-            self.session.headers.update({
-                'User-Agent': self.ua.random
-            })
+    # Browser backends available when use_selenium is set
+    BROWSER_BACKENDS = ('selenium', 'playwright')
+    # Optional ParsePool that search pages are handed to instead of parsing inline
+    parse_pool = None
+    # Optional SessionPool of persistent identities (user agent, headers, cookies)
+    session_pool = None
+    # SelectorRanking per (scraper class, selector group), shared by all instances
+    _rankings = {}
+    _rankings_lock = threading.Lock()
+    # Bounds a parsed price must fall in; they only reject text that is not a price
+    # (ratings, counts, phone numbers). Implausible prices are judged per batch
+    # against history by PriceValidator when results are saved
+    min_price = 100
+    max_price = 5000000
+
+    def __init__(self, use_selenium=False, browser_backend='selenium', delay_range=(2, 5)):
+        if browser_backend not in self.BROWSER_BACKENDS:
+            raise ValueError(f"Unknown browser backend: {browser_backend}")
         # Add some delays to be respectful to servers
-        self.delay_range = (2, 5)
+        self.delay_range = delay_range
+        self.use_selenium = use_selenium
+        self.browser_backend = browser_backend
+        # Browsers and sessions are started on first use, not at construction
+        self._driver = None
+        self._browser_pool = None
+        self._session = None
+        self._browser_started = False
+        self._identity = None
+        self._blocked = False
+        # Two threads reaching a lazy property together must not both start a
+        # browser or lease an identity (reentrant: the browser needs the identity)
+        self._start_lock = threading.RLock()
+    
+    @property
+    def driver(self):
+        """Selenium WebDriver, started on first use"""
+        if (self.use_selenium and self.browser_backend == 'selenium'
+                and not self._browser_started):
+            with self._start_lock:
+                if not self._browser_started:
+                    self._driver = self._init_selenium()
+                    self._browser_started = True
+        return self._driver
+    
+    @property
+    def browser_pool(self):
+        """Shared async browser, attached to on first use"""
+        if (self.use_selenium and self.browser_backend == 'playwright'
+                and not self._browser_started):
+            with self._start_lock:
+                if not self._browser_started:
+                    self._browser_pool = self._init_browser_pool()
+                    self._browser_started = True
+        return self._browser_pool
+    
+    @property
+    def identity(self) -> Identity:
+        """Identity leased from the session pool, if one is attached"""
+        if self._identity is None and self.session_pool is not None:
+            with self._start_lock:
+                if self._identity is None:
+                    # Selenium opens the identity's Chrome profile, which can't be shared
+                    self._identity = self.session_pool.acquire(
+                        exclusive=self.use_selenium and self.browser_backend == 'selenium')
+        return self._identity
+    
+    @property
+    def session(self):
+        """HTTP session for the requests path, created on first use"""
+        if self._session is None:
+            with self._start_lock:
+                if self._session is None:
+                    import requests
+                    
+                    session = requests.Session()
+                    if self.identity is not None:
+                        # Headers and cookies of a persistent identity
+                        self.identity.apply_to(session)
+                    else:
+                        from fake_useragent import UserAgent
+                        self.ua = UserAgent()
+                        session.headers.update({
+                            'User-Agent': self.ua.random
+                        })
+                    self._session = session
+        return self._session
     
     def _init_selenium(self):
         """Initialize Selenium WebDriver"""
         try:
+            from fake_useragent import UserAgent
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+            
             options = Options()
             options.add_argument('--headless')  # Run in background
             options.add_argument('--no-sandbox')
             options.add_argument('--disable-dev-shm-usage')
-            options.add_argument(f'--user-agent={UserAgent().random}')
+            if self.identity is not None:
+                # Chrome keeps the identity's cookies and storage in its profile
+                options.add_argument(f'--user-data-dir={os.path.abspath(self.identity.profile_dir)}')
+                options.add_argument(f'--user-agent={self.identity.user_agent}')
+                options.add_argument(f"--lang={self.identity.headers['Accept-Language'].split(',')[0]}")
+            else:
+                options.add_argument(f'--user-agent={UserAgent().random}')
             # Suppress logging
             options.add_experimental_option('excludeSwitches', ['enable-logging'])
             options.add_experimental_option('useAutomationExtension', False)
@@ -45,28 +132,97 @@ class BaseScraper:
             print(f"Failed to initialize Selenium: {e}")
             return None
     
+    def _init_browser_pool(self):
+        """Attach to the shared async browser (many tabs, one process)"""
+        try:
+            from .async_browser import AsyncBrowserPool
+            return AsyncBrowserPool.shared(delay_range=self.delay_range)
+        except Exception as e:
+            print(f"Failed to initialize async browser: {e}")
+            return None
+
+    def get_page_html(self, url: str) -> Union[str, bytes]:
+        """Fetch a web page and return its raw HTML (None on failure)"""
+        with stage('fetch'):
+            html = self._fetch_html(url)
+            # A challenge page was served; try once more as another identity
+            if html is None and self._rotate_identity():
+                html = self._fetch_html(url)
+            return html
+    
+    def _fetch_html(self, url: str) -> Union[str, bytes]:
+        if self.use_selenium and self.browser_pool:
+            return self._checked(self.browser_pool.fetch(url, self.identity), url)
+        elif self.use_selenium and self.driver:
+            return self._get_html_selenium(url)
+        else:
+            return self._get_html_requests(url)
+    
+    def _checked(self, html, url: str, status: int = 200, cookies=None):
+        """Record the fetch with the identity's pool; challenge pages become None"""
+        blocked = is_challenge(html, status)
+        if self._identity is not None:
+            if not self.session_pool.record(self._identity, blocked, cookies):
+                print(f"Retired session {self._identity.id} after repeated challenge pages")
+        if blocked:
+            self._blocked = True
+            print(f"Challenge page served for {url}")
+            return None
+        return html
+    
+    def _rotate_identity(self) -> bool:
+        """Switch to another identity after a challenge page; False if there is none to switch to"""
+        if not self._blocked or self._identity is None:
+            self._blocked = False
+            return False
+        self._blocked = False
+        if self._driver:
+            # The browser is tied to the identity's profile
+            self._quit_driver()
+        self.session_pool.release(self._identity)
+        self._identity = None
+        self._session = None
+        return True
+
     def get_page(self, url: str) -> BeautifulSoup:
         """Fetch and parse a web page"""
-        if self.use_selenium and self.driver:
-            return self._get_page_selenium(url)
-        else:
-            return self._get_page_requests(url)
+        html = self.get_page_html(url)
+        if not html:
+            return None
+        return BeautifulSoup(html, 'html.parser')
+
+    def get_pages(self, urls: List[str]) -> List[BeautifulSoup]:
+        """Fetch and parse several pages, concurrently when the backend allows it"""
+        if self.use_selenium and self.browser_pool:
+            pages = self.browser_pool.fetch_many(urls, self.identity)
+            pages = [self._checked(html, url) for html, url in zip(pages, urls)]
+            self._blocked = False
+            return [BeautifulSoup(html, 'html.parser') if html else None for html in pages]
+        return [self.get_page(url) for url in urls]
     
-    def _get_page_requests(self, url: str) -> BeautifulSoup:
-        """Fetch and parse a web page using requests"""
+    def _get_html_requests(self, url: str) -> bytes:
+        """Fetch a web page using requests"""
         try:
             # Add random delay to be respectful
             time.sleep(random.uniform(*self.delay_range))
             
             response = self.session.get(url, timeout=15)
+            cookies = Identity.cookies_from_jar(self.session.cookies) if self._identity else None
+            if self._checked(response.content, url, response.status_code, cookies) is None:
+                return None
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            return response.content
         except Exception as e:
             print(f"Error fetching {url}: {str(e)}")
             return None
     
-    def _get_page_selenium(self, url: str) -> BeautifulSoup:
-        """Fetch and parse a web page using Selenium"""
+    def _get_html_selenium(self, url: str) -> str:
+        """Fetch a web page using Selenium"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        
         try:
             if not self.driver:
                 return None
@@ -83,12 +239,25 @@ class BaseScraper:
             except TimeoutException:
                 pass  # Continue even if wait times out
             
-            page_source = self.driver.page_source
-            return BeautifulSoup(page_source, 'html.parser')
+            return self._checked(self.driver.page_source, url)
         except Exception as e:
             print(f"Selenium error fetching {url}: {str(e)}")
             return None
     
+    @classmethod
+    def warm_up(cls):
+        """Compile the class's CSS selectors ahead of the first parse
+        
+        Every class attribute ending in ``_SELECTORS`` is compiled once;
+        soupsieve caches compiled selectors, so later ``select`` calls with
+        the same strings skip selector parsing.
+        """
+        import soupsieve
+        for attr in dir(cls):
+            if attr.endswith('_SELECTORS'):
+                for selector in getattr(cls, attr):
+                    soupsieve.compile(selector)
+    
     def _parse_price(self, price_text: str) -> float:
         """Extract numeric price from text (handles Nepalese price formatting)"""
         if not price_text:
@@ -109,7 +278,7 @@ class BaseScraper:
             if '.' in cleaned_text:
                 standard_format = cleaned_text.replace(',', '')
                 price = float(standard_format)
-                if 100 <= price <= 500000:  # Reasonable range for electronics
+                if self.min_price <= price <= self.max_price:
                     return price
             
             # Handle the specific formatting issue where extra digits appear without decimal points
@@ -159,13 +328,13 @@ class BaseScraper:
                             # Combine with decimal point
                             if rupee_part and paise_part:
                                 candidate_price = float(rupee_part + '.' + paise_part)
-                                if 100 <= candidate_price <= 500000:
+                                if self.min_price <= candidate_price <= self.max_price:
                                     return candidate_price
                         else:
                             # Standard format with comma as thousand separator
                             standard_format = cleaned_text.replace(',', '')
                             price = float(standard_format)
-                            if 100 <= price <= 500000:
+                            if self.min_price <= price <= self.max_price:
                                 return price
                     else:
                         # No commas, just split the last 2 digits as paise
@@ -178,19 +347,19 @@ class BaseScraper:
                             candidate_price = float(main_part + '.' + paise_part)
                             
                             # Validate the price is in reasonable range
-                            if 100 <= candidate_price <= 500000:
+                            if self.min_price <= candidate_price <= self.max_price:
                                 return candidate_price
                             else:
                                 # If not in range, try treating as a regular number
                                 price = float(no_comma_text)
-                                if 100 <= price <= 500000:
+                                if self.min_price <= price <= self.max_price:
                                     return price
             
             # If we have a simple number without decimal, try it as-is
             standard_format = cleaned_text.replace(',', '')
             if '.' not in standard_format and len(standard_format) >= 3:
                 price = float(standard_format)
-                if 100 <= price <= 500000:  # Reasonable range for electronics
+                if self.min_price <= price <= self.max_price:
                     return price
                     
         except ValueError:
@@ -198,6 +367,48 @@ class BaseScraper:
         
         return 0.0
     
+    @classmethod
+    def selector_ranking(cls, group: str) -> SelectorRanking:
+        """Ranking of the ``<GROUP>_SELECTORS`` alternatives for this site"""
+        key = (cls, group)
+        with cls._rankings_lock:
+            if key not in cls._rankings:
+                cls._rankings[key] = SelectorRanking(getattr(cls, f"{group.upper()}_SELECTORS"))
+            return cls._rankings[key]
+    
+    def _select_ranked(self, soup, group: str) -> List:
+        """Elements matched by the best-ranked selector of a group that matches"""
+        ranking = self.selector_ranking(group)
+        order, probe = ranking.start()
+        elements = []
+        seen = set()
+        for selector in order:
+            matches = soup.select(selector)
+            ranking.record(selector, bool(matches))
+            # Several selectors often match the same node
+            for element in matches:
+                if id(element) not in seen:
+                    seen.add(id(element))
+                    elements.append(element)
+            if elements and not probe:
+                break
+        return elements
+    
+    def _extract_ranked(self, element, group: str, attribute: str = None, accept=None) -> str:
+        """First value from a group's selectors that ``accept`` (if given) approves"""
+        ranking = self.selector_ranking(group)
+        order, probe = ranking.start()
+        result = ''
+        for selector in order:
+            value = self._safe_extract(element, selector, attribute)
+            hit = bool(value) and (accept is None or accept(value))
+            ranking.record(selector, hit)
+            if hit and not result:
+                result = value
+                if not probe:
+                    break
+        return result
+    
     def _safe_extract(self, soup, selector: str, attribute: str = None) -> str:
         """Safely extract text or attribute from BeautifulSoup element"""
         try:
@@ -211,10 +422,25 @@ class BaseScraper:
         except Exception:
             return ''
     
+    def _quit_driver(self):
+        try:
+            self._driver.quit()
+        except Exception:
+            pass
+        self._driver = None
+        self._browser_started = False
+    
     def close(self):
         """Close any open resources"""
-        if self.use_selenium and self.driver:
-            try:
-                self.driver.quit()
-            except Exception:
-                pass
\ No newline at end of file
+        if self._driver:
+            self._quit_driver()
+        if self._identity is not None:
+            # Saves the cookies the session collected
+            self.session_pool.release(self._identity)
+            self._identity = None
+            self._session = None
+        if self._browser_pool:
+            from .async_browser import AsyncBrowserPool
+            AsyncBrowserPool.release_shared()
+            self._browser_pool = None
+        self._browser_started = False
\ No newline at end of file
@@ -1,72 +1,75 @@
 import time
 from typing import List, Dict
-from .base_scraper import BaseScraper
+from bs4 import BeautifulSoup
+from .base_scraper import BaseScraper, FetchError
+from .structured_data import extract_product_attributes
+from .product_record import ProductRecord
+from .price_anchors import price_anchored_containers
+from utils.profiling import stage
 import re
 
 class DarazScraper(BaseScraper):
-    def __init__(self):
-        # Use Selenium for Daraz as it's heavily JavaScript-based
-        super().__init__(use_selenium=True)
-        self.base_url = "https://www.daraz.com.np"
-        self.search_url = "https://www.daraz.com.np/catalog/?q="
-        # Remove artificial price limits to allow high-end devices
-        # Only keep basic validation to filter out clearly invalid prices
-        self.min_price = 100  # Minimum reasonable price for any product
-        self.max_price = 5000000  # 50 lakhs, high enough for premium devices
+    # Product containers on search result pages
+    CONTAINER_SELECTORS = (
+        '[data-qa-locator="product-item"]',
+        '.product-card',
+        '.c-product-card',
+        '.product-item',
+        '[data-tracking="product-card"]',
+        '.sku-item'
+    )
+    NAME_SELECTORS = ('.title', '.name', 'h4', '.product-title', '[title]')
+    # In order of preference
+    PRICE_SELECTORS = (
+        '.c-product-card__price',  # Most specific Daraz selector
+        '.product-price',
+        '.price.sale',  # Sale price if available
+        '.price',
+        '[data-price]',
+        '.origin-price'
+    )
+    URL_SELECTORS = ('.title', '.name', 'a')
     
-    def search_products(self, query: str) -> List[Dict]:
+    def __init__(self, browser_backend='selenium', base_url="https://www.daraz.com.np",
+                 use_selenium=True, delay_range=(2, 5)):
+        # Use a real browser for Daraz as it's heavily JavaScript-based;
+        # base_url can point at a mirror or a local stand-in server
+        super().__init__(use_selenium=use_selenium, browser_backend=browser_backend,
+                         delay_range=delay_range)
+        self.base_url = base_url.rstrip('/')
+        self.search_url = self.base_url + "/catalog/?q="
+    
+    def search_products(self, query: str) -> List[ProductRecord]:
         """Search for products on Daraz"""
         search_url = self.search_url + query.replace(' ', '+')
-        soup = self.get_page(search_url)
-        
-        if not soup:
-            return []
+        html = self.get_page_html(search_url)
         
+        if not html:
+            # Unlike a page without results, so callers can retry
+            raise FetchError(f"Could not fetch {search_url}")
+        with stage('parse'):
+            if self.parse_pool is not None:
+                return self.parse_pool.parse(type(self), html)
+            return self.parse_search_results(html)
+    
+    def parse_search_results(self, html) -> List[ProductRecord]:
+        """Extract products from the HTML of a search result page"""
+        soup = BeautifulSoup(html, 'html.parser')
         products = []
         
-        # Look for product items using multiple selectors
-        selectors = [
-            '[data-qa-locator="product-item"]',
-            '.product-card',
-            '.c-product-card',
-            '.product-item',
-            '[data-tracking="product-card"]',
-            '.sku-item'
-        ]
-        
-        product_items = []
-        for selector in selectors:
-            items = soup.select(selector)
-            if items:
-                product_items.extend(items)
+        # Product items from the container selector that has been matching
+        product_items = self._select_ranked(soup, 'container')
         
         print(f"Daraz: Found {len(product_items)} product items with selectors")
         
-        # If we still don't have items, try a more general approach
+        # If we still don't have items, find one container per price on the page
         if not product_items:
-            # Look for any divs with price-like text
-            all_divs = soup.find_all('div')
-            for div in all_divs:
-                text = div.get_text()
-                if 'Rs.' in text and len(text) > 10:  # Likely a product container
-                    product_items.append(div)
+            product_items = price_anchored_containers(soup)
         
         for item in product_items[:15]:  # Limit to first 15 results
             try:
                 # Extract name
-                name_selectors = [
-                    '.title', 
-                    '.name', 
-                    'h4', 
-                    '.product-title',
-                    '[title]'
-                ]
-                
-                name = ''
-                for selector in name_selectors:
-                    name = self._safe_extract(item, selector)
-                    if name and len(name) > 3:
-                        break
+                name = self._extract_ranked(item, 'name', accept=lambda text: len(text) > 3)
                 
                 # If still no name, try getting it from title attribute
                 if not name:
@@ -75,23 +78,13 @@ class DarazScraper(BaseScraper):
                 # Extract price with better precision
                 price = 0.0
                 
-                # Look for price with specific selectors first (in order of preference)
-                price_selectors = [
-                    '.c-product-card__price',  # Most specific Daraz selector
-                    '.product-price', 
-                    '.price.sale',  # Sale price if available
-                    '.price',
-                    '[data-price]',
-                    '.origin-price'
-                ]
-                
-                price_text = ''
-                for selector in price_selectors:
-                    price_text = self._safe_extract(item, selector)
-                    if price_text and ('Rs' in price_text or 'NPR' in price_text):
-                        price = self._parse_price(price_text)
-                        if price > 0:
-                            break
+                # Look for price with specific selectors first
+                price_text = self._extract_ranked(
+                    item, 'price',
+                    accept=lambda text: ('Rs' in text or 'NPR' in text) and self._parse_price(text) > 0
+                )
+                if price_text:
+                    price = self._parse_price(price_text)
                 
                 # If no price found with selectors, look in the text content
                 if price == 0:
@@ -115,14 +108,11 @@ class DarazScraper(BaseScraper):
                                 break
                 
                 # Extract URL
-                url_selectors = ['.title', '.name', 'a']
-                product_url = ''
-                for selector in url_selectors:
-                    product_url = self._safe_extract(item, selector, 'href')
-                    if product_url:
-                        break
+                product_url = self._extract_ranked(item, 'url', attribute='href')
                 
-                # If no URL found, look for any link
+                # If no URL found, look for any link (the item may be the link itself)
+                if not product_url and item.name == 'a':
+                    product_url = item.get('href', '')
                 if not product_url:
                     links = item.find_all('a', href=True)
                     if links:
@@ -131,21 +121,16 @@ class DarazScraper(BaseScraper):
                 if product_url and not product_url.startswith('http'):
                     product_url = 'https:' + product_url if product_url.startswith('//') else self.base_url + product_url
                 
-                # Validate price is within reasonable range (removed strict limits)
-                if name and price >= self.min_price and price <= self.max_price:
-                    products.append({
-                        'name': name[:150],  # Limit length
-                        'price': price,
-                        'currency': 'NPR',
-                        'site': 'Daraz',
-                        'url': product_url,
-                        'image_url': '',
-                        'brand': '',
-                        'category': '',
-                        'description': ''
-                    })
-                elif name and price > 0:
-                    print(f"Skipping product '{name[:50]}...' with price Rs. {price:,.2f} (outside reasonable range {self.min_price}-{self.max_price})")
+                # Out-of-range text already parses to 0; implausible prices are
+                # judged against price history when the batch is saved
+                if name and price > 0:
+                    products.append(ProductRecord(
+                        name=name[:150],  # Limit length
+                        price=price,
+                        currency='NPR',
+                        site='Daraz',
+                        url=product_url
+                    ))
             except Exception as e:
                 print(f"Error parsing Daraz product: {str(e)}")
                 continue
@@ -154,8 +139,8 @@ class DarazScraper(BaseScraper):
         seen_names = set()
         unique_products = []
         for product in products:
-            if product['name'] not in seen_names:
-                seen_names.add(product['name'])
+            if product.name not in seen_names:
+                seen_names.add(product.name)
                 unique_products.append(product)
         
         print(f"Daraz: Found {len(unique_products)} unique products")
@@ -198,16 +183,29 @@ class DarazScraper(BaseScraper):
                         price = parsed_price
                         break
         
+        # Structured data (JSON-LD / embedded page state) carries the full attribute set
+        attributes = extract_product_attributes(soup)
+        if attributes['name']:
+            name = attributes['name']
+        structured_price = attributes['price'] or 0
+        if self.min_price <= structured_price <= self.max_price:
+            price = structured_price
+        
         product = {
             'name': name[:150] if name else 'Unknown Product',
             'price': price,
             'currency': 'NPR',
             'site': 'Daraz',
             'url': url,
-            'image_url': '',
-            'brand': '',
-            'category': '',
-            'description': ''
+            'image_url': attributes['image_url'],
+            'brand': attributes['brand'][:100],
+            'category': attributes['category'][:100],
+            'description': attributes['description'],
+            'images': attributes['images'],
+            'specs': attributes['specs'],
+            'rating': attributes['rating'],
+            'review_count': attributes['review_count'],
+            'in_stock': attributes['in_stock']
         }
         
         return product
@@ -0,0 +1,138 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from database.models import Product, ProductDetail
+from database.init_db import get_session
+from .scraper_pool import ScraperPool
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+class DetailEnricher:
+    """Fetch detail pages for listings through a bounded worker pool.
+
+    Listings whose details were stored less than ``ttl`` ago are skipped.
+    Results are written back in batches of ``batch_size``: a ``ProductDetail``
+    row per URL, and the brand/category/image/description placeholders of the
+    matching ``Product`` rows are filled in. With a ``ChangeDetector`` the
+    stock state is recorded too, and ``on_changes`` gets the resulting
+    ``out_of_stock`` deltas once a batch is committed.
+    """
+
+    def __init__(self, engine, pools: Dict[str, ScraperPool], max_workers: int = 4,
+                 ttl: timedelta = timedelta(hours=24), batch_size: int = 20,
+                 changes=None, on_changes: Callable[[List[Dict]], None] = None):
+        self.engine = engine
+        self.pools = pools
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.changes = changes
+        self.on_changes = on_changes
+
+    def stale_urls(self, urls: List[str]) -> List[str]:
+        """Return the URLs that have not been enriched within the TTL"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        cutoff = datetime.utcnow() - self.ttl
+        fresh = set()
+        session = get_session(self.engine)
+        try:
+            for i in range(0, len(urls), _IN_CHUNK):
+                chunk = urls[i:i + _IN_CHUNK]
+                rows = session.query(ProductDetail.url).filter(
+                    ProductDetail.url.in_(chunk),
+                    ProductDetail.enriched_at >= cutoff
+                ).all()
+                fresh.update(row.url for row in rows)
+        finally:
+            session.close()
+        return [url for url in urls if url not in fresh]
+
+    def enrich(self, products: List[Dict]) -> int:
+        """Enrich the stale listings among ``products``; return how many were stored"""
+        site_by_url = {}
+        for product in products:
+            if product.get('url') and product.get('site') in self.pools:
+                site_by_url.setdefault(product['url'], product['site'])
+
+        stale = self.stale_urls(list(site_by_url))
+        if not stale:
+            return 0
+
+        print(f"Enriching {len(stale)} listings with {self.max_workers} workers...")
+        stored = 0
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._fetch, site_by_url[url], url): url for url in stale}
+            for future in as_completed(futures):
+                try:
+                    detail = future.result()
+                except Exception as e:
+                    print(f"Error enriching {futures[future]}: {str(e)}")
+                    continue
+                if detail:
+                    pending.append(detail)
+                if len(pending) >= self.batch_size:
+                    stored += self._write_batch(pending)
+                    pending = []
+        if pending:
+            stored += self._write_batch(pending)
+
+        print(f"Enriched {stored} listings")
+        return stored
+
+    def _fetch(self, site: str, url: str) -> Dict:
+        with self.pools[site].scraper() as scraper:
+            return scraper.get_product_details(url)
+
+    def _write_batch(self, details: List[Dict]) -> int:
+        """Upsert a batch of details and back-fill the matching listing rows"""
+        session = get_session(self.engine)
+        try:
+            urls = [detail['url'] for detail in details]
+            existing = {row.url: row for row in
+                        session.query(ProductDetail).filter(ProductDetail.url.in_(urls))}
+            now = datetime.utcnow()
+
+            for detail in details:
+                row = existing.get(detail['url'])
+                if row is None:
+                    row = ProductDetail(url=detail['url'], site=detail['site'])
+                    session.add(row)
+                    existing[detail['url']] = row
+                row.name = detail.get('name')
+                row.brand = detail.get('brand')
+                row.category = detail.get('category')
+                row.image_url = detail.get('image_url')
+                row.images = json.dumps(detail.get('images') or [])
+                row.specs = json.dumps(detail.get('specs') or {})
+                row.description = detail.get('description')
+                row.rating = detail.get('rating')
+                row.review_count = detail.get('review_count') or 0
+                row.in_stock = detail.get('in_stock')
+                row.enriched_at = now
+
+                # Fill the empty placeholders left by the listing scrape
+                updates = {field: detail[field] for field in ('brand', 'category', 'image_url', 'description')
+                           if detail.get(field)}
+                if updates:
+                    session.query(Product).filter(Product.url == detail['url']).update(
+                        updates, synchronize_session=False
+                    )
+
+            deltas = self.changes.apply_stock(session, details) if self.changes is not None else []
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if self.changes is not None:
+                self.changes.reset()
+            print(f"Error saving product details: {str(e)}")
+            return 0
+        finally:
+            session.close()
+        if deltas and self.on_changes is not None:
+            self.on_changes(deltas)
+        return len(details)
@@ -0,0 +1,118 @@
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Sequence, Union
+
+# Pages smaller than this are pickled to the worker; larger ones are written
+# into a shared memory block instead of going through the pickle pipe
+SHARED_MEMORY_THRESHOLD = 64 * 1024
+
+# Per-process parser instances, created by the pool initializer
+_parsers = {}
+
+
+def class_path(scraper_class) -> str:
+    return f"{scraper_class.__module__}.{scraper_class.__qualname__}"
+
+
+def _load_class(path: str):
+    module_name, class_name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+# Constructor options per scraper class path, set by the pool initializer
+_options = {}
+
+
+def _init_worker(options: Dict[str, Dict]):
+    """Import scraper modules, compile their selectors and build parsers once
+
+    Parsers are built with the options the fetching scrapers were, so that
+    e.g. relative links resolve against the same ``base_url``.
+    """
+    _options.update(options)
+    for path, scraper_options in options.items():
+        scraper_class = _load_class(path)
+        scraper_class.warm_up()
+        # Scrapers start no browser or session until they fetch, so this is cheap
+        _parsers[path] = scraper_class(**scraper_options)
+
+
+def _parser(path: str):
+    if path not in _parsers:
+        _init_worker({path: _options.get(path, {})})
+    return _parsers[path]
+
+
+def _parse_inline(path: str, html: Union[str, bytes]) -> List[Dict]:
+    return _parser(path).parse_search_results(html)
+
+
+def _parse_shared(path: str, block_name: str, size: int) -> List[Dict]:
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        # The parser decodes the page into its own string either way, so take
+        # one copy out of the block and release it before the (long) parse
+        html = bytes(block.buf[:size])
+    finally:
+        block.close()
+    return _parser(path).parse_search_results(html)
+
+
+class ParsePool:
+    """Parse search pages in warm worker processes.
+
+    HTML parsing is CPU-bound and holds the GIL, so fetch threads that parse
+    inline serialize on it. Handing the raw page to a process pool lets
+    parsing use every core while fetch threads keep downloading. Workers
+    import the scraper modules and compile their selectors once at start-up;
+    large pages travel through shared memory rather than the pickle pipe.
+    ``scraper_options`` maps a scraper class to the constructor options its
+    worker parsers are built with (the fetching scrapers' options).
+    """
+
+    def __init__(self, scraper_classes: Sequence, workers: int = None,
+                 shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD,
+                 scraper_options: Dict = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_memory_threshold = shared_memory_threshold
+        scraper_options = scraper_options or {}
+        options = {class_path(scraper_class): dict(scraper_options.get(scraper_class, {}))
+                   for scraper_class in scraper_classes}
+        # Workers must share the parent's tracker, or each would start its own
+        # and report the blocks the parent unlinks as leaked
+        resource_tracker.ensure_running()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(options,))
+
+    def _submit(self, scraper_class, html: Union[str, bytes]):
+        path = class_path(scraper_class)
+        if isinstance(html, str):
+            html = html.encode('utf-8')
+        if len(html) < self.shared_memory_threshold:
+            return self._executor.submit(_parse_inline, path, html), None
+        block = shared_memory.SharedMemory(create=True, size=len(html))
+        block.buf[:len(html)] = html
+        return self._executor.submit(_parse_shared, path, block.name, len(html)), block
+
+    @staticmethod
+    def _result(future, block) -> List[Dict]:
+        try:
+            return future.result()
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+
+    def parse(self, scraper_class, html: Union[str, bytes]) -> List[Dict]:
+        """Parse one search page with ``scraper_class.parse_search_results``"""
+        return self._result(*self._submit(scraper_class, html))
+
+    def parse_many(self, scraper_class, pages: Sequence[Union[str, bytes]]) -> List[List[Dict]]:
+        """Parse several pages concurrently, results in input order"""
+        submitted = [self._submit(scraper_class, html) for html in pages]
+        return [self._result(future, block) for future, block in submitted]
+
+    def close(self):
+        self._executor.shutdown()
@@ -0,0 +1,78 @@
+import re
+from typing import Dict, List
+
+from bs4 import BeautifulSoup, Tag
+
+# Text that starts with a price: "Rs. 1,299", "Rs 1299", "NPR 1,299.00"
+PRICE_TEXT = re.compile(r'(?:Rs\.?|NPR)\s*\d[\d,]*')
+
+# A product card has some text besides its prices (the product name)
+MIN_NAME_LENGTH = 10
+
+# Links that don't point at a product
+_IGNORED_HREF = ('#', 'javascript:', 'mailto:', 'tel:')
+
+_MULTI = object()
+
+
+def _link_owners(soup: BeautifulSoup) -> Dict[int, object]:
+    """Map element ids to the one product href in their subtree, or _MULTI
+
+    Each link walks up its ancestors. A walk stops at an ancestor that
+    already records the same href or several hrefs, and every ancestor only
+    changes state twice (none -> one href -> several), so the total work is
+    linear in the size of the document.
+    """
+    owners = {}
+    for link in soup.find_all('a', href=True):
+        href = link['href'].strip()
+        if not href or href.startswith(_IGNORED_HREF):
+            continue
+        node = link
+        while node is not None and not isinstance(node, BeautifulSoup):
+            current = owners.get(id(node))
+            if current is _MULTI or current == href:
+                break
+            owners[id(node)] = href if current is None else _MULTI
+            node = node.parent
+    return owners
+
+
+def price_anchored_containers(soup: BeautifulSoup) -> List[Tag]:
+    """One container element per product, found from price text
+
+    Every price string is an anchor; its container is the nearest ancestor
+    that contains a link, provided all links in it point to the same
+    product and it has text besides prices. Anchors inside a larger block
+    holding several products' links (the result list itself) or in links
+    that are only a price (price filters) are ignored, and a sale and an
+    original price in the same card give a single container. Runs in time
+    linear in the document size, unlike testing the text of every div.
+    """
+    owners = _link_owners(soup)
+    containers = []
+    seen = set()
+    resolved = {}
+    for anchor in soup.find_all(string=PRICE_TEXT):
+        path = []
+        node = anchor.parent
+        container = None
+        while node is not None and not isinstance(node, BeautifulSoup):
+            if id(node) in resolved:
+                container = resolved[id(node)]
+                break
+            path.append(node)
+            owner = owners.get(id(node))
+            if owner is not None:
+                container = node if owner is not _MULTI else None
+                break
+            node = node.parent
+        # Remember the answer for every node on the way up
+        for visited in path:
+            resolved[id(visited)] = container
+        if container is None or id(container) in seen:
+            continue
+        seen.add(id(container))
+        if len(PRICE_TEXT.sub('', container.get_text()).strip()) > MIN_NAME_LENGTH:
+            containers.append(container)
+    return containers
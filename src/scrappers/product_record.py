@@ -0,0 +1,78 @@
+import sys
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ProductRecord(Mapping):
+    """One scraped listing.
+
+    Search pages yield thousands of these per crawl, so records use
+    ``__slots__`` instead of a per-instance dict, and the low-cardinality
+    ``site`` and ``currency`` strings are interned so every record shares
+    one copy. Records are read-only mappings over the products table
+    columns, so code written against product dicts keeps working.
+    """
+
+    FIELDS = ('name', 'price', 'currency', 'site', 'url', 'image_url', 'brand', 'category', 'description')
+    __slots__ = FIELDS
+
+    def __init__(self, name: str, price: float, currency: str = 'NPR', site: str = '', url: str = '',
+                 image_url: str = '', brand: str = '', category: str = '', description: str = ''):
+        self.name = name
+        self.price = float(price)
+        self.currency = sys.intern(currency)
+        self.site = sys.intern(site)
+        self.url = url
+        self.image_url = image_url
+        self.brand = brand
+        self.category = category
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'ProductRecord':
+        """Build a record from a product dict, ignoring non-column keys"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{field: data[field] for field in cls.FIELDS if data.get(field) is not None})
+
+    def to_row(self) -> Dict:
+        """Column values for a products table row"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"<ProductRecord(site='{self.site}', name='{self.name[:40]}', price={self.price})>"
+
+
+def records_to_columns(records: Iterable[Mapping]) -> Dict[str, list]:
+    """Column lists, one per field, from records or product dicts"""
+    records = [ProductRecord.from_dict(record) for record in records]
+    return {field: [getattr(record, field) for record in records] for field in ProductRecord.FIELDS}
+
+
+def records_to_frame(records: Iterable[Mapping]) -> 'pd.DataFrame':
+    """DataFrame of records with site and currency as categoricals"""
+    import pandas as pd
+
+    df = pd.DataFrame(records_to_columns(records))
+    for column in ('site', 'currency'):
+        df[column] = df[column].astype('category')
+    return df
+
+
+def records_to_rows(records: Iterable[Mapping]) -> List[Dict]:
+    """Plain product dicts, e.g. for JSON responses"""
+    return [ProductRecord.from_dict(record).to_row() for record in records]
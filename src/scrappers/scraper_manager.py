@@ -1,91 +1,395 @@
+import contextvars
+import threading
 import time
-import pandas as pd
+import importlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 import sys
 import os
+from typing import TYPE_CHECKING
 
 # Add the parent directory to the path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import List, Dict
-from scrappers.daraz_scraper import DarazScraper
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from scrappers.scraper_pool import ScraperPool
+from scrappers.session_pool import SessionPool
+from scrappers.product_record import ProductRecord, records_to_frame
 from database.models import Product
 from database.init_db import get_session, init_db
+from database.aggregates import update_aggregates, get_comparison_summary, cluster_key, listing_key
+from database.change_detection import ChangeDetector, DEFAULT_CHANGES_FILE
+from database.price_validation import PriceValidator
+from utils.profiling import Profiler, stage
+from alerts.sinks import FileSink
+
+# Enrichment, alerts, rollups and autocomplete are imported where they are
+# first used, so commands that only read the database start faster
+if TYPE_CHECKING:
+    import pandas as pd
+    from scrappers.enrichment import DetailEnricher
+    from alerts.watch_rules import AlertEngine
+    from utils.autocomplete import SuggestionIndex
+
+# Scraper classes by site; modules are imported only when a site is scraped
+SCRAPER_CLASSES = {
+    'Daraz': 'scrappers.daraz_scraper.DarazScraper'
+}
+
+# Host each site's pages are served from; crawl politeness is tracked per host
+SITE_HOSTS = {
+    'Daraz': 'www.daraz.com.np'
+}
 
 class ScraperManager:
-    def __init__(self):
-        self._scrapers = {}
-        self._scraper_classes = {
-            'Daraz': DarazScraper
-        }
-        self.engine = init_db()
+    def __init__(self, scraper_options: Dict[str, Dict] = None, detail_workers: int = 4,
+                 archive=None, alert_sinks: List = None, db_url: str = None,
+                 parse_workers: int = 0, change_sinks: List = None, site_delay: float = 2.0,
+                 profile_rate: float = None, profile_dir: str = None,
+                 price_validation: str = 'quarantine', session_dir: str = None,
+                 persist_sessions: bool = True):
+        self._pools = {}
+        self._scraper_classes = dict(SCRAPER_CLASSES)
+        # Per-site constructor options, e.g. {'Daraz': {'browser_backend': 'playwright'}}
+        self.scraper_options = scraper_options or {}
+        self.detail_workers = detail_workers
+        # Pause between sites in search_all_sites
+        self.site_delay = site_delay
+        # Optional ParquetArchive that saved rows are exported to after each batch
+        self.archive = archive
+        self.alert_sinks = alert_sinks
+        # Where listing deltas (new, price change, gone...) are sent; data/changes.jsonl by default
+        self.change_sinks = change_sinks if change_sinks is not None else [FileSink(DEFAULT_CHANGES_FILE)]
+        self.changes = ChangeDetector()
+        # Scores each batch against median/MAD price statistics; 'quarantine'
+        # keeps outliers out of the history, 'flag' only records them, 'off' skips it
+        self.price_validator = PriceValidator(price_validation)
+        self.db_url = db_url
+        # Worker processes for parsing search pages; 0 parses in the fetching thread
+        self.parse_workers = parse_workers
+        self._parse_pool = None
+        # Statistical profiles of sampled or requested comparisons; the rate
+        # defaults to the PROFILE_RATE environment variable (off if unset)
+        self.profiler = Profiler(profile_rate, profile_dir)
+        # Scrapers lease persistent per-site identities (cookies, user agent,
+        # headers, browser profile) from data/sessions, or SESSION_DIR if set
+        self.persist_sessions = persist_sessions
+        self.session_dir = session_dir
+        # The database engine and services built on it are created on first use
+        self._engine = None
+        self._enricher = None
+        self._alerts = None
+        self._suggestions = None
+        # The API calls into one manager from many request threads; this
+        # guards the lazily created engine, services and scraper pools
+        self._lock = threading.RLock()
+    
+    @property
+    def engine(self):
+        """Database engine, created (with tables) on first use"""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = init_db(self.db_url)
+        return self._engine
+    
+    @property
+    def enricher(self) -> 'DetailEnricher':
+        if self._enricher is None:
+            with self._lock:
+                if self._enricher is None:
+                    from scrappers.enrichment import DetailEnricher
+                    self._enricher = DetailEnricher(self.engine, self._pools, max_workers=self.detail_workers,
+                                                    changes=self.changes, on_changes=self._send_changes)
+        return self._enricher
+    
+    @property
+    def alerts(self) -> 'AlertEngine':
+        """Price-drop watch rules, checked against every ingested batch"""
+        if self._alerts is None:
+            with self._lock:
+                if self._alerts is None:
+                    from alerts.watch_rules import AlertEngine
+                    sinks = self.alert_sinks if self.alert_sinks is not None else [FileSink()]
+                    self._alerts = AlertEngine(self.engine, sinks)
+        return self._alerts
     
     @property
-    def scrapers(self):
-        """Lazy initialization of scrapers"""
-        if not self._scrapers:
-            for name, scraper_class in self._scraper_classes.items():
-                self._scrapers[name] = scraper_class()
-        return self._scrapers
-    
-    def search_all_sites(self, query: str) -> List[Dict]:
+    def suggestions(self) -> 'SuggestionIndex':
+        """Autocomplete index, loaded from the database on first use and kept current at ingest"""
+        if self._suggestions is None:
+            with self._lock:
+                if self._suggestions is None:
+                    from database.aggregates import load_suggestions
+                    from utils.autocomplete import SuggestionIndex
+                    session = get_session(self.engine)
+                    try:
+                        self._suggestions = load_suggestions(session, SuggestionIndex())
+                    finally:
+                        session.close()
+        return self._suggestions
+    
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict]:
+        """Completions of a partly typed query: known queries (fresh ones first), then listing names"""
+        return self.suggestions.suggest(prefix, limit)
+    
+    @property
+    def parse_pool(self):
+        """Process pool that search pages are parsed in, if parse_workers is set"""
+        if self._parse_pool is None and self.parse_workers:
+            with self._lock:
+                if self._parse_pool is None:
+                    from scrappers.parse_pool import ParsePool
+                    classes = {self._load_scraper_class(name): self.scraper_options.get(name, {})
+                               for name in self._scraper_classes}
+                    self._parse_pool = ParsePool(list(classes), workers=self.parse_workers,
+                                                 scraper_options=classes)
+        return self._parse_pool
+    
+    def _attach_services(self, scraper):
+        scraper.parse_pool = self.parse_pool
+        if self.persist_sessions:
+            site = next((name for name, scraper_class in self._scraper_classes.items()
+                         if scraper_class is type(scraper)), None)
+            if site is not None:
+                scraper.session_pool = SessionPool.shared(site, self.session_dir)
+    
+    def _load_scraper_class(self, site_name: str):
+        scraper_class = self._scraper_classes[site_name]
+        if isinstance(scraper_class, str):
+            module_name, class_name = scraper_class.rsplit('.', 1)
+            scraper_class = getattr(importlib.import_module(module_name), class_name)
+            self._scraper_classes[site_name] = scraper_class
+        return scraper_class
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalized form of a search query, used as a cache/aggregate key"""
+        return cluster_key(query)
+    
+    @property
+    def site_names(self) -> List[str]:
+        return list(self._scraper_classes)
+    
+    def get_pool(self, site_name: str) -> ScraperPool:
+        """Bounded pool of scrapers for one site
+        
+        Scrapers aren't thread-safe, so every search and detail fetch checks
+        one out of its site's pool rather than sharing a single instance.
+        """
+        if site_name not in self._pools:
+            with self._lock:
+                if site_name not in self._pools:
+                    self._pools[site_name] = ScraperPool(
+                        self._load_scraper_class(site_name),
+                        size=self.detail_workers,
+                        on_create=self._attach_services,
+                        **self.scraper_options.get(site_name, {})
+                    )
+        return self._pools[site_name]
+    
+    def search_all_sites(self, query: str) -> List[ProductRecord]:
         """Search for products across all sites"""
         all_products = []
         
-        for site_name, scraper in self.scrapers.items():
+        for site_name in self.site_names:
             print(f"Searching {site_name} for '{query}'...")
             try:
-                products = scraper.search_products(query)
+                products = self._search_site(self.get_pool(site_name), query)
                 all_products.extend(products)
                 print(f"Found {len(products)} products on {site_name}")
                 # Be respectful to servers by adding a delay
-                time.sleep(2)
+                time.sleep(self.site_delay)
             except Exception as e:
                 print(f"Error searching {site_name}: {str(e)}")
                 continue
         
         return all_products
     
-    def save_products_to_db(self, products: List[Dict]):
-        """Save products to database"""
+    def iter_site_results(self, query: str) -> Iterator[Tuple[str, List[ProductRecord], Optional[str]]]:
+        """Search every site concurrently, yielding (site, products, error) as each finishes
+        
+        Each site is a different host, so searching them in parallel doesn't
+        add load on any one of them; results are available as soon as the
+        fastest site answers instead of after the slowest.
+        """
+        site_names = self.site_names
+        with ThreadPoolExecutor(max_workers=max(len(site_names), 1)) as executor:
+            # Fetch/parse stages in the workers count towards a profiled caller;
+            # each worker checks a scraper out, as concurrent streams share the pools
+            futures = {executor.submit(contextvars.copy_context().run, self._search_site,
+                                       self.get_pool(site_name), query): site_name
+                       for site_name in site_names}
+            for future in as_completed(futures):
+                site_name = futures[future]
+                try:
+                    products = future.result()
+                except Exception as e:
+                    print(f"Error searching {site_name}: {str(e)}")
+                    yield site_name, [], str(e)
+                    continue
+                print(f"Found {len(products)} products on {site_name}")
+                yield site_name, products, None
+    
+    def save_products_to_db(self, products: List[Dict], query: str = None) -> List[Dict]:
+        """Save new or changed products, update the aggregates and return the deltas
+
+        Prices that fail validation are recorded in ``price_outliers``; in
+        quarantine mode they are not saved, aggregated, alerted on or archived.
+        """
+        from database.rollups import update_rollups
+        
         session = get_session(self.engine)
+        deltas = []
+        accepted = products
         
         try:
-            for product_data in products:
-                # Check if product already exists
-                existing = session.query(Product).filter_by(
-                    name=product_data['name'],
-                    site=product_data['site'],
-                    price=product_data['price']
-                ).first()
-                
-                if not existing:
-                    product = Product(**product_data)
-                    session.add(product)
-            
-            session.commit()
-            print(f"Saved {len(products)} products to database")
+            with stage('db'):
+                for attempt in range(2):
+                    try:
+                        accepted, outliers = self.price_validator.check(session, products, query)
+                        # Unchanged listings are already in the price history
+                        changed, deltas = self.changes.apply(session, accepted, query, members=products)
+                        for product_data in changed:
+                            session.add(Product(**ProductRecord.from_dict(product_data).to_row()))
+                        
+                        update_aggregates(session, accepted, query, changed=changed)
+                        update_rollups(session, changed)
+                        session.commit()
+                        break
+                    except IntegrityError:
+                        # A concurrent save of the same listings or query inserted
+                        # their rows first; redo the batch against those rows
+                        session.rollback()
+                        self.changes.reset()
+                        if attempt:
+                            raise
+            print(f"Saved {len(changed)} new or changed products to database "
+                  f"({len(accepted) - len(changed)} unchanged)")
+            if outliers:
+                print(f"{outliers[0]['action'].capitalize()} {len(outliers)} outlier prices: " +
+                      ", ".join(f"'{(o['name'] or '')[:30]}' Rs. {o['price']:,.2f} ({o['reason']})"
+                                for o in outliers[:5]))
+            if self._suggestions is not None:
+                self._suggestions.observe(accepted, query)
         except Exception as e:
             session.rollback()
+            self.changes.reset()
+            deltas = []
             print(f"Error saving products to database: {str(e)}")
         finally:
             session.close()
+        
+        self._send_changes(deltas)
+        
+        try:
+            self.alerts.evaluate(accepted, query)
+        except Exception as e:
+            print(f"Error evaluating price alerts: {str(e)}")
+        
+        if self.archive is not None:
+            try:
+                # The checkpointed export, so rows are archived once even if
+                # `export` or `compact` also runs against this archive
+                self.archive.export_from_db(self.engine)
+            except Exception as e:
+                print(f"Error archiving products: {str(e)}")
+        
+        return deltas
+    
+    def _send_changes(self, deltas: List[Dict]):
+        for sink in self.change_sinks:
+            for delta in deltas:
+                try:
+                    sink.send(delta)
+                except Exception as e:
+                    print(f"Error sending listing change: {str(e)}")
+                    break
+    
+    def get_comparison_summary(self, query: str, max_age: timedelta = None) -> Dict:
+        """Stored per-site comparison for a query, or None if untracked/stale"""
+        session = get_session(self.engine)
+        try:
+            return get_comparison_summary(session, query, max_age)
+        finally:
+            session.close()
     
-    def compare_products(self, query: str) -> pd.DataFrame:
-        """Search for products and return a comparison DataFrame"""
-        products = self.search_all_sites(query)
+    def get_price_history(self, url: str, site: str = 'Daraz', start: datetime = None,
+                          end: datetime = None, max_points: int = 200, resolution: str = None) -> Dict:
+        """OHLC price history of one listing, or None if it was never scraped"""
+        from database.rollups import get_price_history
         
-        if not products:
-            print("No products found!")
-            return pd.DataFrame()
+        session = get_session(self.engine)
+        try:
+            return get_price_history(session, listing_key({'site': site, 'url': url}),
+                                     start, end, max_points, resolution)
+        finally:
+            session.close()
+    
+    def get_price_outliers(self, since: datetime = None, reason: str = None, limit: int = 100) -> List[Dict]:
+        """Prices flagged or quarantined by validation, newest first"""
+        from database.price_validation import get_outliers
         
-        # Save to database
-        self.save_products_to_db(products)
+        session = get_session(self.engine)
+        try:
+            return get_outliers(session, since, reason, limit)
+        finally:
+            session.close()
+    
+    def export_history(self, archive_dir: str = None) -> int:
+        """Append product rows not yet archived to the Parquet archive"""
+        from database.parquet_archive import ParquetArchive, DEFAULT_ARCHIVE_DIR
         
-        # Create DataFrame for comparison
-        df = pd.DataFrame(products)
+        archive = ParquetArchive(archive_dir or DEFAULT_ARCHIVE_DIR)
+        exported = archive.export_from_db(self.engine)
+        print(f"Exported {exported} rows to {archive.root}")
+        return exported
+    
+    def compact_history(self, archive_dir: str = None, **options) -> Dict:
+        """Archive raw rows, compact old history and vacuum the database (see RetentionJob)"""
+        from database.parquet_archive import ParquetArchive, DEFAULT_ARCHIVE_DIR
+        from database.retention import RetentionJob
         
-        # Sort by price
-        df = df.sort_values('price')
+        report = RetentionJob(self.engine, ParquetArchive(archive_dir or DEFAULT_ARCHIVE_DIR), **options).run()
+        print(f"Archived {report['archived']} rows, compacted {report['compacted']} old observations, "
+              f"pruned {report['hourly_pruned']} hourly buckets and {report['outliers_pruned']} outliers "
+              f"in {report['seconds']:.1f}s")
+        return report
+    
+    def enrich_products(self, products: List[Dict]) -> int:
+        """Fetch detail pages for listings not enriched within the TTL"""
+        for site_name in {product.get('site') for product in products}:
+            if site_name in self._scraper_classes:
+                self.get_pool(site_name)
+        return self.enricher.enrich(products)
+    
+    def compare_products(self, query: str, enrich: bool = False, profile: bool = None) -> 'pd.DataFrame':
+        """Search for products and return a comparison DataFrame
+        
+        ``profile=True`` writes a profile of this call to the profile
+        directory; by default calls are profiled at the sampling rate.
+        """
+        import pandas as pd
+        
+        with self.profiler.capture('compare', query, force=profile):
+            products = self.search_all_sites(query)
+            
+            if not products:
+                print("No products found!")
+                return pd.DataFrame()
+            
+            # Save to database
+            self.save_products_to_db(products, query)
+            
+            if enrich:
+                self.enrich_products(products)
+            
+            # Create DataFrame for comparison
+            df = records_to_frame(products)
+            
+            # Sort by price
+            df = df.sort_values('price')
         
         return df
     
@@ -96,32 +400,46 @@ class ScraperManager:
         # Group URLs by site
         urls_by_site = {}
         for url in product_urls:
-            for site_name, scraper in self.scrapers.items():
+            for site_name in self._scraper_classes:
                 if site_name.lower() in url.lower():
                     if site_name not in urls_by_site:
                         urls_by_site[site_name] = []
                     urls_by_site[site_name].append(url)
                     break
         
-        # Get details from each site
-        for site_name, urls in urls_by_site.items():
-            scraper = self.scrapers[site_name]
-            for url in urls:
+        # Fetch details concurrently, one bounded scraper pool per site
+        with ThreadPoolExecutor(max_workers=self.detail_workers) as executor:
+            futures = []
+            for site_name, urls in urls_by_site.items():
+                pool = self.get_pool(site_name)
+                for url in urls:
+                    futures.append((site_name, executor.submit(self._fetch_details, pool, url)))
+            
+            for site_name, future in futures:
                 try:
-                    detail = scraper.get_product_details(url)
+                    detail = future.result()
                     if detail:
                         details.append(detail)
-                    time.sleep(1)  # Be respectful
                 except Exception as e:
                     print(f"Error getting details from {site_name}: {str(e)}")
                     continue
         
         return details
     
+    @staticmethod
+    def _search_site(pool: ScraperPool, query: str) -> List[ProductRecord]:
+        with pool.scraper() as scraper:
+            return scraper.search_products(query)
+    
+    @staticmethod
+    def _fetch_details(pool: ScraperPool, url: str) -> Dict:
+        with pool.scraper() as scraper:
+            return scraper.get_product_details(url)
+    
     def close(self):
         """Close all scraper resources"""
-        for scraper in self.scrapers.values():
-            try:
-                scraper.close()
-            except Exception:
-                pass
\ No newline at end of file
+        for pool in self._pools.values():
+            pool.close()
+        if self._parse_pool is not None:
+            self._parse_pool.close()
+            self._parse_pool = None
\ No newline at end of file
@@ -0,0 +1,55 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class ScraperPool:
+    """A bounded pool of scraper instances for one site.
+
+    Scrapers hold a browser or HTTP session and are not thread-safe, so each
+    worker checks one out for the duration of a fetch. At most ``size``
+    scrapers are ever created; extra workers wait for one to be returned.
+    """
+
+    def __init__(self, scraper_class, size: int = 4, on_create=None, **scraper_options):
+        self.scraper_class = scraper_class
+        self.size = size
+        # Called with each new scraper, e.g. to attach shared services
+        self.on_create = on_create
+        self.scraper_options = scraper_options
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                scraper = self.scraper_class(**self.scraper_options)
+                if self.on_create is not None:
+                    self.on_create(scraper)
+                self._all.append(scraper)
+                return scraper
+        return self._idle.get()
+
+    @contextmanager
+    def scraper(self):
+        """Check out a scraper, returning it to the pool afterwards"""
+        scraper = self._acquire()
+        try:
+            yield scraper
+        finally:
+            self._idle.put(scraper)
+
+    def close(self):
+        """Close every scraper the pool has created"""
+        with self._lock:
+            scrapers, self._all = self._all, []
+        for scraper in scrapers:
+            try:
+                scraper.close()
+            except Exception:
+                pass
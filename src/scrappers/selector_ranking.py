@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
+
+
+class SelectorRanking:
+    """Alternative CSS selectors for one field, ordered by how often they match.
+
+    Scrapers carry several selectors per field because markup differs
+    between page variants and changes over time. Trying them in a fixed
+    order wastes work once one of them is known to be the one that matches,
+    so the selector with the best hit rate is tried first and the rest only
+    when it misses.
+
+    Every ``probe_every`` uses all selectors are evaluated, so a selector
+    that starts matching more often can take the lead. When the leader's hit
+    rate over the last ``window`` uses falls below ``drift_threshold`` times
+    its long-run rate, the site's markup has probably changed: the history
+    is dropped and selectors are re-ranked from fresh observations.
+    """
+
+    def __init__(self, selectors: Sequence[str], window: int = 50, drift_threshold: float = 0.5,
+                 probe_every: int = 100):
+        self.selectors = tuple(selectors)
+        self.window = window
+        self.drift_threshold = drift_threshold
+        self.probe_every = probe_every
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._hits = dict.fromkeys(self.selectors, 0)
+        self._tries = dict.fromkeys(self.selectors, 0)
+        self._order = list(self.selectors)
+        self._recent = deque(maxlen=self.window)
+        self._uses = 0
+
+    def _rate(self, selector: str) -> float:
+        # Untried selectors rank as if they had matched once in two tries
+        return (self._hits[selector] + 1) / (self._tries[selector] + 2)
+
+    def start(self) -> Tuple[List[str], bool]:
+        """Selectors in the order to try them, and whether to try them all"""
+        with self._lock:
+            self._uses += 1
+            return list(self._order), self._uses % self.probe_every == 1
+
+    def record(self, selector: str, hit: bool):
+        with self._lock:
+            self._tries[selector] += 1
+            self._hits[selector] += hit
+            leader = self._order[0]
+            if selector == leader:
+                self._recent.append(hit)
+                self._check_drift()
+            # Stable sort keeps the declared order between equally good selectors
+            self._order.sort(key=self._rate, reverse=True)
+            if self._order[0] != leader:
+                self._recent.clear()
+
+    def _check_drift(self):
+        if len(self._recent) < self.window:
+            return
+        leader = self._order[0]
+        recent_rate = sum(self._recent) / len(self._recent)
+        if recent_rate < self.drift_threshold * (self._hits[leader] / self._tries[leader]):
+            print(f"Selector '{leader}' stopped matching ({recent_rate:.0%} of recent pages); re-probing")
+            self._reset()
+            # Re-probe all selectors on the next use
+            self._uses = 0
+
+    def stats(self) -> Dict[str, Tuple[int, int]]:
+        """(hits, tries) per selector, best first"""
+        with self._lock:
+            return {selector: (self._hits[selector], self._tries[selector]) for selector in self._order}
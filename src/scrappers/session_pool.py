@@ -0,0 +1,313 @@
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+DEFAULT_SESSION_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'sessions'
+)
+
+# Used when fake_useragent only offers mobile agents; the scrapers parse desktop layouts
+FALLBACK_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                       '(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
+
+ACCEPT_LANGUAGES = ['en-US,en;q=0.9', 'en-GB,en;q=0.9', 'en-US,en;q=0.9,ne;q=0.8']
+
+# Status codes and page markers of anti-bot interstitials rather than content
+CHALLENGE_STATUSES = {403, 429}
+CHALLENGE_MARKERS = (
+    '_____tmd_____/punish',  # Alibaba-group slider captcha, used by Daraz
+    'cf-chl-',  # Cloudflare
+    'Attention Required! | Cloudflare',
+    'px-captcha',  # PerimeterX
+    'unusual traffic from your computer',
+)
+
+_PLATFORMS = (('Windows', 'Windows'), ('Macintosh', 'macOS'), ('Android', 'Android'), ('Linux', 'Linux'))
+
+
+def is_challenge(html, status: int = 200) -> bool:
+    """Whether a response is an anti-bot challenge page"""
+    if status in CHALLENGE_STATUSES:
+        return True
+    if not html:
+        return False
+    # Markers sit near the top of the (small) challenge pages
+    head = html[:20000]
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', 'ignore')
+    lowered = head.lower()
+    return any(marker.lower() in lowered for marker in CHALLENGE_MARKERS)
+
+
+def identity_headers(user_agent: str, accept_language: str) -> Dict[str, str]:
+    """Request headers a real browser with this user agent sends"""
+    headers = {
+        'User-Agent': user_agent,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': accept_language,
+        'Upgrade-Insecure-Requests': '1',
+    }
+    chrome = re.search(r'Chrome/(\d+)', user_agent)
+    if chrome and 'Firefox' not in user_agent:
+        # Chromium browsers add client hints that must agree with the user agent
+        version = chrome.group(1)
+        brand = 'Microsoft Edge' if 'Edg/' in user_agent else 'Google Chrome'
+        platform = next((name for token, name in _PLATFORMS if token in user_agent), 'Windows')
+        headers['Accept'] = ('text/html,application/xhtml+xml,application/xml;q=0.9,'
+                             'image/avif,image/webp,image/apng,*/*;q=0.8')
+        headers['sec-ch-ua'] = f'"Chromium";v="{version}", "{brand}";v="{version}", "Not-A.Brand";v="99"'
+        headers['sec-ch-ua-mobile'] = '?1' if 'Mobile' in user_agent else '?0'
+        headers['sec-ch-ua-platform'] = f'"{platform}"'
+    return headers
+
+
+def _desktop_user_agent() -> str:
+    try:
+        from fake_useragent import UserAgent
+        agents = UserAgent()
+        for _ in range(20):
+            agent = agents.random
+            if 'Mobile' not in agent and 'Android' not in agent:
+                return agent
+    except Exception:
+        pass
+    return FALLBACK_USER_AGENT
+
+
+class Identity:
+    """A browser identity: user agent, matching headers and cookies, used together.
+
+    Cookies are kept as plain dicts (name, value, domain, path, expires,
+    secure) so requests sessions and Playwright contexts can share them;
+    Selenium keeps its own in the identity's Chrome profile directory.
+    """
+
+    def __init__(self, id: str, user_agent: str, headers: Dict[str, str], cookies: List[Dict] = None,
+                 attempts: int = 0, successes: int = 0, consecutive_blocks: int = 0,
+                 created_at: str = None, last_used: str = None):
+        self.id = id
+        self.user_agent = user_agent
+        self.headers = headers
+        self.cookies = cookies or []
+        self.attempts = attempts
+        self.successes = successes
+        self.consecutive_blocks = consecutive_blocks
+        self.created_at = created_at or datetime.utcnow().isoformat()
+        self.last_used = last_used
+        self.profile_dir = None
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.attempts if self.attempts else 1.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'user_agent': self.user_agent,
+            'headers': self.headers,
+            'cookies': self.cookies,
+            'attempts': self.attempts,
+            'successes': self.successes,
+            'consecutive_blocks': self.consecutive_blocks,
+            'created_at': self.created_at,
+            'last_used': self.last_used,
+        }
+
+    def apply_to(self, session):
+        """Set this identity's headers and cookies on a requests session"""
+        session.headers.update(self.headers)
+        for cookie in self.cookies:
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                                path=cookie.get('path', '/'), expires=cookie.get('expires'),
+                                secure=cookie.get('secure', False))
+
+    @staticmethod
+    def cookies_from_jar(jar) -> List[Dict]:
+        return [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path,
+                 'expires': c.expires, 'secure': bool(c.secure)} for c in jar]
+
+    def __repr__(self):
+        return f"<Identity(id='{self.id}', attempts={self.attempts}, success_rate={self.success_rate:.2f})>"
+
+
+class SessionPool:
+    """Persistent browser identities for one site, rotated as a whole.
+
+    Identities live in ``<directory>/<site>/<id>.json`` next to a Chrome
+    profile directory of the same name, so cookies, consent and anti-bot
+    tokens survive restarts. Scrapers lease one identity at a time; the
+    pool hands out the least recently used healthy one and creates new
+    ones while all are busy, up to ``size``; past that, identities are shared.
+
+    Each fetch is recorded as a success or a block (challenge page). An
+    identity is retired, its files deleted, after ``max_blocks`` blocks in
+    a row or when its success rate over at least ``min_attempts`` fetches
+    drops below ``min_success_rate``. The profile directory of a leased
+    identity is only deleted when its last lease is released.
+
+    Fetch counts and ``last_used`` change on every fetch, so they are kept
+    in memory and written at most every ``save_interval`` seconds per
+    identity, and on release; new cookies are written straight away.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, site: str, directory: str = DEFAULT_SESSION_DIR, size: int = 4,
+                 min_attempts: int = 10, min_success_rate: float = 0.7, max_blocks: int = 3,
+                 save_interval: float = 30.0):
+        self.site = site
+        self.directory = os.path.join(directory, re.sub(r'[^a-z0-9]+', '-', site.lower()))
+        self.size = size
+        self.min_attempts = min_attempts
+        self.min_success_rate = min_success_rate
+        self.max_blocks = max_blocks
+        self.save_interval = save_interval
+        self.retired = 0
+        self._identities: Dict[str, Identity] = {}
+        self._leases: Dict[str, int] = {}
+        self._saved = {}
+        self._saved_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def shared(cls, site: str, directory: str = None, **kwargs) -> 'SessionPool':
+        """Process-wide pool for a site and directory, created on first use"""
+        directory = directory or os.environ.get('SESSION_DIR') or DEFAULT_SESSION_DIR
+        with cls._shared_lock:
+            key = (site, os.path.abspath(directory))
+            if key not in cls._shared:
+                cls._shared[key] = cls(site, directory, **kwargs)
+            return cls._shared[key]
+
+    def _path(self, identity_id: str) -> str:
+        return os.path.join(self.directory, f'{identity_id}.json')
+
+    def _load(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    identity = Identity(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                continue
+            identity.profile_dir = os.path.join(self.directory, f'{identity.id}.profile')
+            self._identities[identity.id] = identity
+            self._saved[identity.id] = identity.to_dict()
+            self._saved_at[identity.id] = time.monotonic()
+
+    def _save(self, identity: Identity):
+        state = identity.to_dict()
+        self._saved_at[identity.id] = time.monotonic()
+        if self._saved.get(identity.id) == state:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(identity.id)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        self._saved[identity.id] = state
+
+    def _new_identity(self) -> Identity:
+        user_agent = _desktop_user_agent()
+        identity = Identity(uuid.uuid4().hex[:12], user_agent,
+                            identity_headers(user_agent, random.choice(ACCEPT_LANGUAGES)))
+        identity.profile_dir = os.path.join(self.directory, f'{identity.id}.profile')
+        self._identities[identity.id] = identity
+        self._save(identity)
+        return identity
+
+    def acquire(self, exclusive: bool = False) -> Identity:
+        """Lease the least busy identity, preferring ones not just blocked, then the least recently used
+
+        ``exclusive`` leases are never shared, e.g. for a Chrome profile that
+        only one browser can open at a time.
+        """
+        with self._lock:
+            busy = all(self._leases.get(i.id) for i in self._identities.values())
+            # Identities whose last fetch was blocked are only reused when the pool is full
+            healthy = any(not self._leases.get(i.id) and not i.consecutive_blocks
+                          for i in self._identities.values())
+            if (busy and exclusive) or (not healthy and len(self._identities) < self.size):
+                identity = self._new_identity()
+            else:
+                identity = min(self._identities.values(),
+                               key=lambda i: (self._leases.get(i.id, 0), i.consecutive_blocks, i.last_used or ''))
+            self._leases[identity.id] = self._leases.get(identity.id, 0) + 1
+            return identity
+
+    def release(self, identity: Identity):
+        """Return a leased identity, saving its cookies"""
+        with self._lock:
+            if self._leases.get(identity.id, 0) > 1:
+                self._leases[identity.id] -= 1
+            else:
+                self._leases.pop(identity.id, None)
+                if identity.id not in self._identities:
+                    # Retired while leased; the browser using the profile has quit by now
+                    shutil.rmtree(identity.profile_dir, ignore_errors=True)
+            if identity.id in self._identities:
+                self._save(identity)
+
+    def record(self, identity: Identity, blocked: bool, cookies: List[Dict] = None) -> bool:
+        """Record a fetch made with an identity; returns False once it is retired"""
+        with self._lock:
+            identity.attempts += 1
+            identity.last_used = datetime.utcnow().isoformat()
+            if blocked:
+                identity.consecutive_blocks += 1
+            else:
+                identity.successes += 1
+                identity.consecutive_blocks = 0
+            cookies_changed = cookies is not None and cookies != identity.cookies
+            if cookies is not None:
+                identity.cookies = cookies
+            if (identity.consecutive_blocks >= self.max_blocks or
+                    (identity.attempts >= self.min_attempts and identity.success_rate < self.min_success_rate)):
+                self._retire(identity)
+                return False
+            if identity.id in self._identities and (
+                    cookies_changed or
+                    time.monotonic() - self._saved_at.get(identity.id, 0) >= self.save_interval):
+                self._save(identity)
+            return True
+
+    def retire(self, identity: Identity):
+        """Drop an identity and its files, e.g. when a challenge can't be passed"""
+        with self._lock:
+            self._retire(identity)
+
+    def _retire(self, identity: Identity):
+        if self._identities.pop(identity.id, None) is None:
+            return
+        self._saved.pop(identity.id, None)
+        self._saved_at.pop(identity.id, None)
+        self.retired += 1
+        try:
+            os.remove(self._path(identity.id))
+        except OSError:
+            pass
+        # A browser may still have the profile open; release deletes it then
+        if not self._leases.get(identity.id):
+            shutil.rmtree(identity.profile_dir, ignore_errors=True)
+
+    def stats(self) -> List[Dict]:
+        """Per-identity attempts and success rates, best first"""
+        with self._lock:
+            identities = sorted(self._identities.values(), key=lambda i: i.success_rate, reverse=True)
+            return [{'id': identity.id, 'user_agent': identity.user_agent, 'attempts': identity.attempts,
+                     'success_rate': round(identity.success_rate, 3), 'cookies': len(identity.cookies),
+                     'leases': self._leases.get(identity.id, 0)}
+                    for identity in identities]
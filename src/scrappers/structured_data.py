@@ -0,0 +1,165 @@
+import json
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+# Script variables under which marketplaces embed their page state
+EMBEDDED_STATE_MARKERS = ['__moduleData__', 'app.run(', '__INITIAL_STATE__', '__NEXT_DATA__']
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json_ld(soup: BeautifulSoup) -> List[Dict]:
+    """Return every JSON-LD object on the page, flattening @graph lists"""
+    objects = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except (ValueError, TypeError):
+            continue
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if isinstance(item, dict) and '@graph' in item:
+                objects.extend(x for x in item['@graph'] if isinstance(x, dict))
+            elif isinstance(item, dict):
+                objects.append(item)
+    return objects
+
+
+def extract_embedded_state(soup: BeautifulSoup) -> Dict:
+    """Return the first JSON object assigned to a known page-state variable"""
+    for script in soup.find_all('script'):
+        text = script.string or ''
+        for marker in EMBEDDED_STATE_MARKERS:
+            pos = text.find(marker)
+            if pos == -1:
+                continue
+            start = text.find('{', pos)
+            if start == -1:
+                continue
+            try:
+                state, _ = _decoder.raw_decode(text, start)
+            except ValueError:
+                continue
+            if isinstance(state, dict):
+                return state
+        if script.get('id') == '__NEXT_DATA__':
+            try:
+                return json.loads(text)
+            except ValueError:
+                continue
+    return {}
+
+
+def find_key(obj, key: str):
+    """Depth-first search for the first value stored under ``key``"""
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            if key in current and current[key] not in (None, '', [], {}):
+                return current[key]
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+    return None
+
+
+def _as_text(value) -> str:
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('title') or value.get('value') or ''
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    return str(value).strip() if value is not None else ''
+
+
+def _as_float(value) -> Optional[float]:
+    if isinstance(value, dict):
+        value = value.get('value') or value.get('average')
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_ld_product(objects: List[Dict]) -> Dict:
+    for obj in objects:
+        kind = obj.get('@type')
+        kinds = kind if isinstance(kind, list) else [kind]
+        if 'Product' in kinds:
+            return obj
+    return {}
+
+
+def _breadcrumb_category(objects: List[Dict]) -> str:
+    for obj in objects:
+        if obj.get('@type') == 'BreadcrumbList':
+            names = [_as_text(item.get('item') or item) for item in obj.get('itemListElement', [])]
+            names = [name for name in names if name]
+            # The last crumb is usually the product itself
+            if len(names) >= 2:
+                return names[-2]
+    return ''
+
+
+def extract_product_attributes(soup: BeautifulSoup) -> Dict:
+    """Extract the full product attribute set from JSON-LD and embedded state
+
+    Missing attributes are returned as empty values so callers can merge the
+    result over whatever the listing page already provided.
+    """
+    objects = extract_json_ld(soup)
+    product = _json_ld_product(objects)
+    state = extract_embedded_state(soup)
+
+    offers = product.get('offers') or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    rating = product.get('aggregateRating') or {}
+
+    images = product.get('image') or find_key(state, 'images') or []
+    if isinstance(images, (str, dict)):
+        # A single URL or ImageObject
+        images = [images]
+    images = [img if isinstance(img, str) else _as_text(img.get('src') or img.get('url') or img.get('contentUrl'))
+              for img in images if isinstance(img, (str, dict))]
+    images = ['https:' + img if img.startswith('//') else img for img in images if img]
+
+    specs = find_key(state, 'specifications') or {}
+    if isinstance(specs, dict) and specs:
+        # Daraz keys specifications by SKU id; take the first SKU's features
+        first = next(iter(specs.values()))
+        if isinstance(first, dict) and 'features' in first:
+            specs = first['features']
+    if not isinstance(specs, dict):
+        specs = {}
+
+    availability = _as_text(offers.get('availability'))
+    in_stock = None
+    if availability:
+        in_stock = 'InStock' in availability
+    else:
+        stock = find_key(state, 'stock')
+        if stock is not None:
+            in_stock = bool(_as_float(stock))
+
+    category = _as_text(product.get('category')) or _breadcrumb_category(objects)
+    if not category:
+        crumbs = find_key(state, 'Breadcrumb') or find_key(state, 'breadcrumb') or []
+        names = [_as_text(crumb) for crumb in crumbs] if isinstance(crumbs, list) else []
+        names = [name for name in names if name]
+        category = names[-2] if len(names) >= 2 else ''
+
+    return {
+        'name': _as_text(product.get('name')),
+        'price': _as_float(offers.get('price') or offers.get('lowPrice')),
+        'brand': _as_text(product.get('brand')) or _as_text(find_key(state, 'brandName')),
+        'category': category,
+        'image_url': images[0] if images else '',
+        'images': images,
+        'description': _as_text(product.get('description')),
+        'specs': {str(k): _as_text(v) for k, v in specs.items()},
+        'rating': _as_float(rating.get('ratingValue')) if rating else _as_float(find_key(state, 'average')),
+        'review_count': int(_as_float(rating.get('reviewCount') or rating.get('ratingCount')) or 0) if rating else 0,
+        'in_stock': in_stock,
+    }
@@ -0,0 +1,183 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Tuple
+
+# Words of a name that can start a match ("galaxy" finds "Samsung Galaxy S24")
+MAX_WORDS = 12
+# Index keys are cut to this many characters; longer prefixes are checked against the full text
+KEY_LENGTH = 32
+# Prefix ranges larger than this are answered by scanning entries in weight order
+SCAN_LIMIT = 4000
+# Seconds the weight order may lag behind weight changes
+REORDER_INTERVAL = 30.0
+
+_WORD = re.compile(r'\S+')
+_END = '\U0010ffff'
+
+
+def normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', text or '').strip().lower()
+
+
+class _PrefixIndex:
+    """Sorted array of word-start suffixes of weighted texts.
+
+    A prefix is a contiguous range of the sorted keys, found by binary
+    search. New texts are buffered and merged into the array on the next
+    lookup, which Python's sort does in about linear time since both parts
+    are already sorted runs.
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.display: List[str] = []
+        self.weights: List[float] = []
+        self._ids: Dict[str, int] = {}
+        self._keys: List[Tuple[str, int]] = []
+        self._pending: List[Tuple[str, int]] = []
+        self._by_weight: List[int] = []
+        self._ordered_at = 0.0
+        self._ordered_count = 0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, text: str, weight: float = 1.0) -> int:
+        """Add a text, or add to its weight if it is already indexed"""
+        key = normalize(text)
+        entry = self._ids.get(key)
+        if entry is not None:
+            self.weights[entry] += weight
+            return entry
+        entry = self._ids[key] = len(self.texts)
+        self.texts.append(key)
+        self.display.append(re.sub(r'\s+', ' ', text).strip())
+        self.weights.append(weight)
+        for word in islice(_WORD.finditer(key), MAX_WORDS):
+            self._pending.append((key[word.start():word.start() + KEY_LENGTH], entry))
+        return entry
+
+    def _merge(self):
+        if self._pending:
+            self._keys.extend(self._pending)
+            self._keys.sort()
+            self._pending = []
+
+    def _order(self) -> Iterable[int]:
+        """Entry ids by descending weight, refreshed at most every REORDER_INTERVAL"""
+        now = time.monotonic()
+        if now - self._ordered_at > REORDER_INTERVAL:
+            self._by_weight = sorted(range(len(self.texts)), key=self.weights.__getitem__, reverse=True)
+            self._ordered_at = now
+            self._ordered_count = len(self.texts)
+        # Entries added since the last sort go last until the next one
+        return chain(self._by_weight, range(self._ordered_count, len(self.texts)))
+
+    def _starts_with(self, entry: int, prefix: str) -> bool:
+        text = self.texts[entry]
+        return any(text.startswith(prefix, word.start()) for word in islice(_WORD.finditer(text), MAX_WORDS))
+
+    def matches(self, prefix: str, limit: int) -> List[int]:
+        """Ids of the heaviest texts with a word starting with ``prefix``"""
+        self._merge()
+        key = prefix[:KEY_LENGTH]
+        lo = bisect_left(self._keys, (key,))
+        hi = bisect_left(self._keys, (key + _END,), lo)
+        if hi - lo > SCAN_LIMIT:
+            # Short prefixes match a large share of the index; heavy entries
+            # are found after a short scan in weight order
+            found = []
+            for entry in self._order():
+                if self._starts_with(entry, prefix):
+                    found.append(entry)
+                    if len(found) == limit:
+                        break
+            return found
+        candidates = {entry for _, entry in self._keys[lo:hi]}
+        if len(prefix) > KEY_LENGTH:
+            candidates = {entry for entry in candidates if self._starts_with(entry, prefix)}
+        return heapq.nlargest(limit, candidates, key=self.weights.__getitem__)
+
+
+class SuggestionIndex:
+    """In-memory autocomplete over past queries and known listing names.
+
+    Queries rank first, those compared within ``fresh_for`` ahead of the
+    rest, so users are steered to searches that can be answered from stored
+    data instead of a new scrape. Listing names fill the remaining slots.
+    Weights are popularity: how often a query was ingested and how often a
+    listing was seen.
+    """
+
+    def __init__(self, fresh_for: timedelta = timedelta(minutes=15)):
+        self.fresh_for = fresh_for
+        self._queries = _PrefixIndex()
+        self._query_updated: List[datetime] = []
+        self._listings = _PrefixIndex()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._queries) + len(self._listings)
+
+    def add_query(self, query: str, weight: float = 1.0, updated_at: datetime = None):
+        with self._lock:
+            entry = self._queries.add(query, weight)
+            if entry == len(self._query_updated):
+                self._query_updated.append(updated_at)
+            elif updated_at and (self._query_updated[entry] is None or updated_at > self._query_updated[entry]):
+                self._query_updated[entry] = updated_at
+
+    def add_listing(self, name: str, weight: float = 1.0):
+        with self._lock:
+            self._listings.add(name, weight)
+
+    def observe(self, products: List, query: str = None, now: datetime = None):
+        """Fold an ingested batch into the index"""
+        if query:
+            self.add_query(query, 1.0, now or datetime.utcnow())
+        with self._lock:
+            for product in products:
+                if product.get('name'):
+                    self._listings.add(product['name'], 1.0)
+
+    def suggest(self, prefix: str, limit: int = 8, now: datetime = None) -> List[Dict]:
+        """Up to ``limit`` completions of ``prefix``, best first"""
+        prefix = normalize(prefix)
+        if not prefix or limit < 1:
+            return []
+        now = now or datetime.utcnow()
+        with self._lock:
+            suggestions = []
+            # Queries are few, so rank every match
+            for entry in self._queries.matches(prefix, len(self._queries)):
+                updated_at = self._query_updated[entry]
+                fresh = updated_at is not None and now - updated_at <= self.fresh_for
+                suggestions.append({
+                    'text': self._queries.display[entry],
+                    'kind': 'query',
+                    'weight': self._queries.weights[entry],
+                    'fresh': fresh,
+                    'updated_at': updated_at.isoformat() if updated_at else None,
+                })
+            suggestions.sort(key=lambda suggestion: (suggestion['fresh'], suggestion['weight']), reverse=True)
+            suggestions = suggestions[:limit]
+
+            taken = {suggestion['text'].lower() for suggestion in suggestions}
+            for entry in self._listings.matches(prefix, limit + len(suggestions)):
+                if len(suggestions) == limit:
+                    break
+                if self._listings.texts[entry] in taken:
+                    continue
+                suggestions.append({
+                    'text': self._listings.display[entry],
+                    'kind': 'listing',
+                    'weight': self._listings.weights[entry],
+                    'fresh': False,
+                    'updated_at': None,
+                })
+            return suggestions
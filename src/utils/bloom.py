@@ -0,0 +1,140 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import threading
+from typing import List
+
+
+class _BloomSlice:
+    """One fixed-capacity Bloom filter backed by a memory-mapped file"""
+
+    def __init__(self, path: str, capacity: int, error_rate: float, count: int = 0):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = count
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, math.ceil(-math.log2(error_rate)))
+        size = (self.bits + 7) // 8
+        with open(path, 'a+b') as f:
+            if os.path.getsize(path) < size:
+                f.truncate(size)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _positions(self, h1: int, h2: int):
+        # Double hashing: k positions from two independent 64-bit hashes
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def __contains__(self, hashes) -> bool:
+        bits = self._map
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(*hashes))
+
+    def add(self, hashes):
+        bits = self._map
+        for p in self._positions(*hashes):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ScalableBloomFilter:
+    """Persistent seen-set with a bounded false-positive rate.
+
+    Keys go into a chain of Bloom filters; when the newest is full a larger
+    one with a tighter error rate is appended, so the overall false-positive
+    rate stays below ``error_rate`` however many keys are added. The bit
+    arrays are memory-mapped files in ``path``, so the set survives restarts
+    without being loaded into memory. A false positive means a new key is
+    reported as seen; keys that were added are never reported missing.
+
+    Thread-safe; only one process should write to a directory at a time.
+    """
+
+    META_FILE = 'meta.json'
+
+    def __init__(self, path: str, initial_capacity: int = 100000, error_rate: float = 0.001,
+                 growth: int = 2, tightening: float = 0.5):
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._slices: List[_BloomSlice] = []
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            for i, entry in enumerate(meta['slices']):
+                self._slices.append(_BloomSlice(self._slice_path(i), entry['capacity'],
+                                                entry['error_rate'], entry['count']))
+
+    def _slice_path(self, index: int) -> str:
+        return os.path.join(self.path, f"slice-{index}.bin")
+
+    def _add_slice(self) -> _BloomSlice:
+        index = len(self._slices)
+        # The series of slice error rates sums to at most error_rate
+        bloom = _BloomSlice(
+            self._slice_path(index),
+            self.initial_capacity * self.growth ** index,
+            self.error_rate * (1 - self.tightening) * self.tightening ** index
+        )
+        self._slices.append(bloom)
+        return bloom
+
+    @staticmethod
+    def _hashes(key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def __contains__(self, key: str) -> bool:
+        hashes = self._hashes(key)
+        with self._lock:
+            return any(hashes in bloom for bloom in self._slices)
+
+    def __len__(self) -> int:
+        """Approximate number of keys added"""
+        return sum(bloom.count for bloom in self._slices)
+
+    def add(self, key: str) -> bool:
+        """Add a key; return False if it was (probably) already present"""
+        hashes = self._hashes(key)
+        with self._lock:
+            if any(hashes in bloom for bloom in self._slices):
+                return False
+            bloom = self._slices[-1] if self._slices else None
+            if bloom is None or bloom.count >= bloom.capacity:
+                bloom = self._add_slice()
+            bloom.add(hashes)
+            return True
+
+    def flush(self):
+        """Write bit arrays and slice counts to disk"""
+        with self._lock:
+            for bloom in self._slices:
+                bloom.flush()
+            meta = {'slices': [{'capacity': b.capacity, 'error_rate': b.error_rate, 'count': b.count}
+                               for b in self._slices]}
+            tmp_path = os.path.join(self.path, self.META_FILE + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, os.path.join(self.path, self.META_FILE))
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for bloom in self._slices:
+                bloom.close()
+            self._slices = []
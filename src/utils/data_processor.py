@@ -1,7 +1,10 @@
-import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, TYPE_CHECKING
 
-def normalize_product_names(df: pd.DataFrame) -> pd.DataFrame:
+# Only needed for annotations; importing pandas here would slow CLI startup
+if TYPE_CHECKING:
+    import pandas as pd
+
+def normalize_product_names(df: 'pd.DataFrame') -> 'pd.DataFrame':
     """Normalize product names to improve matching"""
     df_copy = df.copy()
     
@@ -18,7 +21,7 @@ def normalize_product_names(df: pd.DataFrame) -> pd.DataFrame:
     
     return df_copy
 
-def find_similar_products(df: pd.DataFrame, threshold: float = 0.8) -> List[Dict]:
+def find_similar_products(df: 'pd.DataFrame', threshold: float = 0.8) -> List[Dict]:
     """
     Find similar products across different sites based on name similarity
     This is a simplified version - in practice, you might want to use more sophisticated
@@ -49,7 +52,7 @@ def find_similar_products(df: pd.DataFrame, threshold: float = 0.8) -> List[Dict
     
     return similar_products
 
-def generate_price_comparison_report(df: pd.DataFrame) -> Dict:
+def generate_price_comparison_report(df: 'pd.DataFrame') -> Dict:
     """Generate a summary report of price comparisons"""
     if df.empty:
         return {}
@@ -66,6 +69,13 @@ def generate_price_comparison_report(df: pd.DataFrame) -> Dict:
         'products_by_site': df['site'].value_counts().to_dict()
     }
     
+    # Per-site stats in a single grouped pass rather than one filter per site
+    site_stats = df.groupby('site', observed=True)['price'].agg(['count', 'min', 'mean'])
+    report['site_stats'] = {
+        site: {'count': int(row['count']), 'min_price': row['min'], 'avg_price': row['mean']}
+        for site, row in site_stats.iterrows()
+    }
+    
     return report
 
 def format_price(price: float) -> str:
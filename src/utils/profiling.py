@@ -0,0 +1,284 @@
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'profiles'
+)
+
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.005
+
+# Capture the calls of this thread (and its stages in other threads) belong to
+_current = contextvars.ContextVar('profile_capture', default=None)
+
+
+def _thread_cpu_clock(thread_id: int):
+    """CPU clock id of a thread, or None where the platform has none"""
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class Capture:
+    """Stack samples and stage timings of one profiled call.
+
+    Threads are sampled while they run the call itself or one of its stages
+    (``fetch``, ``parse``, ``db``); every sample is filed under the stage
+    the thread is in. Each sample counts once in the wall-clock profile and
+    with the CPU time its thread used since the previous sample in the CPU
+    profile.
+    """
+
+    def __init__(self, name: str, query: str = None, interval: float = DEFAULT_INTERVAL):
+        self.name = name
+        self.query = query
+        self.interval = interval
+        self.frames: List[Dict] = []
+        self._frame_index: Dict[tuple, int] = {}
+        self.samples: List[List[int]] = []
+        self.wall_weights: List[float] = []
+        self.cpu_weights: List[float] = []
+        self.timings: Dict[str, float] = {}
+        self.started_at = datetime.utcnow()
+        self.duration = 0.0
+        self.path = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        # thread id -> stack of stage names; cpu clock and last reading per thread
+        self._threads: Dict[int, List[str]] = {}
+        self._cpu: Dict[int, list] = {}
+
+    def enter(self, stage: str):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads.setdefault(thread_id, []).append(stage)
+            if thread_id not in self._cpu:
+                clock = _thread_cpu_clock(thread_id)
+                self._cpu[thread_id] = [clock, time.clock_gettime(clock) if clock is not None else 0.0]
+
+    def leave(self, stage: str, elapsed: float):
+        thread_id = threading.get_ident()
+        with self._lock:
+            stages = self._threads.get(thread_id)
+            if stages:
+                stages.pop()
+                if not stages:
+                    del self._threads[thread_id]
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+
+    def _frame(self, key: tuple) -> int:
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            name, file, line = key
+            self.frames.append({'name': name, 'file': file, 'line': line} if file else {'name': name})
+        return index
+
+    def sample(self, frames: Dict[int, object]):
+        with self._lock:
+            for thread_id, stages in self._threads.items():
+                frame = frames.get(thread_id)
+                if frame is None or not stages:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append((f"[{stages[-1]}]", None, None))
+                self.samples.append([self._frame(key) for key in reversed(stack)])
+                self.wall_weights.append(self.interval)
+
+                clock, last = self._cpu[thread_id]
+                if clock is None:
+                    self.cpu_weights.append(0.0)
+                    continue
+                try:
+                    now = time.clock_gettime(clock)
+                except OSError:
+                    now = last
+                self._cpu[thread_id][1] = now
+                self.cpu_weights.append(now - last)
+
+    def speedscope(self) -> Dict:
+        """The capture in speedscope's file format, with the query and timings attached"""
+        def profile(kind, weights):
+            return {
+                'type': 'sampled', 'name': f"{self.name} '{self.query}' ({kind})", 'unit': 'seconds',
+                'startValue': 0, 'endValue': sum(weights), 'samples': self.samples, 'weights': weights,
+            }
+        profiles = [profile('wall', self.wall_weights)]
+        if any(self.cpu_weights):
+            profiles.append(profile('cpu', self.cpu_weights))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"{self.name} '{self.query}' {self.duration * 1000:.0f} ms",
+            'exporter': 'price-tracker',
+            'activeProfileIndex': 0,
+            'shared': {'frames': self.frames},
+            'profiles': profiles,
+            'metadata': {
+                'name': self.name,
+                'query': self.query,
+                'started_at': self.started_at.isoformat(),
+                'duration': self.duration,
+                'stages': self.timings,
+                'samples': len(self.samples),
+            },
+        }
+
+    def write(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '-', (self.query or '').lower()).strip('-')[:40]
+        stamp = self.started_at.strftime('%Y%m%dT%H%M%S%f')
+        self.path = os.path.join(directory, f"{stamp}-{self.name}-{slug or 'all'}.speedscope.json")
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.speedscope(), f)
+        return self.path
+
+
+class _Sampler:
+    """One background thread that samples every active capture"""
+
+    _lock = threading.Lock()
+    _captures: List[Capture] = []
+    _thread = None
+
+    @classmethod
+    def add(cls, capture: Capture):
+        with cls._lock:
+            cls._captures.append(capture)
+            if cls._thread is None:
+                cls._thread = threading.Thread(target=cls._run, name='profile-sampler', daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def remove(cls, capture: Capture):
+        with cls._lock:
+            cls._captures.remove(capture)
+
+    @classmethod
+    def _run(cls):
+        while True:
+            with cls._lock:
+                captures = list(cls._captures)
+                if not captures:
+                    cls._thread = None
+                    return
+            frames = sys._current_frames()
+            for capture in captures:
+                capture.sample(frames)
+            del frames
+            time.sleep(min(capture.interval for capture in captures))
+
+
+class _Stage:
+    __slots__ = ('capture', 'name', 'start')
+
+    def __init__(self, capture: Capture, name: str):
+        self.capture = capture
+        self.name = name
+
+    def __enter__(self):
+        self.capture.enter(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.capture.leave(self.name, time.perf_counter() - self.start)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """Context manager marking a stage of the profiled call, if one is being profiled
+
+    Costs one context variable lookup when nothing is being profiled.
+    """
+    capture = _current.get()
+    if capture is None:
+        return _NO_STAGE
+    return _Stage(capture, name)
+
+
+def current_capture() -> Optional[Capture]:
+    return _current.get()
+
+
+class _Profiled:
+    def __init__(self, profiler: 'Profiler', capture: Optional[Capture]):
+        self.profiler = profiler
+        self.capture = capture
+        self._token = None
+
+    def __enter__(self) -> Optional[Capture]:
+        if self.capture is not None:
+            self._token = _current.set(self.capture)
+            self.capture.enter(self.capture.name)
+            _Sampler.add(self.capture)
+        return self.capture
+
+    def __exit__(self, *exc):
+        capture = self.capture
+        if capture is None:
+            return None
+        _Sampler.remove(capture)
+        capture.duration = time.perf_counter() - capture._start
+        capture.leave(capture.name, capture.duration)
+        _current.reset(self._token)
+        try:
+            path = capture.write(self.profiler.directory)
+            print(f"Profile of {capture.name} '{capture.query}' ({capture.duration:.2f}s) written to {path}")
+        except OSError as e:
+            print(f"Error writing profile: {str(e)}")
+        return None
+
+
+class Profiler:
+    """Decides which calls to profile and where captures are written.
+
+    A call is profiled when it asks to be (``force=True``) or, at random,
+    for a ``rate`` fraction of calls. The rate defaults to the
+    PROFILE_RATE environment variable, so sampling can be turned on in a
+    deployment without a code change. Calls that aren't profiled pay for
+    one random number.
+    """
+
+    def __init__(self, rate: float = None, directory: str = None, interval: float = DEFAULT_INTERVAL):
+        if rate is None:
+            rate = float(os.environ.get('PROFILE_RATE') or 0)
+        self.rate = rate
+        self.directory = directory or os.environ.get('PROFILE_DIR') or DEFAULT_PROFILE_DIR
+        self.interval = interval
+
+    def capture(self, name: str, query: str = None, force: bool = None) -> _Profiled:
+        """Context manager yielding the Capture, or None if this call isn't profiled
+
+        ``force=False`` opts out even when sampling; a call that is already
+        being profiled isn't captured again.
+        """
+        if force is None:
+            force = self.rate > 0 and random.random() < self.rate
+        if not force or _current.get() is not None:
+            return _Profiled(self, None)
+        return _Profiled(self, Capture(name, query, self.interval))
@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+
+class ResultCache:
+    """Thread-safe TTL cache with single-flight computation.
+
+    When several callers ask for the same missing key at once, only the first
+    computes it; the others wait and reuse its result.
+    """
+
+    def __init__(self, ttl: float = 900, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def age(self, key: str):
+        """Seconds since ``key`` was computed, or None if not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else time.monotonic() - entry[0]
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            if len(self._entries) > self.max_entries:
+                # Evict the oldest entry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+                self._key_locks.pop(oldest, None)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], force: bool = False,
+                       cache_if: Callable[[Any], bool] = None):
+        """Return the cached value for ``key``, computing it at most once
+
+        A computed value that ``cache_if`` rejects (e.g. empty results after
+        a failed search) is returned but not stored, so the next call retries.
+        """
+        if not force:
+            value = self.get(key)
+            if value is not None:
+                return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another caller may have filled the entry while we waited
+            if not force:
+                value = self.get(key)
+                if value is not None:
+                    return value
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.set(key, value)
+            return value
@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Sort options offered by the web app: label -> (column, descending)
+SORT_OPTIONS = {
+    "Price (Low to High)": ('price', False),
+    "Price (High to Low)": ('price', True),
+    "Name (A-Z)": ('name', False),
+}
+
+
+class ResultView:
+    """Sorted, filterable, paginated view over a result DataFrame.
+
+    Sort orders are computed once as index arrays, and filters are boolean
+    masks over the original rows, so changing the sort, filters or page only
+    costs a few vectorized numpy operations plus slicing out one page.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if df.empty and 'price' not in df:
+            # A search without results comes back as a frame without columns
+            df = pd.DataFrame(columns=['name', 'price', 'site', 'url'])
+        self.df = df.reset_index(drop=True)
+        self._prices = self.df['price'].to_numpy(dtype=float)
+        self._sites = self.df['site'].to_numpy()
+        self._names = self.df['name'].fillna('').str.lower()
+        self._orders = {
+            'price': np.argsort(self._prices, kind='stable'),
+            'name': np.argsort(self._names.to_numpy(), kind='stable'),
+        }
+        self._text_masks: Dict[str, np.ndarray] = {}
+
+        self.sites = sorted(pd.unique(self._sites).tolist())
+        self.stats = {
+            'count': len(self.df),
+            'min_price': float(self._prices.min()) if len(self.df) else 0.0,
+            'max_price': float(self._prices.max()) if len(self.df) else 0.0,
+            'avg_price': float(self._prices.mean()) if len(self.df) else 0.0,
+        }
+
+    def __len__(self):
+        return len(self.df)
+
+    def _text_mask(self, text: str) -> np.ndarray:
+        mask = self._text_masks.get(text)
+        if mask is None:
+            mask = self._names.str.contains(text, regex=False).to_numpy()
+            if len(self._text_masks) > 32:
+                self._text_masks.clear()
+            self._text_masks[text] = mask
+        return mask
+
+    def select(self, sort: str = "Price (Low to High)", min_price: float = None,
+               max_price: float = None, sites: List[str] = None, text: str = None) -> np.ndarray:
+        """Row positions matching the filters, in display order"""
+        column, descending = SORT_OPTIONS[sort]
+        mask = np.ones(len(self.df), dtype=bool)
+        if min_price is not None:
+            mask &= self._prices >= min_price
+        if max_price is not None:
+            mask &= self._prices <= max_price
+        if sites is not None and len(sites) < len(self.sites):
+            mask &= np.isin(self._sites, sites)
+        text = (text or '').strip().lower()
+        if text:
+            mask &= self._text_mask(text)
+
+        order = self._orders[column]
+        if descending:
+            order = order[::-1]
+        return order[mask[order]]
+
+    def page(self, positions: np.ndarray, page: int, page_size: int) -> pd.DataFrame:
+        """Rows for one page (1-based) of a selection"""
+        start = max(page - 1, 0) * page_size
+        return self.df.iloc[positions[start:start + page_size]]
+
+    @staticmethod
+    def page_count(positions: np.ndarray, page_size: int) -> int:
+        return max(1, -(-len(positions) // page_size))
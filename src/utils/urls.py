@@ -0,0 +1,48 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track how a page was reached
+TRACKING_PARAMS = {
+    'spm', 'scm', 'from', 'clicktrackinfo', 'pvid', 'abtest', 'abbucket', 'mp', 'pos',
+    'search', '_keyori', 'sugg', 'fbclid', 'gclid', 'ref', 'ref_src'
+}
+
+# Daraz product pages end in -i<item id>[-s<sku id>].html
+DARAZ_ITEM_ID = re.compile(r'(?:^|[/-])i(\d+)(?:-s\d+)?\.html$')
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith('utm_')
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so links to the same page compare equal
+
+    Protocol-relative links get https, the host is lower-cased, the fragment
+    and tracking parameters are dropped and the remaining parameters sorted.
+    """
+    url = (url or '').strip()
+    if url.startswith('//'):
+        url = 'https:' + url
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k))
+    host = parts.netloc.lower()
+    if host.endswith(':443') and parts.scheme == 'https':
+        host = host[:-4]
+    return urlunsplit((parts.scheme.lower(), host, parts.path or '/', urlencode(query), ''))
+
+
+def item_id(url: str) -> str:
+    """Marketplace item id in a product URL, or None if it has none"""
+    match = DARAZ_ITEM_ID.search(urlsplit(url or '').path)
+    return f"i{match.group(1)}" if match else None
+
+
+def listing_identity(url: str) -> str:
+    """The item id for product pages, otherwise the canonical URL
+
+    Daraz links to one product under several slugs and SKU suffixes; the item
+    id is the part that stays the same.
+    """
+    return item_id(url) or canonical_url(url)
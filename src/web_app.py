@@ -1,14 +1,29 @@
 import streamlit as st
-import pandas as pd
 import sys
 import os
-from datetime import datetime
+import atexit
+import html
+import threading
+from datetime import datetime, timedelta
 
 # Add the parent directory to the path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.scrappers.scraper_manager import ScraperManager
 from src.utils.data_processor import format_price
+from src.utils.result_cache import ResultCache
+from src.utils.result_view import ResultView, SORT_OPTIONS
+
+# Search results are shared by every dashboard session for this long
+RESULT_TTL_SECONDS = 15 * 60
+PAGE_SIZES = [20, 50, 100]
+# Price history ranges; the resolution is picked to fit the range
+HISTORY_RANGES = {
+    "24 hours": timedelta(days=1),
+    "7 days": timedelta(days=7),
+    "30 days": timedelta(days=30),
+    "1 year": timedelta(days=365),
+}
 
 # Set page config
 st.set_page_config(
@@ -18,6 +33,91 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_backend():
+    """Process-wide scraping backend shared by every dashboard session
+    
+    The browser and database engine stay warm between searches. Scrapers are
+    not thread-safe, so live scrapes are serialized through the lock, while
+    the result cache lets sessions reuse each other's searches.
+    """
+    scraper_manager = ScraperManager()
+    atexit.register(scraper_manager.close)
+    return {
+        'scraper_manager': scraper_manager,
+        'scrape_lock': threading.Lock(),
+        'results': ResultCache(ttl=RESULT_TTL_SECONDS)
+    }
+
+def search_products(query: str, refresh: bool = False) -> ResultView:
+    """Return results for a query, scraping only on a shared cache miss
+    
+    The pre-sorted view is built once per result set and cached with it, so
+    every session showing those results shares it. Empty results (nothing
+    found, or a failed search) aren't cached, so the next search retries.
+    """
+    backend = get_backend()
+    scraper_manager = backend['scraper_manager']
+    
+    def scrape():
+        with backend['scrape_lock']:
+            df = scraper_manager.compare_products(query)
+        return ResultView(df)
+    
+    return backend['results'].get_or_compute(
+        scraper_manager.normalize_query(query), scrape, force=refresh, cache_if=len
+    )
+
+def get_suggestions(prefix: str, limit: int = 5) -> list:
+    """Autocomplete suggestions for the search box (from memory, no scraping)"""
+    if len(prefix.strip()) < 2:
+        return []
+    return get_backend()['scraper_manager'].suggest(prefix, limit)
+
+def price_history_chart(history: dict):
+    """Candlestick chart of a listing's OHLC price history"""
+    import plotly.graph_objects as go
+    
+    points = history['points']
+    figure = go.Figure(go.Candlestick(
+        x=[point['time'] for point in points],
+        open=[point['open'] for point in points],
+        high=[point['high'] for point in points],
+        low=[point['low'] for point in points],
+        close=[point['close'] for point in points],
+        name=history['name']
+    ))
+    figure.update_layout(
+        title=f"{history['name'][:80]} (per {history['resolution']})",
+        yaxis_title="Price (Rs.)",
+        xaxis_rangeslider_visible=False,
+        height=400
+    )
+    return figure
+
+def render_product_card(row) -> str:
+    """HTML for one product card"""
+    return f"""
+    <div class="product-card">
+        <div style="display: flex; justify-content: space-between; align-items: flex-start;">
+            <div>
+                <h3 style="margin: 0 0 0.5rem 0;">{html.escape(str(row.name))}</h3>
+                <div class="price-tag">{format_price(row.price)}</div>
+                <div style="margin: 1rem 0;">
+                    <span class="site-badge">{html.escape(str(row.site))}</span>
+                </div>
+            </div>
+            <div>
+                <a href="{html.escape(str(row.url), quote=True)}" target="_blank" style="text-decoration: none;">
+                    <button style="background: #28a745; color: white; border: none; padding: 0.5rem 1rem; border-radius: 5px; cursor: pointer;">
+                        View on Site
+                    </button>
+                </a>
+            </div>
+        </div>
+    </div>
+    """
+
 # Custom CSS for styling
 st.markdown("""
 <style>
@@ -120,15 +220,27 @@ with st.sidebar:
     st.header("🔍 Search")
     search_query = st.text_input("Enter product name:", value=st.session_state.search_query)
     
-    if st.button("🔍 Search Products", use_container_width=True):
+    # Completions from past searches and known listings; picking one avoids a
+    # scrape for a vague or mistyped query
+    chosen = None
+    suggestions = get_suggestions(search_query)
+    if suggestions:
+        st.caption("Suggestions (⚡ prices fetched in the last 15 minutes)")
+        for i, suggestion in enumerate(suggestions):
+            label = ("⚡ " if suggestion['fresh'] else "") + suggestion['text'][:60]
+            if st.button(label, key=f"suggestion_{i}", use_container_width=True):
+                chosen = suggestion['text']
+    
+    refresh = st.checkbox("Fetch fresh prices", value=False,
+                          help="Ignore results cached from recent searches")
+    
+    if st.button("🔍 Search Products", use_container_width=True) or chosen:
+        search_query = chosen or search_query
         if search_query:
             st.session_state.search_query = search_query
             with st.spinner("Searching for products... This may take a moment."):
                 try:
-                    scraper_manager = ScraperManager()
-                    df = scraper_manager.compare_products(search_query)
-                    st.session_state.search_results = df
-                    scraper_manager.close()
+                    st.session_state.search_results = search_products(search_query, refresh=refresh)
                 except Exception as e:
                     st.error(f"Error occurred while searching: {str(e)}")
         else:
@@ -150,79 +262,106 @@ with st.sidebar:
     st.markdown("Made with ❤️ by Prabesh Subedi")
 
 # Main content
-if st.session_state.search_results is not None and not st.session_state.search_results.empty:
-    df = st.session_state.search_results
+if st.session_state.search_results is not None and len(st.session_state.search_results):
+    view = st.session_state.search_results
+    df = view.df
     
-    # Summary metrics
+    # Summary metrics (computed once per result set)
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Products", len(df))
+        st.metric("Total Products", view.stats['count'])
     
     with col2:
-        st.metric("Lowest Price", format_price(df['price'].min()))
+        st.metric("Lowest Price", format_price(view.stats['min_price']))
     
     with col3:
-        st.metric("Highest Price", format_price(df['price'].max()))
+        st.metric("Highest Price", format_price(view.stats['max_price']))
     
     with col4:
-        avg_price = df['price'].mean()
-        st.metric("Average Price", format_price(avg_price))
+        st.metric("Average Price", format_price(view.stats['avg_price']))
     
     # Display products
     st.markdown("### 📊 Price Comparison Results")
     
-    # Sort options
-    sort_option = st.selectbox(
-        "Sort by:",
-        ["Price (Low to High)", "Price (High to Low)", "Name (A-Z)"],
-        key="sort_option"
-    )
+    # Sort and filter options
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        sort_option = st.selectbox("Sort by:", list(SORT_OPTIONS), key="sort_option")
+    with col2:
+        selected_sites = st.multiselect("Sites:", view.sites, default=view.sites, key="site_filter")
+    with col3:
+        name_filter = st.text_input("Filter by name:", key="name_filter")
     
-    # Sort the dataframe
-    if sort_option == "Price (Low to High)":
-        df_sorted = df.sort_values('price')
-    elif sort_option == "Price (High to Low)":
-        df_sorted = df.sort_values('price', ascending=False)
+    min_price, max_price = view.stats['min_price'], view.stats['max_price']
+    if max_price > min_price:
+        price_range = st.slider("Price range (Rs.):", min_value=min_price, max_value=max_price,
+                                value=(min_price, max_price), key="price_filter")
     else:
-        df_sorted = df.sort_values('name')
-    
-    # Display products in a grid
-    for idx, row in df_sorted.iterrows():
-        with st.container():
-            st.markdown(f"""
-            <div class="product-card">
-                <div style="display: flex; justify-content: space-between; align-items: flex-start;">
-                    <div>
-                        <h3 style="margin: 0 0 0.5rem 0;">{row['name']}</h3>
-                        <div class="price-tag">{format_price(row['price'])}</div>
-                        <div style="margin: 1rem 0;">
-                            <span class="site-badge">{row['site']}</span>
-                        </div>
-                    </div>
-                    <div>
-                        <a href="{row['url']}" target="_blank" style="text-decoration: none;">
-                            <button style="background: #28a745; color: white; border: none; padding: 0.5rem 1rem; border-radius: 5px; cursor: pointer;">
-                                View on Site
-                            </button>
-                        </a>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        price_range = (min_price, max_price)
+    
+    positions = view.select(sort_option, min_price=price_range[0], max_price=price_range[1],
+                            sites=selected_sites, text=name_filter)
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Per page:", PAGE_SIZES, key="page_size")
+    page_count = ResultView.page_count(positions, page_size)
+    if st.session_state.get('page', 1) > page_count:
+        st.session_state.page = page_count
+    with col2:
+        page = st.number_input("Page:", min_value=1, max_value=page_count, step=1, key="page")
+    with col3:
+        st.markdown(f"<br>Showing {len(positions)} of {len(view)} products, page {page} of {page_count}",
+                    unsafe_allow_html=True)
+    
+    # Render the visible window as a single element instead of one per product
+    page_rows = view.page(positions, page, page_size)
+    st.markdown(
+        "".join(render_product_card(row) for row in page_rows.itertuples()),
+        unsafe_allow_html=True
+    )
+    
+    # Price history of one listing from the stored rollups
+    st.markdown("### 📈 Price History")
+    listings = {f"{row.name[:80]} ({row.site})": (row.url, row.site)
+                for row in page_rows.itertuples() if row.url}
+    if listings:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            chosen = st.selectbox("Listing:", list(listings), key="history_listing")
+        with col2:
+            history_range = st.selectbox("Range:", list(HISTORY_RANGES), key="history_range")
+        url, site = listings[chosen]
+        history = get_backend()['scraper_manager'].get_price_history(
+            url, site, start=datetime.utcnow() - HISTORY_RANGES[history_range]
+        )
+        if history and history['points']:
+            st.plotly_chart(price_history_chart(history), use_container_width=True)
+        else:
+            st.info("No price history recorded for this listing in that range yet.")
     
     # Export option
     st.markdown("---")
     col1, col2 = st.columns([1, 3])
+    export_name = f"price_comparison_{search_query.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     with col1:
         if st.button("💾 Export to CSV"):
             csv = df.to_csv(index=False)
             st.download_button(
                 label="Download CSV",
                 data=csv,
-                file_name=f"price_comparison_{search_query.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                file_name=f"{export_name}.csv",
                 mime="text/csv"
             )
+    with col2:
+        if st.button("🗄️ Export to Parquet"):
+            st.download_button(
+                label="Download Parquet",
+                data=df.to_parquet(index=False),
+                file_name=f"{export_name}.parquet",
+                mime="application/octet-stream"
+            )
     
 else:
     # Welcome message
@@ -0,0 +1,150 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database.init_db import get_session
+from database.aggregates import cluster_key, get_comparison_summary, listing_key, update_aggregates
+from database.models import Base, ClusterSitePrice, ListingPriceStats
+from scrappers.scraper_manager import ScraperManager
+
+START = datetime(2025, 6, 1, 12)
+
+def listing(item, price, site='Daraz'):
+    return {'name': f'Phone {item}', 'price': price, 'site': site,
+            'url': f'https://www.{site.lower()}.com.np/products/phone-i{item}.html?spm=a2a0e'}
+
+class Clock(datetime):
+    """datetime whose utcnow() is set by the test"""
+    now = START
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+def temp_engine(tmpdir):
+    engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'products.db')}")
+    Base.metadata.create_all(engine)
+    return engine
+
+class TestAggregates(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = temp_engine(self.tmpdir)
+        self.session = get_session(self.engine)
+        Clock.now = START
+        patcher = mock.patch('database.aggregates.datetime', Clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def ingest(self, products, query=None, changed=None, hours=0):
+        Clock.now = START + timedelta(hours=hours)
+        update_aggregates(self.session, products, query, changed=changed)
+        self.session.commit()
+
+    def stats(self, item):
+        return self.session.query(ListingPriceStats).filter_by(listing_key=listing_key(listing(item, 0))).one()
+
+    def test_keys(self):
+        self.assertEqual(listing_key(listing(7, 100)), 'daraz:i7')
+        self.assertEqual(listing_key({'name': 'No URL', 'site': 'Other', 'price': 1}), 'other:No URL')
+        self.assertEqual(cluster_key('  iPhone   15 '), 'iphone 15')
+
+    def test_min_max_and_last_changed(self):
+        self.ingest([listing(1, 1000)])
+        self.ingest([listing(1, 1000)], hours=1)
+        self.ingest([listing(1, 800)], hours=2)
+        self.ingest([listing(1, 1200)], hours=3)
+        self.ingest([listing(1, 1200)], hours=4)
+
+        self.session.expire_all()
+        row = self.stats(1)
+        self.assertEqual((row.current_price, row.min_price, row.max_price), (1200, 800, 1200))
+        self.assertEqual(row.observations, 5)
+        self.assertEqual((row.first_seen, row.last_changed, row.last_seen),
+                         (START, START + timedelta(hours=3), START + timedelta(hours=4)))
+        self.assertEqual(row.url, listing(1, 0)['url'])
+
+    def test_unchanged_listings_only_bump_last_seen(self):
+        self.ingest([listing(1, 1000), listing(2, 500)])
+        self.ingest([listing(1, 900), listing(2, 500)], changed=[listing(1, 900)], hours=1)
+
+        self.session.expire_all()
+        first, second = self.stats(1), self.stats(2)
+        self.assertEqual((first.current_price, first.last_changed), (900, START + timedelta(hours=1)))
+        self.assertEqual((second.observations, second.last_seen, second.last_changed),
+                         (2, START + timedelta(hours=1), START))
+
+    def test_best_price_per_site(self):
+        self.ingest([listing(1, 1000), listing(2, 700), listing(3, 900, site='Other'), listing(4, 1500, site='Other')],
+                    query='Phone')
+        summary = get_comparison_summary(self.session, '  PHONE ')
+        self.assertEqual((summary['total_products'], sorted(summary['sites'])), (4, ['Daraz', 'Other']))
+        self.assertEqual(summary['price_range'], {'min': 700, 'max': 1500, 'average': 1025})
+        self.assertEqual(summary['by_site']['Daraz'],
+                         {'count': 2, 'best_price': 700, 'best_name': 'Phone 2',
+                          'best_url': listing(2, 0)['url'], 'average': 850})
+        self.assertEqual(summary['by_site']['Other']['best_price'], 900)
+
+        # The next search replaces the snapshot, including a best price that went up
+        self.ingest([listing(1, 1000), listing(2, 1100)], query='phone', hours=1)
+        daraz = get_comparison_summary(self.session, 'phone')['by_site']['Daraz']
+        self.assertEqual((daraz['best_price'], daraz['best_name']), (1000, 'Phone 1'))
+        self.assertEqual(self.session.query(ClusterSitePrice).count(), 2)
+        self.assertIsNone(get_comparison_summary(self.session, 'laptop'))
+
+    def test_max_age(self):
+        self.ingest([listing(1, 1000)], query='phone')
+        self.ingest([listing(1, 900, site='Other')], query='phone', hours=1)
+
+        # Fresh while the newest site snapshot is within max_age
+        Clock.now = START + timedelta(hours=1, minutes=10)
+        summary = get_comparison_summary(self.session, 'phone', max_age=timedelta(minutes=15))
+        self.assertEqual(summary['updated_at'], (START + timedelta(hours=1)).isoformat())
+        Clock.now = START + timedelta(hours=1, minutes=20)
+        self.assertIsNone(get_comparison_summary(self.session, 'phone', max_age=timedelta(minutes=15)))
+        self.assertIsNotNone(get_comparison_summary(self.session, 'phone'))
+
+class TestManagerComparison(unittest.TestCase):
+    """The summary the API's ``max_age`` path answers from"""
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = temp_engine(self.tmpdir)
+        patcher = mock.patch('scrappers.scraper_manager.init_db', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = ScraperManager(alert_sinks=[], change_sinks=[])
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_saved_batch_answers_within_max_age(self):
+        self.assertIsNone(self.manager.get_comparison_summary('phone', timedelta(seconds=300)))
+        self.manager.save_products_to_db([listing(1, 1000), listing(2, 700)], 'phone')
+        summary = self.manager.get_comparison_summary('phone', timedelta(seconds=300))
+        self.assertEqual((summary['total_products'], summary['by_site']['Daraz']['best_name']), (2, 'Phone 2'))
+
+        # Once the snapshot is older than max_age the sites have to be searched again
+        session = get_session(self.engine)
+        session.query(ClusterSitePrice).update({'updated_at': datetime.utcnow() - timedelta(seconds=301)})
+        session.commit()
+        session.close()
+        self.assertIsNone(self.manager.get_comparison_summary('phone', timedelta(seconds=300)))
+        self.assertIsNotNone(self.manager.get_comparison_summary('phone'))
+
+if __name__ == '__main__':
+    unittest.main()
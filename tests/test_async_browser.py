@@ -0,0 +1,129 @@
+import sys
+import os
+import asyncio
+import types
+import unittest
+from unittest import mock
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scrappers.async_browser import AsyncBrowserPool
+from scrappers.daraz_scraper import DarazScraper
+
+class FakePage:
+    def __init__(self):
+        self.url = None
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+
+    async def wait_for_selector(self, selector, **kwargs):
+        pass
+
+    async def content(self):
+        return f'<html><body><h1>{self.url}</h1></body></html>'
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+    async def add_cookies(self, cookies):
+        pass
+
+    async def cookies(self):
+        return []
+
+    async def close(self):
+        pass
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    async def new_context(self, **kwargs):
+        return FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+class FakePlaywright:
+    """Stands in for playwright.async_api; counts browser launches"""
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+
+    def async_playwright(self):
+        return self
+
+    async def start(self):
+        return self
+
+    async def launch(self, **kwargs):
+        # Yield so concurrent renders would interleave during startup
+        await asyncio.sleep(0.01)
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        pass
+
+class TestAsyncBrowserPool(unittest.TestCase):
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        module = types.ModuleType('playwright.async_api')
+        module.async_playwright = self.playwright.async_playwright
+        patcher = mock.patch.dict(sys.modules, {'playwright': types.ModuleType('playwright'),
+                                                'playwright.async_api': module})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        while AsyncBrowserPool._shared is not None:
+            AsyncBrowserPool.release_shared()
+
+    def test_one_browser_for_concurrent_renders(self):
+        pool = AsyncBrowserPool(max_tabs=2, delay_range=(0, 0))
+        try:
+            urls = [f'https://www.daraz.com.np/catalog/?q=tv&page={i}' for i in range(6)]
+            pages = pool.fetch_many(urls)
+            self.assertEqual([url in html for url, html in zip(urls, pages)], [True] * 6)
+            self.assertEqual(len(self.playwright.browsers), 1)
+        finally:
+            pool.close()
+        self.assertTrue(self.playwright.browsers[0].closed)
+
+    def test_shared_reference_counting(self):
+        first = AsyncBrowserPool.shared(delay_range=(0, 0))
+        second = AsyncBrowserPool.shared()
+        self.assertIs(first, second)
+        first.fetch('https://www.daraz.com.np/')
+
+        AsyncBrowserPool.release_shared()
+        self.assertIs(AsyncBrowserPool._shared, first)
+        self.assertFalse(self.playwright.browsers[0].closed)
+        AsyncBrowserPool.release_shared()
+        self.assertIsNone(AsyncBrowserPool._shared)
+        self.assertTrue(self.playwright.browsers[0].closed)
+        # Releasing more often than acquiring is harmless
+        AsyncBrowserPool.release_shared()
+        self.assertIsNot(AsyncBrowserPool.shared(), first)
+
+    def test_scrapers_share_the_browser(self):
+        scrapers = [DarazScraper(use_selenium=True, browser_backend='playwright', delay_range=(0, 0))
+                    for _ in range(2)]
+        urls = ['https://www.daraz.com.np/a', 'https://www.daraz.com.np/b']
+        for scraper in scrapers:
+            pages = scraper.get_pages(urls)
+            self.assertEqual([page.h1.text for page in pages], urls)
+        self.assertIs(scrapers[0].browser_pool, scrapers[1].browser_pool)
+        self.assertEqual(len(self.playwright.browsers), 1)
+
+        scrapers[0].close()
+        self.assertFalse(self.playwright.browsers[0].closed)
+        scrapers[1].close()
+        self.assertTrue(self.playwright.browsers[0].closed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils import autocomplete
+from utils.autocomplete import SuggestionIndex
+from scrappers.scraper_manager import ScraperManager
+
+NOW = datetime(2025, 3, 13, 12, 0)
+
+def texts(suggestions):
+    return [suggestion['text'] for suggestion in suggestions]
+
+class TestSuggestionIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SuggestionIndex()
+        self.index.add_listing('Samsung Galaxy S24 Ultra 12GB/256GB', 5)
+        self.index.add_listing('Samsung Galaxy A15 4GB/128GB', 20)
+        self.index.add_listing('Xiaomi Redmi Note 13', 8)
+        self.index.add_listing('Galaxy Buds FE', 1)
+
+    def test_matches_word_starts_by_weight(self):
+        self.assertEqual(texts(self.index.suggest('gal', now=NOW)),
+                         ['Samsung Galaxy A15 4GB/128GB', 'Samsung Galaxy S24 Ultra 12GB/256GB', 'Galaxy Buds FE'])
+        self.assertEqual(texts(self.index.suggest('  SAMSUNG   galaxy s', now=NOW)),
+                         ['Samsung Galaxy S24 Ultra 12GB/256GB'])
+        self.assertEqual(self.index.suggest('alaxy', now=NOW), [])
+        self.assertEqual(len(self.index.suggest('g', limit=2, now=NOW)), 2)
+
+    def test_fresh_queries_first(self):
+        self.index.add_query('samsung galaxy', 3, NOW - timedelta(hours=2))
+        self.index.add_query('samsung tv', 1, NOW - timedelta(minutes=5))
+        suggestions = self.index.suggest('sam', limit=3, now=NOW)
+        self.assertEqual(texts(suggestions), ['samsung tv', 'samsung galaxy', 'Samsung Galaxy A15 4GB/128GB'])
+        self.assertEqual([s['fresh'] for s in suggestions], [True, False, False])
+        self.assertEqual([s['kind'] for s in suggestions], ['query', 'query', 'listing'])
+
+    def test_incremental_updates(self):
+        self.index.observe([{'name': 'Xiaomi Redmi Note 13', 'price': 1}] * 20 +
+                           [{'name': 'Xiaomi Pad 6', 'price': 1}], 'xiaomi', now=NOW)
+        suggestions = self.index.suggest('xia', now=NOW)
+        self.assertEqual(texts(suggestions), ['xiaomi', 'Xiaomi Redmi Note 13', 'Xiaomi Pad 6'])
+        self.assertEqual(suggestions[1]['weight'], 28)
+
+    def test_long_prefix_and_large_ranges(self):
+        long_name = 'Apple MacBook Pro 14 inch M3 Pro chip with 11 core CPU'
+        self.index.add_listing(long_name, 1)
+        self.assertEqual(texts(self.index.suggest('apple macbook pro 14 inch m3 pro chip', now=NOW)), [long_name])
+        self.assertEqual(self.index.suggest('apple macbook pro 14 inch m3 max chip', now=NOW), [])
+        # Ranges over the scan limit are answered from the weight order
+        with mock.patch.object(autocomplete, 'SCAN_LIMIT', 1):
+            self.assertEqual(texts(self.index.suggest('samsung', limit=1, now=NOW)),
+                             ['Samsung Galaxy A15 4GB/128GB'])
+
+class TestManagerSuggestions(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.manager = ScraperManager(db_url=f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}",
+                                      alert_sinks=[], change_sinks=[])
+
+    def tearDown(self):
+        self.manager.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_loaded_from_database_and_kept_current(self):
+        self.manager.save_products_to_db([
+            {'name': 'Lenovo IdeaPad Slim 3', 'price': 65000, 'site': 'Daraz',
+             'url': 'https://www.daraz.com.np/products/ideapad-i1.html'},
+        ], 'lenovo laptop')
+        self.assertEqual(texts(self.manager.suggest('len')), ['lenovo laptop', 'Lenovo IdeaPad Slim 3'])
+        self.assertTrue(self.manager.suggest('len')[0]['fresh'])
+
+        self.manager.save_products_to_db([
+            {'name': 'Lenovo Legion 5', 'price': 150000, 'site': 'Daraz',
+             'url': 'https://www.daraz.com.np/products/legion-i2.html'},
+        ], 'lenovo legion')
+        self.assertIn('Lenovo Legion 5', texts(self.manager.suggest('lenovo leg')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from batch import (BatchRunner, Checkpoint, DatabaseSink, JsonlSink, ParquetSink, make_sink,
+                   read_tasks)
+from utils.rate_limit import RateLimiter
+
+SITES = ['Daraz', 'Other']
+
+class FakeScraper:
+    def __init__(self, manager, site):
+        self.manager = manager
+        self.site = site
+
+    def search_products(self, query):
+        self.manager.record(self.site, query)
+        if query in self.manager.failing:
+            raise RuntimeError('blocked')
+        return [{'name': f'{query} {i}', 'price': 1000.0 + i, 'site': self.site,
+                 'url': f'https://{self.site.lower()}.example/{query}-{i}'} for i in range(2)]
+
+    def get_product_details(self, url):
+        self.manager.record(self.site, url)
+        return {'name': 'Detail', 'price': 500.0, 'site': self.site, 'url': url, 'specs': {'RAM': '8GB'}}
+
+class FakePool:
+    def __init__(self, manager, site):
+        self.manager = manager
+        self.site = site
+
+    @contextmanager
+    def scraper(self):
+        yield FakeScraper(self.manager, self.site)
+
+class FakeManager:
+    """Stands in for ScraperManager: per-site pools and a recorded save"""
+    site_names = SITES
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.saved = []
+        self._lock = threading.Lock()
+
+    def record(self, site, target):
+        with self._lock:
+            self.calls.append((site, target))
+
+    def get_pool(self, site):
+        return FakePool(self, site)
+
+    def save_products_to_db(self, rows, query=None):
+        self.saved.append((rows, query))
+
+class ListSink:
+    def __init__(self):
+        self.written = []
+
+    def write(self, products, query=None):
+        self.written.append((products, query))
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_tasks(self):
+        lines = ['iphone 15', '', '# comment', '  iphone 15  ',
+                 'https://www.daraz.com.np/products/tv-i555.html?spm=a2a0e.1',
+                 'https://www.daraz.com.np/products/tv-i555.html',
+                 'https://unknown.example/products/1']
+        self.assertEqual(read_tasks(lines, SITES), [
+            ('query', 'Daraz', 'iphone 15'),
+            ('query', 'Other', 'iphone 15'),
+            ('url', 'Daraz', 'https://www.daraz.com.np/products/tv-i555.html'),
+        ])
+
+    def test_checkpoint_resumes_after_partial_run(self):
+        path = os.path.join(self.tmpdir, 'run.checkpoint')
+        tasks = read_tasks(['phone', 'laptop'], SITES)
+        manager = FakeManager(failing={'laptop'})
+        checkpoint = Checkpoint(path)
+        stats = BatchRunner(manager, ListSink(), checkpoint, rate=0).run(tasks)
+        checkpoint.close()
+        self.assertEqual((stats['completed'], stats['failed'], stats['products']), (2, 2, 4))
+
+        # After a restart only the failed tasks run again
+        manager = FakeManager()
+        checkpoint = Checkpoint(path)
+        self.assertEqual(checkpoint.done, {'query:Daraz:phone', 'query:Other:phone'})
+        sink = ListSink()
+        stats = BatchRunner(manager, sink, checkpoint, rate=0).run(tasks)
+        checkpoint.close()
+        self.assertEqual((stats['tasks'], stats['completed']), (2, 2))
+        self.assertEqual(sorted(manager.calls), [('Daraz', 'laptop'), ('Other', 'laptop')])
+        self.assertEqual({query for _, query in sink.written}, {'laptop'})
+        with open(path) as f:
+            self.assertEqual(len(f.read().splitlines()), 4)
+
+    def test_url_tasks_keep_product_columns(self):
+        manager = FakeManager()
+        url = 'https://www.daraz.com.np/products/tv-i555.html'
+        BatchRunner(manager, make_sink('db', manager), rate=0).run([('url', 'Daraz', url)])
+        rows, query = manager.saved[0]
+        self.assertIsNone(query)
+        self.assertNotIn('specs', rows[0])
+        self.assertEqual((rows[0]['price'], rows[0]['brand']), (500.0, ''))
+
+    def test_sinks(self):
+        manager = FakeManager()
+        self.assertIsInstance(make_sink(None, manager), DatabaseSink)
+        with self.assertRaises(ValueError):
+            make_sink('results.csv', manager)
+
+        path = os.path.join(self.tmpdir, 'results.jsonl')
+        sink = make_sink(path, manager)
+        self.assertIsInstance(sink, JsonlSink)
+        BatchRunner(manager, sink, rate=0).run(read_tasks(['phone'], ['Daraz']))
+        sink.close()
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([(row['name'], row['query']) for row in rows], [('phone 0', 'phone'), ('phone 1', 'phone')])
+
+        sink = make_sink(os.path.join(self.tmpdir, 'results.parquet'), manager)
+        self.assertIsInstance(sink, ParquetSink)
+        BatchRunner(manager, sink, rate=0).run(read_tasks(['phone'], SITES))
+        table = sink.archive.read(site='Other')
+        self.assertEqual(sorted(table.column('name').to_pylist()), ['phone 0', 'phone 1'])
+
+    def test_one_rate_limiter_per_site(self):
+        runner = BatchRunner(FakeManager(), ListSink(), workers=4, rate=100)
+        self.assertEqual(sorted(runner.limiters), SITES)
+        self.assertIsNot(runner.limiters['Daraz'], runner.limiters['Other'])
+        acquired = []
+        for site, limiter in runner.limiters.items():
+            limiter.acquire = lambda site=site: acquired.append(site)
+        runner.run(read_tasks(['phone', 'laptop', 'tv'], SITES))
+        self.assertEqual(sorted(acquired), ['Daraz'] * 3 + ['Other'] * 3)
+
+    def test_rate_limiter_spaces_requests(self):
+        clock = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        with mock.patch('utils.rate_limit.time.monotonic', side_effect=lambda: clock[0]), \
+                mock.patch('utils.rate_limit.time.sleep', side_effect=sleep):
+            limiter = RateLimiter(rate=2, burst=2)
+            for _ in range(4):
+                limiter.acquire()
+        # Two requests from the burst, then one every half second
+        self.assertEqual(sleeps, [0.5, 0.5])
+        self.assertEqual(clock[0], 101.0)
+
+if __name__ == '__main__':
+    unittest.main()
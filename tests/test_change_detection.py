@@ -0,0 +1,124 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from contextlib import contextmanager
+from datetime import timedelta
+from database.init_db import init_db, get_session
+from database.models import ListingPriceStats, PriceRollup, Product
+from scrappers.enrichment import DetailEnricher
+from scrappers.scraper_manager import ScraperManager
+
+class ListSink:
+    def __init__(self):
+        self.items = []
+
+    def send(self, item):
+        self.items.append(item)
+
+class DetailPool:
+    """Scraper pool whose scrapers return canned detail pages"""
+    def __init__(self, details):
+        self.details = details
+
+    @contextmanager
+    def scraper(self):
+        yield self
+
+    def get_product_details(self, url):
+        return self.details[url]
+
+def listing(item, price, name=None):
+    return {'name': name or f"Phone {item}", 'price': price, 'currency': 'NPR', 'site': 'Daraz',
+            'url': f"https://www.daraz.com.np/products/phone-i{item}.html"}
+
+class TestChangeDetection(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_url = f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}"
+        self.sink = ListSink()
+        self.manager = ScraperManager(db_url=self.db_url, alert_sinks=[], change_sinks=[self.sink])
+
+    def tearDown(self):
+        self.manager.close()
+        self.manager.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def types(self, deltas):
+        return sorted((d['type'], d['listing_key']) for d in deltas)
+
+    def product_rows(self):
+        session = get_session(self.manager.engine)
+        try:
+            return session.query(Product).count()
+        finally:
+            session.close()
+
+    def test_deltas_across_crawls(self):
+        deltas = self.manager.save_products_to_db([listing(1, 1000), listing(2, 2000)], 'phone')
+        self.assertEqual(self.types(deltas), [('new', 'daraz:i1'), ('new', 'daraz:i2')])
+
+        # Unchanged listings are skipped; tracking params don't make a listing new
+        unchanged = dict(listing(1, 1000), url=listing(1, 1000)['url'] + '?spm=x')
+        deltas = self.manager.save_products_to_db([unchanged, listing(2, 1800), listing(3, 500)], 'phone')
+        self.assertEqual(self.types(deltas), [('new', 'daraz:i3'), ('price_change', 'daraz:i2')])
+        self.assertEqual(next(d for d in deltas if d['type'] == 'price_change')['old_price'], 2000)
+        self.assertEqual(self.product_rows(), 4)
+
+        deltas = self.manager.save_products_to_db([listing(2, 1800, name='Phone 2 (new title)'), listing(3, 500)], 'phone')
+        self.assertEqual(self.types(deltas), [('gone', 'daraz:i1'), ('updated', 'daraz:i2')])
+        self.assertEqual(len(self.sink.items), 6)
+
+    def test_state_survives_restart(self):
+        self.manager.save_products_to_db([listing(1, 1000)], 'phone')
+        restarted = ScraperManager(db_url=self.db_url, alert_sinks=[], change_sinks=[])
+        try:
+            self.assertEqual(restarted.save_products_to_db([listing(1, 1000)], 'phone'), [])
+            out_of_stock = dict(listing(1, 1000), in_stock=False)
+            deltas = restarted.save_products_to_db([out_of_stock])
+            self.assertEqual(self.types(deltas), [('out_of_stock', 'daraz:i1')])
+        finally:
+            restarted.close()
+            restarted.engine.dispose()
+
+    def test_unchanged_listings_only_touch_stats(self):
+        self.manager.save_products_to_db([listing(1, 1000)], 'phone')
+        self.manager.save_products_to_db([listing(1, 1000)], 'phone')
+        session = get_session(self.manager.engine)
+        try:
+            stats = session.query(ListingPriceStats).one()
+            self.assertEqual(stats.observations, 2)
+            self.assertGreater(stats.last_seen, stats.first_seen)
+            self.assertEqual({row.observations for row in session.query(PriceRollup)}, {1})
+        finally:
+            session.close()
+
+    def test_out_of_stock_from_detail_pages(self):
+        self.manager.save_products_to_db([listing(1, 1000), listing(2, 2000)], 'phone')
+        self.sink.items.clear()
+        details = {product['url']: dict(product, in_stock=item == 1)
+                   for item, product in ((1, listing(1, 1000)), (2, listing(2, 2000)))}
+        enricher = DetailEnricher(self.manager.engine, {'Daraz': DetailPool(details)}, max_workers=1,
+                                  changes=self.manager.changes, on_changes=self.manager._send_changes)
+        self.assertEqual(enricher.enrich(list(details.values())), 2)
+        self.assertEqual(self.types(self.sink.items), [('out_of_stock', 'daraz:i2')])
+        self.assertIs(self.manager.enricher.changes, self.manager.changes)
+
+        # Search results don't report stock, so the state sticks until a detail page changes it
+        self.sink.items.clear()
+        self.manager.save_products_to_db([listing(1, 1000), listing(2, 2000)], 'phone')
+        self.assertEqual(self.sink.items, [])
+        details[listing(2, 2000)['url']]['in_stock'] = True
+        enricher.ttl = timedelta(0)
+        enricher.enrich(list(details.values()))
+        out_of_stock = dict(listing(2, 2000), in_stock=False)
+        self.assertEqual(self.types(self.manager.save_products_to_db([out_of_stock])),
+                         [('out_of_stock', 'daraz:i2')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import functools
+import json
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import cli
+from daemon import DaemonServer, daemon_request
+
+class FakeState:
+    def __init__(self):
+        self.calls = []
+
+    def compare(self, query, enrich=False, refresh=False):
+        self.calls.append((query, enrich, refresh))
+        return {'products': [{'name': 'Phone', 'price': 1000.0}], 'summary': {'total_products': 1}}
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix domain sockets')
+class TestDaemonProtocol(unittest.TestCase):
+    def setUp(self):
+        # Short path: Unix socket paths are limited to about 100 bytes
+        self.tmpdir = tempfile.mkdtemp(dir='/tmp')
+        self.socket_path = os.path.join(self.tmpdir, 'd.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def serve(self):
+        state = FakeState()
+        server = DaemonServer(self.socket_path, state)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return state
+
+    def request(self, payload, **kwargs):
+        return daemon_request(payload, self.socket_path, **kwargs)
+
+    def test_one_json_line_each_way(self):
+        state = self.serve()
+        self.assertEqual(self.request({'command': 'ping'}), {'ok': True, 'pid': os.getpid()})
+        response = self.request({'command': 'compare', 'query': 'phone', 'refresh': True})
+        self.assertEqual((response['ok'], response['products'][0]['price']), (True, 1000.0))
+        self.assertEqual(state.calls, [('phone', False, True)])
+        self.assertEqual(self.request({'command': 'reboot'}),
+                         {'ok': False, 'error': 'Unknown command: reboot'})
+
+        # A malformed request line gets an error response, not a dropped connection
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall(b'not json\n')
+            response = json.loads(sock.makefile('rb').readline())
+        self.assertFalse(response['ok'])
+
+    def test_unreachable_daemon_is_none(self):
+        self.assertIsNone(self.request({'command': 'ping'}))
+        # Stale socket file
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.socket_path)
+        self.assertIsNone(self.request({'command': 'ping'}))
+        os.remove(self.socket_path)
+
+        # A daemon that accepts but never answers
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+            listener.bind(self.socket_path)
+            listener.listen(1)
+            self.assertIsNone(self.request({'command': 'ping'}, timeout=0.1))
+
+    def test_cli_falls_back_to_local_backend(self):
+        args = mock.Mock(no_daemon=False)
+        open(self.socket_path, 'w').close()
+        with mock.patch('cli.daemon_request', functools.partial(daemon_request, socket_path=self.socket_path)):
+            for error in (socket.timeout('timed out'), PermissionError(13, 'Permission denied'),
+                          ConnectionResetError(104, 'Connection reset by peer')):
+                with mock.patch('socket.socket.connect', side_effect=error):
+                    self.assertIsInstance(cli._backend(args), cli.LocalBackend)
+        os.remove(self.socket_path)
+
+        self.serve()
+        with mock.patch('cli.daemon_request', functools.partial(daemon_request, socket_path=self.socket_path)):
+            self.assertIsInstance(cli._backend(args), cli.DaemonBackend)
+            self.assertIsInstance(cli._backend(mock.Mock(no_daemon=True)), cli.LocalBackend)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.urls import canonical_url, item_id, listing_identity
+from utils.bloom import ScalableBloomFilter
+from database.aggregates import listing_key
+
+class TestUrlCanonicalization(unittest.TestCase):
+    def test_strips_tracking_params(self):
+        url = ('//WWW.Daraz.com.np/catalog/?spm=a2a0e.searchlist.0&q=iphone&from=input'
+               '&utm_source=x&page=2#top')
+        self.assertEqual(canonical_url(url), 'https://www.daraz.com.np/catalog/?page=2&q=iphone')
+
+    def test_daraz_item_id(self):
+        a = 'https://www.daraz.com.np/products/apple-iphone-15-i128934567-s1034567890.html?spm=abc'
+        b = '//www.daraz.com.np/products/iphone-15-128gb-i128934567.html?from=search'
+        self.assertEqual(item_id(a), 'i128934567')
+        self.assertEqual(listing_identity(a), listing_identity(b))
+        self.assertEqual(listing_key({'site': 'Daraz', 'url': a}), 'daraz:i128934567')
+        self.assertIsNone(item_id('https://www.daraz.com.np/catalog/?q=iphone'))
+
+class TestScalableBloomFilter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_grows_and_persists(self):
+        seen = ScalableBloomFilter(self.tmpdir, initial_capacity=100, error_rate=0.01)
+        keys = [f"url:Daraz:i{i}" for i in range(1000)]
+        self.assertTrue(all(seen.add(key) or key in seen for key in keys))
+        self.assertFalse(seen.add(keys[0]))
+        self.assertGreater(len(seen._slices), 1)
+        seen.close()
+
+        reopened = ScalableBloomFilter(self.tmpdir, initial_capacity=100, error_rate=0.01)
+        self.assertTrue(all(key in reopened for key in keys))
+        false_positives = sum(f"url:Daraz:new{i}" in reopened for i in range(5000))
+        self.assertLess(false_positives / 5000, 0.02)
+        reopened.close()
+
+    def test_frontier_skips_seen_urls(self):
+        from database.init_db import init_db
+        from frontier.crawl_frontier import CrawlFrontier
+
+        engine = init_db(f"sqlite:///{os.path.join(self.tmpdir, 'frontier.db')}")
+        seen = ScalableBloomFilter(os.path.join(self.tmpdir, 'seen'))
+        frontier = CrawlFrontier(engine, host_interval=0, seen=seen)
+        url = 'https://www.daraz.com.np/products/tv-i555.html'
+        self.assertTrue(frontier.enqueue('Daraz', 'url', url + '?spm=1'))
+        self.assertFalse(frontier.enqueue('Daraz', 'url', 'https://www.daraz.com.np/products/smart-tv-i555-s9.html'))
+        task = frontier.lease('w1')[0]
+        self.assertEqual(task.target, url)
+        frontier.ack(task, 'w1')
+        self.assertFalse(frontier.enqueue('Daraz', 'url', url))
+        self.assertTrue(frontier.enqueue('Daraz', 'url', url, revisit=True))
+        seen.close()
+        engine.dispose()
+
+    def test_failed_insert_not_marked_seen(self):
+        from unittest import mock
+        from sqlalchemy.exc import OperationalError
+        from database.init_db import init_db
+        from frontier.crawl_frontier import CrawlFrontier
+
+        engine = init_db(f"sqlite:///{os.path.join(self.tmpdir, 'frontier.db')}")
+        seen = ScalableBloomFilter(os.path.join(self.tmpdir, 'seen'))
+        frontier = CrawlFrontier(engine, host_interval=0, seen=seen)
+        url = 'https://www.daraz.com.np/products/tv-i555.html'
+        locked = OperationalError('INSERT', {}, Exception('database is locked'))
+        with mock.patch('sqlalchemy.orm.Session.commit', side_effect=locked):
+            with self.assertRaises(OperationalError):
+                frontier.enqueue('Daraz', 'url', url)
+        self.assertTrue(frontier.enqueue('Daraz', 'url', url))
+        self.assertEqual(frontier.stats(), {'pending': 1})
+        seen.close()
+        engine.dispose()
+
+class TestListingKeyMigration(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_url_keys_rekeyed_and_merged(self):
+        from datetime import datetime
+        from database.init_db import init_db, get_session
+        from database.migrations import run_migrations
+        from database.models import (ListingPriceStats, PriceRollup, QueryListing, SchemaMigration,
+                                     WatchRule)
+
+        engine = init_db(f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}")
+        old = 'daraz:https://www.daraz.com.np/products/tv-i555-s9.html'
+        new = 'daraz:i555'
+        session = get_session(engine)
+        # Stored before the change, and again under the new key since
+        session.add(ListingPriceStats(listing_key=old, site='Daraz', current_price=900, min_price=800,
+                                      max_price=1000, observations=5, first_seen=datetime(2025, 1, 1),
+                                      last_seen=datetime(2025, 2, 1)))
+        session.add(ListingPriceStats(listing_key=new, site='Daraz', current_price=950, min_price=950,
+                                      max_price=950, observations=1, first_seen=datetime(2025, 3, 1),
+                                      last_seen=datetime(2025, 3, 1)))
+        session.add(PriceRollup(listing_key=old, resolution='day', bucket_start=datetime(2025, 1, 1),
+                                open=1000, high=1000, low=800, close=800, observations=2))
+        session.add(QueryListing(cluster_key='tv', listing_key=old))
+        session.add(QueryListing(cluster_key='tv', listing_key=new))
+        session.add(WatchRule(listing_key=old, threshold=700))
+        session.add(WatchRule(listing_key='daraz:https://www.daraz.com.np/catalog/', threshold=1))
+        session.query(SchemaMigration).delete()
+        session.commit()
+
+        run_migrations(engine)
+        stats = session.query(ListingPriceStats).one()
+        self.assertEqual((stats.listing_key, stats.current_price, stats.min_price, stats.max_price),
+                         (new, 950, 800, 1000))
+        self.assertEqual((stats.observations, stats.first_seen), (6, datetime(2025, 1, 1)))
+        self.assertEqual(session.query(PriceRollup).one().listing_key, new)
+        self.assertEqual([row.listing_key for row in session.query(QueryListing)], [new])
+        self.assertEqual(sorted(rule.listing_key for rule in session.query(WatchRule)),
+                         ['daraz:https://www.daraz.com.np/catalog/', new])
+        # Recorded, so later starts skip it
+        self.assertEqual(session.query(SchemaMigration).count(), 1)
+        session.close()
+        engine.dispose()
+
+if __name__ == '__main__':
+    unittest.main()
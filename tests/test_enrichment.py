@@ -0,0 +1,103 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import create_engine
+
+from database.init_db import get_session
+from database.models import Base, Product, ProductDetail
+from scrappers.enrichment import DetailEnricher
+
+def url(item):
+    return f"https://www.daraz.com.np/products/phone-i{item}.html"
+
+class FakePool:
+    """Scraper pool whose scrapers build detail pages and count fetches"""
+    def __init__(self):
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def scraper(self):
+        yield self
+
+    def get_product_details(self, page_url):
+        with self.lock:
+            self.fetched.append(page_url)
+        if page_url.endswith('i99.html'):
+            raise RuntimeError('timed out')
+        return {'url': page_url, 'site': 'Daraz', 'name': 'Phone', 'price': 1000, 'brand': 'Xiaomi',
+                'category': 'Smartphones', 'image_url': 'https://img.example.com/a.jpg',
+                'images': ['https://img.example.com/a.jpg'], 'specs': {'RAM': '8GB'},
+                'description': '', 'rating': 4.5, 'review_count': 12, 'in_stock': True}
+
+class TestDetailEnricher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}")
+        Base.metadata.create_all(self.engine)
+        self.pool = FakePool()
+        self.enricher = DetailEnricher(self.engine, {'Daraz': self.pool}, max_workers=3, batch_size=2)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def listings(self, items, site='Daraz'):
+        return [{'name': f'Phone {item}', 'price': 1000, 'site': site, 'url': url(item)} for item in items]
+
+    def test_details_stored_in_batches_and_backfilled(self):
+        session = get_session(self.engine)
+        session.add(Product(name='Phone 1', price=1000, site='Daraz', url=url(1), description='Listed'))
+        session.commit()
+
+        batches = []
+        write_batch = self.enricher._write_batch
+        self.enricher._write_batch = lambda details: batches.append(len(details)) or write_batch(details)
+
+        # Five URLs in batches of two; failed fetches and unknown sites are skipped
+        products = self.listings(range(1, 6)) + self.listings([99]) + self.listings([7], site='Other')
+        self.assertEqual(self.enricher.enrich(products + self.listings([1])), 5)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual(sorted(self.pool.fetched), sorted(url(item) for item in [1, 2, 3, 4, 5, 99]))
+
+        details = {row.url: row for row in session.query(ProductDetail)}
+        self.assertEqual(sorted(details), sorted(url(item) for item in range(1, 6)))
+        self.assertEqual(json.loads(details[url(1)].specs), {'RAM': '8GB'})
+        self.assertEqual((details[url(1)].review_count, details[url(1)].in_stock), (12, True))
+
+        # Filled from the detail page; fields it left empty keep the listing's value
+        row = session.query(Product).one()
+        self.assertEqual((row.brand, row.category, row.description), ('Xiaomi', 'Smartphones', 'Listed'))
+        session.close()
+
+    def test_fresh_details_skipped(self):
+        self.enricher.enrich(self.listings([1, 2]))
+        session = get_session(self.engine)
+        session.query(ProductDetail).filter_by(url=url(2)).update(
+            {'enriched_at': datetime.utcnow() - timedelta(hours=25)})
+        session.commit()
+        session.close()
+
+        self.assertEqual(self.enricher.stale_urls([url(1), url(2), url(3), None]), [url(2), url(3)])
+        self.pool.fetched.clear()
+        self.assertEqual(self.enricher.enrich(self.listings([1, 2, 3])), 2)
+        self.assertEqual(sorted(self.pool.fetched), [url(2), url(3)])
+
+        # Upserted, not duplicated
+        session = get_session(self.engine)
+        self.assertEqual(session.query(ProductDetail).count(), 3)
+        session.close()
+        self.assertEqual(self.enricher.enrich(self.listings([1, 2, 3])), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from datetime import datetime, timedelta
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database.init_db import init_db
+from frontier.crawl_frontier import CrawlFrontier
+
+def _work(db_url, worker_id, results):
+    """Worker process: lease and ack tasks until the queue is drained"""
+    frontier = CrawlFrontier(init_db(db_url), host_interval=0)
+    done = []
+    idle_since = time.time()
+    while time.time() - idle_since < 1.0:
+        leased = frontier.lease(worker_id)
+        if not leased:
+            time.sleep(0.01)
+            continue
+        idle_since = time.time()
+        for task in leased:
+            if frontier.ack(task, worker_id):
+                done.append(task.target)
+    results.put((worker_id, done))
+
+class TestCrawlFrontier(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_url = f"sqlite:///{os.path.join(self.tmpdir, 'frontier.db')}"
+        self.engine = init_db(self.db_url)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_enqueue_dedupes_until_done(self):
+        frontier = CrawlFrontier(self.engine, host_interval=0)
+        self.assertTrue(frontier.enqueue('Daraz', 'query', 'iphone', host='daraz'))
+        self.assertFalse(frontier.enqueue('Daraz', 'query', 'iphone', host='daraz'))
+        task = frontier.lease('w1')[0]
+        self.assertTrue(frontier.ack(task, 'w1'))
+        # Finished tasks can be queued again for the next crawl
+        self.assertTrue(frontier.enqueue('Daraz', 'query', 'iphone', host='daraz'))
+        self.assertEqual(frontier.stats(), {'pending': 1})
+
+    def test_priority_and_not_before(self):
+        frontier = CrawlFrontier(self.engine, host_interval=0)
+        frontier.enqueue('Daraz', 'query', 'low', host='a')
+        frontier.enqueue('Daraz', 'query', 'high', host='b', priority=5)
+        frontier.enqueue('Daraz', 'query', 'later', host='c', priority=9,
+                         not_before=datetime.utcnow() + timedelta(hours=1))
+        leased = frontier.lease('w1', max_tasks=3)
+        self.assertEqual([task.target for task in leased], ['high', 'low'])
+
+    def test_host_politeness_is_global(self):
+        frontier = CrawlFrontier(self.engine, host_interval=60)
+        other = CrawlFrontier(init_db(self.db_url), host_interval=60)
+        frontier.enqueue('Daraz', 'query', 'phone', host='www.daraz.com.np')
+        frontier.enqueue('Daraz', 'query', 'laptop', host='www.daraz.com.np')
+        self.assertEqual(len(frontier.lease('w1', max_tasks=2)), 1)
+        # A second worker may not hit the same host inside the interval
+        self.assertEqual(other.lease('w2'), [])
+
+    def test_visibility_timeout_releases_lease(self):
+        frontier = CrawlFrontier(self.engine, host_interval=0, visibility_timeout=0.2)
+        frontier.enqueue('Daraz', 'url', 'https://www.daraz.com.np/products/x')
+        task = frontier.lease('w1')[0]
+        self.assertEqual(frontier.lease('w2'), [])
+        time.sleep(0.3)
+        retaken = frontier.lease('w2')[0]
+        self.assertEqual(retaken.id, task.id)
+        self.assertEqual(retaken.attempts, 2)
+        # The first worker lost its lease, so its late ack is rejected
+        self.assertFalse(frontier.ack(task, 'w1'))
+        self.assertTrue(frontier.ack(retaken, 'w2'))
+
+    def test_nack_retries_then_fails(self):
+        frontier = CrawlFrontier(self.engine, host_interval=0, max_attempts=2, retry_delay=0)
+        frontier.enqueue('Daraz', 'query', 'tv', host='daraz')
+        frontier.nack(frontier.lease('w1')[0], 'w1', 'timeout')
+        frontier.nack(frontier.lease('w1')[0], 'w1', 'timeout')
+        self.assertEqual(frontier.stats(), {'failed': 1})
+
+    def test_worker_processes_share_queue(self):
+        frontier = CrawlFrontier(self.engine, host_interval=0)
+        targets = [f"query {i}" for i in range(60)]
+        for i, target in enumerate(targets):
+            frontier.enqueue('Daraz', 'query', target, host=f"host{i % 6}")
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_work, args=(self.db_url, f"w{i}", results))
+                   for i in range(4)]
+        for worker in workers:
+            worker.start()
+        done = dict(results.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join(timeout=10)
+
+        finished = [target for targets_done in done.values() for target in targets_done]
+        self.assertEqual(sorted(finished), sorted(targets))
+        self.assertEqual(frontier.stats(), {'done': len(targets)})
+
+class TestFrontierWorker(unittest.TestCase):
+    def setUp(self):
+        from loadtest.marketplace import StandInMarketplace
+        from scrappers.scraper_manager import ScraperManager
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.marketplace = StandInMarketplace(catalog_size=50, latency=0).start()
+        self.manager = ScraperManager(
+            scraper_options={'Daraz': {'base_url': self.marketplace.base_url, 'use_selenium': False,
+                                       'delay_range': (0, 0)}},
+            db_url=f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}",
+            alert_sinks=[], change_sinks=[], session_dir=os.path.join(self.tmpdir, 'sessions')
+        )
+        self.frontier = CrawlFrontier(self.manager.engine, host_interval=0, retry_delay=3600)
+
+    def tearDown(self):
+        self.manager.close()
+        self.manager.engine.dispose()
+        self.marketplace.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def run_worker(self):
+        from frontier.worker import FrontierWorker
+        return FrontierWorker(self.frontier, self.manager, worker_id='w1').run(max_tasks=1)
+
+    def test_failed_fetches_are_retried(self):
+        self.frontier.enqueue('Daraz', 'query', 'laptop', host='daraz')
+        self.frontier.enqueue('Daraz', 'url', self.marketplace.base_url + '/products/laptop-i1.html')
+        self.marketplace.error_rate = 1.0
+        for _ in range(2):
+            self.assertEqual(self.run_worker()['failed'], 1)
+        self.assertEqual(self.frontier.stats(), {'pending': 2})
+
+    def test_challenge_pages_are_retried(self):
+        self.marketplace.challenge_rate = 1.0
+        self.frontier.enqueue('Daraz', 'query', 'laptop', host='daraz')
+        self.assertEqual(self.run_worker()['failed'], 1)
+        self.assertEqual(self.frontier.stats(), {'pending': 1})
+
+        # Once the site lets it through, the retry completes
+        self.marketplace.challenge_rate = 0.0
+        with self.manager.engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE frontier_tasks SET not_before = '2000-01-01'")
+        stats = self.run_worker()
+        self.assertEqual((stats['completed'], stats['products'] > 0), (1, True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys
+import os
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from loadtest.marketplace import StandInMarketplace, PAGE_SIZE
+from loadtest.harness import percentile, parse_mix, run_load_test
+from scrappers.daraz_scraper import DarazScraper
+
+class TestStandInMarketplace(unittest.TestCase):
+    def setUp(self):
+        self.marketplace = StandInMarketplace(catalog_size=300, latency=0).start()
+        self.scraper = DarazScraper(base_url=self.marketplace.base_url, use_selenium=False,
+                                    delay_range=(0, 0))
+
+    def tearDown(self):
+        self.scraper.close()
+        self.marketplace.stop()
+
+    def test_scraper_parses_stand_in_pages(self):
+        products = self.scraper.search_products('samsung')
+        self.assertEqual(len(products), 15)
+        expected = {product['name']: product['price'] for product in self.marketplace.search('samsung')}
+        for product in products:
+            self.assertEqual(product.price, expected[product.name])
+            self.assertTrue(product.url.startswith(self.marketplace.base_url + '/products/'))
+
+        details = self.scraper.get_product_details(products[0].url)
+        self.assertEqual(details['name'], products[0].name)
+        self.assertEqual(details['price'], products[0].price)
+
+    def test_search_pages_are_full(self):
+        self.assertEqual(len(self.marketplace.search('no such thing')), PAGE_SIZE)
+        self.assertTrue(all('Xiaomi' in product['name'] for product in self.marketplace.search('xiaomi')[:5]))
+
+    def test_injected_errors(self):
+        self.marketplace.error_rate = 1.0
+        self.assertIsNone(self.scraper.get_page_html(self.marketplace.base_url + '/catalog/?q=phone'))
+        self.assertEqual(self.marketplace.stats['errors'], 1)
+
+class TestHarness(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('compare=2, stream'), {'compare': 2.0, 'stream': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('bogus=1')
+
+    def test_short_run(self):
+        report = run_load_test(users=3, duration=1.5, mix={'compare': 1, 'stream': 1},
+                               catalog_size=200, latency=0.01)
+        overall = report['overall']
+        self.assertGreater(overall['requests'], 0)
+        self.assertEqual(overall['errors'], 0)
+        self.assertLessEqual(overall['p50_ms'], overall['p99_ms'])
+        self.assertGreater(report['marketplace']['requests'], 0)
+        self.assertGreater(report['db']['writes'], 0)
+        self.assertGreater(report['memory']['peak_rss_mb'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
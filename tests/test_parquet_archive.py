@@ -0,0 +1,125 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import pyarrow.dataset as ds
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database.init_db import init_db, get_session
+from database.models import Product
+from database.parquet_archive import ParquetArchive
+from scrappers.scraper_manager import ScraperManager
+
+def product(item, price, site='Daraz', scraped_at=None):
+    return {'name': f'Phone {item}', 'price': price, 'currency': 'NPR', 'site': site,
+            'url': f'https://www.daraz.com.np/products/phone-i{item}.html', 'scraped_at': scraped_at}
+
+class TestParquetArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_url = f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}"
+        self.engine = init_db(self.db_url)
+        self.archive = ParquetArchive(os.path.join(self.tmpdir, 'archive'), rows_per_chunk=2)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def add_rows(self, rows):
+        session = get_session(self.engine)
+        for row in rows:
+            session.add(Product(**row))
+        session.commit()
+        session.close()
+
+    def test_partition_layout(self):
+        self.archive.write_products([product(1, 1000), product(2, 2000, site='Other')],
+                                    scraped_at=datetime(2025, 6, 1, 12))
+        self.archive.write_products([product(3, 3000)], scraped_at=datetime(2025, 6, 2))
+        partitions = sorted(os.path.relpath(path, self.archive.root)
+                            for path, _, files in os.walk(self.archive.root) if files)
+        self.assertEqual(partitions, [os.path.join('site=Daraz', 'date=2025-06-01'),
+                                      os.path.join('site=Daraz', 'date=2025-06-02'),
+                                      os.path.join('site=Other', 'date=2025-06-01')])
+        # Partition columns come back on read
+        table = self.archive.read(columns=['name', 'site', 'date'], site='Other')
+        self.assertEqual(table.to_pylist(), [{'name': 'Phone 2', 'site': 'Other', 'date': '2025-06-01'}])
+
+    def test_export_resumes_from_checkpoint(self):
+        self.add_rows(product(item, 1000 + item, scraped_at=datetime(2025, 6, 1)) for item in range(1, 6))
+
+        # The second chunk fails to write: the first stays exported
+        write = self.archive._write
+        calls = []
+
+        def failing_write(table):
+            calls.append(table.num_rows)
+            if len(calls) == 2:
+                raise OSError('disk full')
+            write(table)
+
+        with mock.patch.object(self.archive, '_write', side_effect=failing_write):
+            with self.assertRaises(OSError):
+                self.archive.export_from_db(self.engine)
+        self.assertEqual(self.archive.exported_through(), 2)
+
+        self.assertEqual(self.archive.export_from_db(self.engine), 3)
+        self.assertEqual(self.archive.exported_through(), 5)
+        self.assertEqual(sorted(self.archive.read(columns=['price']).column('price').to_pylist()),
+                         [1001, 1002, 1003, 1004, 1005])
+        self.assertEqual(self.archive.export_from_db(self.engine), 0)
+
+        # A new archive object picks up the same checkpoint
+        self.add_rows([product(6, 1006, scraped_at=datetime(2025, 6, 2))])
+        self.assertEqual(ParquetArchive(self.archive.root).export_from_db(self.engine), 1)
+        self.assertEqual(self.archive.read().num_rows, 6)
+
+    def test_read_pushes_predicates_down(self):
+        for day in (1, 2, 3):
+            self.archive.write_products([product(day, 1000 * day), product(day, 1000 * day, site='Other')],
+                                        scraped_at=datetime(2025, 6, day))
+
+        table = self.archive.read(columns=['price', 'date'], site='Daraz', start=date(2025, 6, 2))
+        self.assertEqual(sorted(table.column('date').to_pylist()), ['2025-06-02', '2025-06-03'])
+        table = self.archive.read(columns=['price'], min_price=1500, max_price=2500)
+        self.assertEqual(table.column('price').to_pylist(), [2000, 2000])
+        table = self.archive.read(columns=['name'], filter=ds.field('name') == 'Phone 3', end=date(2025, 6, 2))
+        self.assertEqual(table.num_rows, 0)
+
+        # Site and date predicates prune whole partitions before any file is opened
+        dataset = self.archive.dataset()
+        self.assertEqual(len(list(dataset.get_fragments())), 6)
+        fragments = list(dataset.get_fragments(
+            filter=(ds.field('site') == 'Daraz') & (ds.field('date') >= '2025-06-02')))
+        self.assertEqual(len(fragments), 2)
+
+    def test_empty_archive(self):
+        self.assertIsNone(self.archive.dataset())
+        self.assertEqual(self.archive.read(columns=['name', 'price']).num_rows, 0)
+        self.assertEqual(self.archive.exported_through(), 0)
+
+    def test_manager_archives_each_row_once(self):
+        manager = ScraperManager(db_url=self.db_url, archive=self.archive, alert_sinks=[],
+                                 change_sinks=[], session_dir=os.path.join(self.tmpdir, 'sessions'))
+        try:
+            manager.save_products_to_db([product(1, 1000), product(2, 2000)], 'phone')
+            # Unchanged listings add no product rows, so nothing new is archived
+            manager.save_products_to_db([product(1, 1000), product(2, 1800)], 'phone')
+            self.assertEqual(self.archive.read().num_rows, 3)
+
+            # A later `export` or `compact` finds nothing left to archive
+            self.assertEqual(self.archive.export_from_db(self.engine), 0)
+            self.assertEqual(sorted(self.archive.read(columns=['price']).column('price').to_pylist()),
+                             [1000, 1800, 2000])
+        finally:
+            manager.close()
+            manager.engine.dispose()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import os
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scrappers.daraz_scraper import DarazScraper
+from scrappers.parse_pool import ParsePool
+from scrappers.scraper_manager import ScraperManager
+
+MIRROR = 'http://127.0.0.1:8000'
+
+def search_page(count, host='//www.daraz.com.np'):
+    cards = ''.join(
+        f'<div data-qa-locator="product-item"><div class="title">'
+        f'<a href="{host}/products/item-{i}.html">Phone model {i}</a></div>'
+        f'<div class="price">Rs. {1000 + i:,}</div></div>'
+        for i in range(count)
+    )
+    return f'<html><body>{cards}</body></html>'
+
+class TestParsePool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A tiny threshold sends the larger page through shared memory
+        cls.pool = ParsePool([DarazScraper], workers=2, shared_memory_threshold=1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_matches_inline_parse(self):
+        pages = [search_page(2), search_page(12)]
+        self.assertLess(len(pages[0]), 1024)
+        self.assertGreater(len(pages[1]), 1024)
+        expected = [DarazScraper().parse_search_results(html) for html in pages]
+        self.assertEqual(self.pool.parse_many(DarazScraper, pages), expected)
+        self.assertEqual(expected[1][0]['url'], 'https://www.daraz.com.np/products/item-0.html')
+
+    def test_search_uses_attached_pool(self):
+        scraper = DarazScraper()
+        scraper.parse_pool = self.pool
+        scraper.get_page_html = lambda url: search_page(3).encode('utf-8')
+        products = scraper.search_products('phone')
+        self.assertEqual([p['name'] for p in products], ['Phone model 0', 'Phone model 1', 'Phone model 2'])
+
+class TestWorkerOptions(unittest.TestCase):
+    def test_workers_use_the_scrapers_base_url(self):
+        # Relative links resolve against the mirror the page was fetched from
+        manager = ScraperManager(scraper_options={'Daraz': {'base_url': MIRROR, 'delay_range': (0, 0)}},
+                                 parse_workers=1, persist_sessions=False)
+        try:
+            pages = [search_page(2, host=''), search_page(12, host='')]
+            parsed = manager.parse_pool.parse_many(DarazScraper, pages)
+        finally:
+            manager.close()
+        self.assertEqual(parsed[0][0]['url'], MIRROR + '/products/item-0.html')
+        self.assertEqual(parsed[1][11]['url'], MIRROR + '/products/item-11.html')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import sys
+import os
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bs4 import BeautifulSoup
+from scrappers.price_anchors import price_anchored_containers
+from scrappers.daraz_scraper import DarazScraper
+
+PAGE = """
+<html><body>
+<div class="filters">
+  <a href="/catalog/?price=0-1000">Under Rs. 1,000</a>
+  <a href="/catalog/?price=1000-5000">Rs. 1,000 - 5,000</a>
+</div>
+<div class="grid">
+  <div class="x1"><div class="x2">
+    <a href="/products/headphones-i11.html"><img src="/a.jpg"></a>
+    <div class="title"><a href="/products/headphones-i11.html">Wireless Headphones</a></div>
+    <div class="p"><span>Rs. 2,499</span><del>Rs. 3,999</del></div>
+  </div></div>
+  <div class="x1"><div class="x2">
+    <a href="/products/speaker-i12.html" title="Bluetooth Speaker">
+      <div>Bluetooth Speaker</div><div>Rs. 4,100</div>
+    </a>
+  </div></div>
+</div>
+</body></html>
+"""
+
+class TestPriceAnchors(unittest.TestCase):
+    def test_one_container_per_product(self):
+        soup = BeautifulSoup(PAGE, 'html.parser')
+        containers = price_anchored_containers(soup)
+        self.assertEqual([c.name for c in containers], ['div', 'a'])
+        self.assertEqual(containers[0]['class'], ['x2'])
+
+    def test_fallback_parse(self):
+        products = DarazScraper().parse_search_results(PAGE)
+        self.assertEqual([(p.name, p.price) for p in products],
+                         [('Wireless Headphones', 2499.0), ('Bluetooth Speaker', 4100.0)])
+        self.assertEqual(products[1].url, 'https://www.daraz.com.np/products/speaker-i12.html')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database.init_db import get_session
+from database.models import PriceOutlier, Product
+from database.price_validation import PriceValidator
+from scrappers.daraz_scraper import DarazScraper
+from scrappers.scraper_manager import ScraperManager
+
+def laptops(prices, start=0):
+    return [{'name': f'Laptop {i}', 'price': price, 'site': 'Daraz', 'category': 'Laptops',
+             'url': f'https://www.daraz.com.np/products/laptop-i{i}.html'}
+            for i, price in enumerate(prices, start)]
+
+BATCH = [85000, 92000, 78000, 110000, 99000, 105000, 88000, 95000, 101000, 90000]
+
+class TestPriceValidator(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.manager = ScraperManager(db_url=f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}",
+                                      alert_sinks=[], change_sinks=[])
+
+    def tearDown(self):
+        self.manager.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def stored_prices(self):
+        session = get_session(self.manager.engine)
+        try:
+            return sorted(row.price for row in session.query(Product))
+        finally:
+            session.close()
+
+    def test_batch_outliers_are_quarantined_and_confirmed_on_repeat(self):
+        # A mis-parsed price (paise read as rupees) among comparable laptops
+        batch = laptops(BATCH + [9200000])
+        self.manager.save_products_to_db(batch, 'gaming laptop')
+        self.assertNotIn(9200000, self.stored_prices())
+        self.assertEqual(len(self.stored_prices()), len(BATCH))
+
+        outliers = self.manager.get_price_outliers()
+        self.assertEqual(len(outliers), 1)
+        self.assertEqual(outliers[0]['reason'], 'cluster')
+        self.assertEqual(outliers[0]['action'], 'quarantined')
+        self.assertGreater(outliers[0]['score'], 3.5)
+        self.assertAlmostEqual(outliers[0]['reference'], 95000, delta=5000)
+
+        # Seen again at the same price, it is taken as real
+        self.manager.save_products_to_db(batch, 'gaming laptop')
+        self.assertIn(9200000, self.stored_prices())
+        self.assertEqual(len(self.manager.get_price_outliers()), 1)
+
+    def test_history_and_jumps(self):
+        self.manager.save_products_to_db(laptops(BATCH), 'gaming laptop')
+        # Against the stored cluster a small batch is enough to judge
+        deltas = self.manager.save_products_to_db(laptops([7500, 89000], start=100), 'gaming laptop')
+        self.assertEqual([o['price'] for o in self.manager.get_price_outliers(reason='cluster')], [7500])
+        # Quarantined listings are not reported
+        self.assertEqual([d['price'] for d in deltas if d['type'] != 'gone'], [89000])
+        self.assertNotIn(7500, [d['price'] for d in deltas])
+
+        # A listing's own price dropping tenfold is a jump, even if other listings are that cheap
+        changed = laptops(BATCH)
+        changed[0]['price'] = 8500
+        deltas = self.manager.save_products_to_db(changed, 'gaming laptop')
+        # Still among the query's results, so not gone either
+        self.assertNotIn('Laptop 0', [d['name'] for d in deltas])
+        jump = self.manager.get_price_outliers(reason='jump')[0]
+        self.assertEqual((jump['price'], jump['reference']), (8500, 85000))
+
+    def test_modes(self):
+        session = get_session(self.manager.engine)
+        try:
+            batch = laptops(BATCH + [9200000, 0])
+            accepted, outliers = PriceValidator('flag').check(session, batch, 'gaming laptop')
+            self.assertEqual(len(accepted), len(batch))
+            self.assertEqual([(o['reason'], o['action']) for o in outliers],
+                             [('cluster', 'flagged'), ('invalid', 'flagged')])
+            session.rollback()
+
+            # Without a query, batches are grouped by category
+            accepted, outliers = PriceValidator('quarantine').check(session, batch)
+            self.assertEqual(len(accepted), len(BATCH))
+
+            self.assertEqual(PriceValidator('off').check(session, batch), (batch, []))
+            self.assertEqual(session.query(PriceOutlier).count(), 2)
+            # Too few prices to judge
+            accepted, outliers = PriceValidator().check(session, laptops([100, 90000, 9200000]), 'new query')
+            self.assertEqual(outliers, [])
+        finally:
+            session.close()
+        with self.assertRaises(ValueError):
+            PriceValidator('drop')
+
+class TestParseBounds(unittest.TestCase):
+    def test_premium_prices_parse(self):
+        scraper = DarazScraper(use_selenium=False)
+        self.assertEqual(scraper._parse_price('Rs. 1,250,000.00'), 1250000.0)
+        self.assertEqual(scraper._parse_price('Rs. 4.5'), 0.0)
+        self.assertEqual(scraper._parse_price('Rs. 12,345,678.00'), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import sys
+import os
+import pickle
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scrappers.product_record import ProductRecord, records_to_frame, records_to_columns
+
+class TestProductRecord(unittest.TestCase):
+    def setUp(self):
+        self.records = [
+            ProductRecord('Phone A', 25000, site=''.join(['Dar', 'az']), url='https://x/a'),
+            ProductRecord('Phone B', '18000', site='Daraz', url='https://x/b'),
+        ]
+
+    def test_slots_and_interning(self):
+        record = self.records[0]
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertIs(record.site, self.records[1].site)
+        self.assertIs(record.currency, self.records[1].currency)
+        self.assertEqual(self.records[1].price, 18000.0)
+
+    def test_mapping_compatibility(self):
+        record = self.records[0]
+        self.assertEqual(record['name'], 'Phone A')
+        self.assertEqual(record.get('brand'), '')
+        self.assertIsNone(record.get('images'))
+        self.assertEqual(dict(record), record.to_row())
+        self.assertEqual(ProductRecord.from_dict({'name': 'Phone A', 'price': 25000, 'site': 'Daraz',
+                                                  'url': 'https://x/a', 'images': []}), record)
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_columnar_conversion(self):
+        columns = records_to_columns(self.records + [{'name': 'Phone C', 'price': 9000.0, 'site': 'Daraz'}])
+        self.assertEqual(columns['price'], [25000.0, 18000.0, 9000.0])
+        df = records_to_frame(self.records)
+        self.assertEqual(str(df['site'].dtype), 'category')
+        self.assertEqual(df.sort_values('price')['name'].tolist(), ['Phone B', 'Phone A'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import sys
+import os
+import contextvars
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fastapi.testclient import TestClient
+
+from api import main
+from loadtest.marketplace import StandInMarketplace
+from scrappers.scraper_manager import ScraperManager
+from utils.profiling import Profiler, current_capture, stage
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def save():
+    with stage('db'):
+        busy(0.05)
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_capture_writes_speedscope_file(self):
+        profiler = Profiler(rate=0, directory=self.tmpdir, interval=0.002)
+        with profiler.capture('compare', 'gaming laptop', force=True) as capture:
+            with stage('fetch'):
+                time.sleep(0.1)
+            with stage('parse'):
+                busy(0.1)
+            # Stages in worker threads count when the context is passed on
+            worker = threading.Thread(target=contextvars.copy_context().run, args=(save,))
+            worker.start()
+            worker.join()
+
+        self.assertIsNone(current_capture())
+        with open(capture.path) as f:
+            data = json.load(f)
+        self.assertTrue(os.path.basename(capture.path).endswith('-compare-gaming-laptop.speedscope.json'))
+        self.assertEqual(data['metadata']['query'], 'gaming laptop')
+        self.assertGreaterEqual(data['metadata']['stages']['fetch'], 0.1)
+        self.assertGreaterEqual(data['metadata']['stages']['parse'], 0.1)
+
+        names = [frame['name'] for frame in data['shared']['frames']]
+        for label in ('[compare]', '[fetch]', '[parse]', '[db]'):
+            self.assertIn(label, names)
+
+        wall = data['profiles'][0]
+        self.assertEqual(len(wall['samples']), len(wall['weights']))
+        roots = [names[sample[0]] for sample in wall['samples']]
+        self.assertGreater(roots.count('[fetch]'), 10)
+
+        if len(data['profiles']) > 1:
+            # Sleeping in fetch uses far less CPU than spinning in parse
+            cpu = data['profiles'][1]
+            by_stage = {}
+            for root, weight in zip(roots, cpu['weights']):
+                by_stage[root] = by_stage.get(root, 0.0) + weight
+            self.assertGreater(by_stage['[parse]'], by_stage['[fetch]'] * 3)
+
+    def test_sampling_rate(self):
+        self.assertIsNone(Profiler(rate=0, directory=self.tmpdir).capture('compare').capture)
+        self.assertIsNotNone(Profiler(rate=1, directory=self.tmpdir).capture('compare').capture)
+        self.assertIsNone(Profiler(rate=1, directory=self.tmpdir).capture('compare', force=False).capture)
+
+    def test_stage_is_a_no_op_when_off(self):
+        first = stage('fetch')
+        self.assertIs(first, stage('parse'))
+        with first:
+            pass
+
+class TestProfiledAPI(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.marketplace = StandInMarketplace(catalog_size=200, latency=0.05).start()
+        manager = ScraperManager(
+            scraper_options={'Daraz': {'base_url': self.marketplace.base_url, 'use_selenium': False,
+                                       'delay_range': (0, 0)}},
+            db_url=f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}",
+            alert_sinks=[], change_sinks=[], site_delay=0, profile_rate=0,
+            profile_dir=os.path.join(self.tmpdir, 'profiles'), session_dir=os.path.join(self.tmpdir, 'sessions')
+        )
+        self.original = main.scraper_manager
+        main.scraper_manager = manager
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        main.scraper_manager.close()
+        main.scraper_manager.engine.dispose()
+        main.scraper_manager = self.original
+        self.marketplace.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_profile_flag(self):
+        response = self.client.get('/products/compare/laptop')
+        self.assertNotIn('server-timing', response.headers)
+
+        response = self.client.get('/products/compare/laptop', params={'profile': 'true'})
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers['server-timing']
+        for label in ('fetch;dur=', 'parse;dur=', 'db;dur=', 'compare;dur='):
+            self.assertIn(label, timing)
+        path = os.path.join(self.tmpdir, 'profiles', response.headers['x-profile'])
+        with open(path) as f:
+            self.assertEqual(json.load(f)['metadata']['name'], 'compare')
+
+if __name__ == '__main__':
+    unittest.main()
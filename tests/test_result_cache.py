@@ -0,0 +1,73 @@
+import sys
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scrappers.scraper_manager import ScraperManager
+from utils.result_cache import ResultCache
+
+class TestResultCache(unittest.TestCase):
+    def test_ttl_and_force(self):
+        cache = ResultCache(ttl=60)
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+        with mock.patch('utils.result_cache.time.monotonic', return_value=1000.0):
+            self.assertEqual(cache.get_or_compute('phone', compute), 1)
+            self.assertEqual(cache.get_or_compute('phone', compute), 1)
+            self.assertEqual(cache.get_or_compute('phone', compute, force=True), 2)
+        with mock.patch('utils.result_cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(cache.get('phone'))
+            self.assertEqual(cache.age('phone'), 61.0)
+            self.assertEqual(cache.get_or_compute('phone', compute), 3)
+        cache.invalidate('phone')
+        self.assertIsNone(cache.age('phone'))
+
+    def test_oldest_entry_evicted(self):
+        cache = ResultCache(max_entries=2)
+        for stamp, key in enumerate(['a', 'b', 'c']):
+            with mock.patch('utils.result_cache.time.monotonic', return_value=float(stamp)):
+                cache.set(key, key)
+        self.assertEqual([cache.age(key) is not None for key in 'abc'], [False, True, True])
+
+    def test_single_flight(self):
+        cache = ResultCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            # Long enough for every thread to ask while it runs
+            time.sleep(0.1)
+            return 'results'
+
+        values = []
+        threads = [threading.Thread(target=lambda: values.append(cache.get_or_compute('phone', compute)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), values), (1, ['results'] * 5))
+
+    def test_rejected_values_are_not_stored(self):
+        cache = ResultCache()
+        results = [[], ['phone']]
+        compute = lambda: results.pop(0)
+        # A failed search comes back empty; the next call searches again
+        self.assertEqual(cache.get_or_compute('phone', compute, cache_if=len), [])
+        self.assertIsNone(cache.age('phone'))
+        self.assertEqual(cache.get_or_compute('phone', compute, cache_if=len), ['phone'])
+        self.assertEqual(cache.get_or_compute('phone', compute, cache_if=len), ['phone'])
+
+    def test_equivalent_queries_share_an_entry(self):
+        # The web app keys results by the normalized query
+        cache = ResultCache()
+        cache.set(ScraperManager.normalize_query('iPhone 15'), 'results')
+        self.assertEqual(cache.get(ScraperManager.normalize_query('  iphone   15 ')), 'results')
+
+if __name__ == '__main__':
+    unittest.main()
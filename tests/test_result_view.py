@@ -0,0 +1,56 @@
+import sys
+import os
+import unittest
+
+import pandas as pd
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.result_view import ResultView
+
+def results():
+    return pd.DataFrame({
+        'name': ['Redmi Note 13', 'iPhone 15', 'Galaxy A15', 'Redmi 13C', None],
+        'price': [28999.0, 150000.0, 24999.0, 17999.0, 5000.0],
+        'site': ['Daraz', 'Daraz', 'Other', 'Other', 'Daraz'],
+        'url': [f'https://example.com/{i}' for i in range(5)],
+    }, index=[10, 11, 12, 13, 14])
+
+class TestResultView(unittest.TestCase):
+    def setUp(self):
+        self.view = ResultView(results())
+
+    def names(self, positions):
+        return list(self.view.df['name'].iloc[positions])
+
+    def test_sorts_and_stats(self):
+        self.assertEqual(list(self.view.df['price'].iloc[self.view.select()]),
+                         [5000.0, 17999.0, 24999.0, 28999.0, 150000.0])
+        self.assertEqual(self.names(self.view.select("Price (High to Low)"))[0], 'iPhone 15')
+        # Listings without a name sort first
+        self.assertEqual(self.names(self.view.select("Name (A-Z)"))[1:],
+                         ['Galaxy A15', 'iPhone 15', 'Redmi 13C', 'Redmi Note 13'])
+        self.assertEqual(self.view.sites, ['Daraz', 'Other'])
+        self.assertEqual((self.view.stats['count'], self.view.stats['min_price']), (5, 5000.0))
+
+    def test_filters(self):
+        positions = self.view.select(min_price=18000, max_price=100000, sites=['Daraz', 'Other'])
+        self.assertEqual(self.names(positions), ['Galaxy A15', 'Redmi Note 13'])
+        self.assertEqual(self.names(self.view.select(sites=['Other'], text=' REDMI ')), ['Redmi 13C'])
+        self.assertEqual(len(self.view.select(text='pixel')), 0)
+
+    def test_pages(self):
+        positions = self.view.select()
+        self.assertEqual(ResultView.page_count(positions, 2), 3)
+        self.assertEqual(ResultView.page_count(positions[:0], 2), 1)
+        self.assertEqual(list(self.view.page(positions, 3, 2)['price']), [150000.0])
+        self.assertTrue(self.view.page(positions, 4, 2).empty)
+
+    def test_empty_results(self):
+        view = ResultView(pd.DataFrame())
+        self.assertEqual((len(view), view.sites, view.stats['max_price']), (0, [], 0.0))
+        self.assertEqual(len(view.select(text='phone')), 0)
+
+if __name__ == '__main__':
+    unittest.main()
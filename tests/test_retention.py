@@ -0,0 +1,118 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database.init_db import init_db, get_session
+from database.aggregates import update_aggregates
+from database.models import Product, PriceRollup, PriceOutlier
+from database.parquet_archive import ParquetArchive
+from database.retention import RetentionJob
+from database.rollups import update_rollups, get_price_history
+
+NOW = datetime(2025, 6, 1)
+
+def observation(item, price, scraped_at):
+    return Product(name=f'Phone {item}', price=price, site='Daraz', scraped_at=scraped_at,
+                   url=f'https://www.daraz.com.np/products/phone-i{item}.html')
+
+class TestRetentionJob(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = init_db(f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}")
+        self.archive = ParquetArchive(os.path.join(self.tmpdir, 'archive'))
+        self.job = RetentionJob(self.engine, self.archive, pause=0, batch_size=50)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def prices(self, item):
+        session = get_session(self.engine)
+        try:
+            return [row.price for row in session.query(Product).filter(
+                Product.url.like(f'%-i{item}.html')).order_by(Product.id)]
+        finally:
+            session.close()
+
+    def test_old_rows_compacted_to_change_points(self):
+        session = get_session(self.engine)
+        # Daily scrapes over 60 days; item 1's price changes twice
+        for day in range(60):
+            stamp = NOW - timedelta(days=60 - day)
+            session.add(observation(1, 1000 if day < 10 or day >= 20 else 900, stamp))
+            session.add(observation(2, 500, stamp))
+        session.commit()
+        session.close()
+
+        report = self.job.run(NOW)
+        self.assertEqual(report['archived'], 120)
+        self.assertEqual(self.archive.read().num_rows, 120)
+        # Change-points of the 30 old days, then every recent observation
+        self.assertEqual(self.prices(1), [1000, 900, 1000] + [1000] * 30)
+        self.assertEqual(self.prices(2), [500] * 31)
+        self.assertEqual(report['compacted'], 120 - 33 - 31)
+        self.assertTrue(report['analyzed'])
+
+        # Nothing left to do on a second run
+        report = self.job.run(NOW)
+        self.assertEqual((report['archived'], report['compacted'], report['pages_freed']), (0, 0, 0))
+
+    def test_unarchived_rows_are_kept(self):
+        session = get_session(self.engine)
+        for day in range(5):
+            session.add(observation(1, 1000, NOW - timedelta(days=90 - day)))
+        session.commit()
+        session.close()
+        self.assertEqual(self.job.compact_products(NOW, archived_through=0), 0)
+        self.assertEqual(len(self.prices(1)), 5)
+
+    def test_hourly_buckets_and_outliers_pruned(self):
+        session = get_session(self.engine)
+        products = [{'name': 'Phone', 'price': 1000, 'site': 'Daraz',
+                     'url': 'https://www.daraz.com.np/products/phone-i1.html'}]
+        update_aggregates(session, products)
+        for day in (45, 44, 2):
+            update_rollups(session, products, NOW - timedelta(days=day))
+        session.add(PriceOutlier(listing_key='daraz:i1', price=1, reason='invalid', action='quarantined',
+                                 detected_at=NOW - timedelta(days=100)))
+        session.commit()
+
+        report = self.job.run(NOW)
+        self.assertEqual((report['hourly_pruned'], report['outliers_pruned']), (2, 1))
+        self.assertEqual(session.query(PriceRollup).filter_by(resolution='day').count(), 3)
+
+        # A short range in the compacted past is served from daily buckets
+        history = get_price_history(session, 'daraz:i1', start=NOW - timedelta(days=46),
+                                    end=NOW - timedelta(days=43))
+        self.assertEqual(history['resolution'], 'day')
+        self.assertEqual(len(history['points']), 2)
+        recent = get_price_history(session, 'daraz:i1', start=NOW - timedelta(days=3), end=NOW)
+        self.assertEqual(recent['resolution'], 'hour')
+        session.close()
+
+    def test_free_pages_returned(self):
+        session = get_session(self.engine)
+        for i in range(2000):
+            session.add(observation(i % 10, 1000, NOW - timedelta(days=60, minutes=-i)))
+        session.commit()
+        session.close()
+        with self.engine.connect() as connection:
+            size = (connection.exec_driver_sql('PRAGMA page_count').scalar() *
+                    connection.exec_driver_sql('PRAGMA page_size').scalar())
+
+        report = self.job.run(NOW)
+        self.assertNotIn('converted', report)
+        self.assertGreater(report['pages_freed'], 0)
+        self.assertLess(report['size_bytes'], size)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('PRAGMA freelist_count').scalar(), 0)
+            self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+
+if __name__ == '__main__':
+    unittest.main()
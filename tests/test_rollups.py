@@ -0,0 +1,69 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database.init_db import init_db, get_session
+from database.aggregates import update_aggregates
+from database.rollups import bucket_start, pick_resolution, update_rollups, get_price_history
+
+URL = 'https://www.daraz.com.np/products/phone-i42.html'
+
+def observe(price):
+    return {'name': 'Phone', 'price': price, 'site': 'Daraz', 'url': URL}
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = init_db(f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}")
+        self.session = get_session(self.engine)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def ingest(self, prices, now):
+        products = [observe(price) for price in prices]
+        update_aggregates(self.session, products)
+        update_rollups(self.session, products, now)
+        self.session.commit()
+
+    def test_bucket_start(self):
+        stamp = datetime(2025, 3, 13, 17, 42, 5)  # A Thursday
+        self.assertEqual(bucket_start(stamp, 'hour'), datetime(2025, 3, 13, 17))
+        self.assertEqual(bucket_start(stamp, 'day'), datetime(2025, 3, 13))
+        self.assertEqual(bucket_start(stamp, 'week'), datetime(2025, 3, 10))
+
+    def test_pick_resolution(self):
+        end = datetime(2025, 3, 13)
+        self.assertEqual(pick_resolution(end - timedelta(days=7), end), 'hour')
+        self.assertEqual(pick_resolution(end - timedelta(days=30), end), 'day')
+        self.assertEqual(pick_resolution(end - timedelta(days=365), end), 'week')
+        self.assertEqual(pick_resolution(end - timedelta(days=30), end, max_points=1000), 'hour')
+
+    def test_ohlc_maintained_at_ingest(self):
+        start = datetime(2025, 3, 13, 10, 5)
+        self.ingest([1000, 900], start)
+        self.ingest([1100], start + timedelta(minutes=30))
+        self.ingest([950], start + timedelta(hours=2))
+
+        history = get_price_history(self.session, 'daraz:i42', start=start,
+                                    end=start + timedelta(hours=3))
+        self.assertEqual(history['resolution'], 'hour')
+        self.assertEqual([(p['open'], p['high'], p['low'], p['close'], p['observations'])
+                          for p in history['points']],
+                         [(1000, 1100, 900, 1100, 3), (950, 950, 950, 950, 1)])
+
+        daily = get_price_history(self.session, 'daraz:i42', start=start, end=start + timedelta(hours=3),
+                                  resolution='day')
+        self.assertEqual([(p['open'], p['low'], p['close']) for p in daily['points']], [(1000, 900, 950)])
+        self.assertIsNone(get_price_history(self.session, 'daraz:i0'))
+
+if __name__ == '__main__':
+    unittest.main()
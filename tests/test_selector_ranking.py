@@ -0,0 +1,56 @@
+import sys
+import os
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scrappers.selector_ranking import SelectorRanking
+from scrappers.daraz_scraper import DarazScraper
+
+class TestSelectorRanking(unittest.TestCase):
+    def test_winner_moves_first(self):
+        ranking = SelectorRanking(['.a', '.b', '.c'], probe_every=1000)
+        for _ in range(5):
+            order, _ = ranking.start()
+            for selector in order:
+                hit = selector == '.c'
+                ranking.record(selector, hit)
+                if hit:
+                    break
+        order, probe = ranking.start()
+        self.assertEqual(order[0], '.c')
+        self.assertFalse(probe)
+
+    def test_drift_triggers_reprobe(self):
+        ranking = SelectorRanking(['.a', '.b'], window=10, probe_every=1000)
+        ranking.start()
+        for _ in range(100):
+            ranking.record('.a', True)
+        self.assertEqual(ranking.stats()['.a'], (100, 100))
+        # The leader stops matching: history is dropped and the next use probes
+        for _ in range(6):
+            ranking.record('.a', False)
+        self.assertEqual(ranking.stats()['.a'], (0, 0))
+        self.assertTrue(ranking.start()[1])
+
+class FreshDarazScraper(DarazScraper):
+    """Rankings are kept per class; a subclass starts without history"""
+
+class TestRankedParsing(unittest.TestCase):
+    def test_containers_deduped_by_node(self):
+        # Both container selectors match the same nodes
+        cards = ''.join(
+            f'<div class="sku-item product-item"><div class="name">Laptop model {i}</div>'
+            f'<a href="/products/laptop-i{i}.html">x</a><span class="price">Rs. {50000 + i:,}</span></div>'
+            for i in range(3)
+        )
+        scraper = FreshDarazScraper()
+        products = scraper.parse_search_results(f'<html><body>{cards}</body></html>')
+        self.assertEqual([p.name for p in products], ['Laptop model 0', 'Laptop model 1', 'Laptop model 2'])
+        self.assertEqual(products[0].url, 'https://www.daraz.com.np/products/laptop-i0.html')
+        order, _ = FreshDarazScraper.selector_ranking('name').start()
+        self.assertEqual(order[0], '.name')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from loadtest.marketplace import CHALLENGE_PAGE, StandInMarketplace
+from scrappers.daraz_scraper import DarazScraper
+from scrappers.session_pool import SessionPool, identity_headers, is_challenge
+
+CHROME = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+          '(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_identity_headers_match_user_agent(self):
+        headers = identity_headers(CHROME, 'en-GB,en;q=0.9')
+        self.assertEqual(headers['User-Agent'], CHROME)
+        self.assertIn('"Google Chrome";v="131"', headers['sec-ch-ua'])
+        self.assertEqual(headers['sec-ch-ua-platform'], '"macOS"')
+        firefox = identity_headers('Mozilla/5.0 (X11; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0',
+                                   'en-US,en;q=0.9')
+        self.assertNotIn('sec-ch-ua', firefox)
+
+    def test_identities_persist_with_cookies(self):
+        pool = SessionPool('Daraz', self.tmpdir)
+        identity = pool.acquire()
+        cookies = [{'name': 'x5sec', 'value': 'abc', 'domain': 'www.daraz.com.np', 'path': '/',
+                    'expires': None, 'secure': False}]
+        self.assertTrue(pool.record(identity, False, cookies))
+        pool.release(identity)
+
+        reloaded = SessionPool('Daraz', self.tmpdir)
+        again = reloaded.acquire()
+        self.assertEqual((again.id, again.user_agent, again.cookies), (identity.id, identity.user_agent, cookies))
+        self.assertEqual(again.headers, identity.headers)
+        self.assertEqual(reloaded.stats()[0]['attempts'], 1)
+
+    def test_fetch_counts_saved_on_release(self):
+        pool = SessionPool('Daraz', self.tmpdir)
+        identity = pool.acquire()
+        path = os.path.join(pool.directory, f'{identity.id}.json')
+        with mock.patch('scrappers.session_pool.os.replace', wraps=os.replace) as replace:
+            for _ in range(50):
+                pool.record(identity, False)
+            self.assertEqual(replace.call_count, 0)
+            # New cookies are written straight away
+            pool.record(identity, False, [{'name': 'x5sec', 'value': 'abc'}])
+            self.assertEqual(replace.call_count, 1)
+        pool.release(identity)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['attempts'], 51)
+
+    def test_fetch_counts_flushed_periodically(self):
+        pool = SessionPool('Daraz', self.tmpdir, save_interval=30)
+        identity = pool.acquire()
+        path = os.path.join(pool.directory, f'{identity.id}.json')
+        now = time.monotonic()
+        with mock.patch('scrappers.session_pool.time.monotonic', return_value=now + 29):
+            pool.record(identity, False)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['attempts'], 0)
+        with mock.patch('scrappers.session_pool.time.monotonic', return_value=now + 31):
+            pool.record(identity, False)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['attempts'], 2)
+
+    def test_leasing_and_retirement(self):
+        pool = SessionPool('Daraz', self.tmpdir, size=2, max_blocks=2, min_attempts=4, min_success_rate=0.5)
+        first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+        # Both identities are busy and the pool is full, so the third lease shares one
+        self.assertNotEqual(first.id, second.id)
+        self.assertIn(third.id, (first.id, second.id))
+        self.assertNotIn(pool.acquire(exclusive=True).id, (first.id, second.id))
+
+        self.assertTrue(pool.record(first, True))
+        self.assertFalse(pool.record(first, True))
+        self.assertFalse(os.path.exists(os.path.join(pool.directory, f'{first.id}.json')))
+        self.assertNotIn(first.id, [stats['id'] for stats in pool.stats()])
+
+        # A poor success rate over enough attempts retires too
+        for blocked in (False, True, False, True):
+            alive = pool.record(second, blocked)
+        self.assertTrue(alive)
+        self.assertFalse(pool.record(second, True))
+        self.assertEqual(pool.retired, 2)
+
+    def test_leased_profile_kept_until_release(self):
+        pool = SessionPool('Daraz', self.tmpdir, max_blocks=1)
+        identity = pool.acquire(exclusive=True)
+        # Chrome has the profile open
+        os.makedirs(identity.profile_dir)
+        self.assertFalse(pool.record(identity, True))
+        self.assertTrue(os.path.isdir(identity.profile_dir))
+        pool.release(identity)
+        self.assertFalse(os.path.exists(identity.profile_dir))
+
+        idle = pool.acquire()
+        os.makedirs(idle.profile_dir)
+        pool.release(idle)
+        pool.retire(idle)
+        self.assertFalse(os.path.exists(idle.profile_dir))
+
+    def test_blocked_identity_rotated_out(self):
+        pool = SessionPool('Daraz', self.tmpdir)
+        blocked = pool.acquire()
+        pool.record(blocked, True)
+        pool.release(blocked)
+        self.assertNotEqual(pool.acquire().id, blocked.id)
+
+    def test_is_challenge(self):
+        self.assertTrue(is_challenge(CHALLENGE_PAGE.encode()))
+        self.assertTrue(is_challenge('', 429))
+        self.assertFalse(is_challenge('<html><body>Samsung Galaxy</body></html>'))
+        self.assertFalse(is_challenge(None, 200))
+
+class TestScraperSessions(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.marketplace = StandInMarketplace(catalog_size=50, latency=0, challenge_rate=0.5, seed=3).start()
+
+    def tearDown(self):
+        self.marketplace.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def scraper(self):
+        scraper = DarazScraper(base_url=self.marketplace.base_url, use_selenium=False, delay_range=(0, 0))
+        scraper.session_pool = SessionPool('Daraz', self.tmpdir)
+        return scraper
+
+    def test_cookies_survive_restarts(self):
+        url = self.marketplace.base_url + '/catalog/?q=laptop'
+        scraper = self.scraper()
+        for _ in range(5):
+            # Challenged fetches are retried as another identity
+            html = scraper.get_page_html(url)
+            if html is not None:
+                break
+        self.assertFalse(is_challenge(html))
+        scraper.close()
+
+        # A new process picks the cleared identity up again and isn't challenged
+        challenges = self.marketplace.stats['challenges']
+        scraper = self.scraper()
+        for _ in range(5):
+            self.assertIsNotNone(scraper.get_page_html(url))
+        self.assertEqual(self.marketplace.stats['challenges'], challenges)
+        self.assertTrue(any(identity['cookies'] for identity in scraper.session_pool.stats()))
+        scraper.close()
+
+if __name__ == '__main__':
+    unittest.main()
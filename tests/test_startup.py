@@ -0,0 +1,100 @@
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from scrappers.daraz_scraper import DarazScraper
+
+# Modules that make a cold start slow; only commands that scrape or query need them
+HEAVY_MODULES = ['bs4', 'fake_useragent', 'numpy', 'pandas', 'playwright', 'pyarrow',
+                 'requests', 'selenium', 'sqlalchemy']
+
+# Parts of the scraping stack that commands reading the database don't need
+SCRAPING_MODULES = ['scrappers.enrichment', 'scrappers.daraz_scraper', 'database.rollups',
+                    'utils.autocomplete']
+
+def loaded_after(code, modules=HEAVY_MODULES, env=None):
+    """Run ``code`` in a fresh interpreter and return which of ``modules`` it imported"""
+    script = textwrap.dedent(code) + textwrap.dedent(f'''
+        import json, sys
+        print(json.dumps([name for name in {list(modules)!r} if name in sys.modules]))
+    ''')
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True,
+                            text=True, timeout=60, env=env)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return json.loads(result.stdout.splitlines()[-1])
+
+class TestLazyImports(unittest.TestCase):
+    def test_cli_help_imports_nothing_heavy(self):
+        for argv in (['run.py', '--help'], ['run.py', 'search', '--help']):
+            with self.subTest(argv=argv):
+                self.assertEqual(loaded_after(f'''
+                    import sys
+                    sys.argv = {argv!r}
+                    from src.cli import main
+                    try:
+                        main()
+                    except SystemExit:
+                        pass
+                '''), [])
+
+    def test_constructing_scrapers_starts_nothing(self):
+        loaded = loaded_after('''
+            import sys
+            sys.path.insert(0, 'src')
+            from scrappers.scraper_manager import ScraperManager
+            manager = ScraperManager()
+            with manager.get_pool('Daraz').scraper() as scraper:
+                # No database engine, browser or HTTP session until first use
+                assert manager._engine is None
+                assert (scraper._driver, scraper._browser_pool, scraper._session) == (None, None, None)
+        ''')
+        for name in ('fake_useragent', 'pandas', 'playwright', 'requests', 'selenium'):
+            self.assertNotIn(name, loaded)
+
+    def test_watch_list_imports_only_the_database(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'products.db')}")
+            loaded = loaded_after('''
+                import sys
+                sys.argv = ['run.py', 'watch', 'list']
+                from src.cli import main
+                main()
+            ''', HEAVY_MODULES + SCRAPING_MODULES, env)
+        self.assertEqual(loaded, ['sqlalchemy'])
+
+class TestLazyStart(unittest.TestCase):
+    def test_concurrent_first_use_starts_one_browser(self):
+        started = []
+
+        def start_browser(scraper):
+            started.append(scraper)
+            time.sleep(0.05)
+            return mock.Mock()
+
+        scraper = DarazScraper(use_selenium=True, delay_range=(0, 0))
+        drivers = []
+        with mock.patch.object(DarazScraper, '_init_selenium', start_browser):
+            threads = [threading.Thread(target=lambda: drivers.append(scraper.driver)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # Threads that arrived while the browser was starting waited for it
+        self.assertEqual(len(started), 1)
+        self.assertEqual(drivers, [scraper.driver] * 8)
+
+if __name__ == '__main__':
+    unittest.main()
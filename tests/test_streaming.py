@@ -0,0 +1,169 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fastapi.testclient import TestClient
+
+from api import main
+from api.compression import negotiate_encoding
+from api.serialization import dumps
+from scrappers.product_record import ProductRecord
+from scrappers.scraper_manager import ScraperManager
+
+class FakeScraper:
+    # Searches each instance is running, to catch two requests sharing one
+    active = {}
+    overlapped = False
+
+    def __init__(self, site, prices, delay=0.0, error=None):
+        self.site = site
+        self.prices = prices
+        self.delay = delay
+        self.error = error
+        self.searches = 0
+
+    def search_products(self, query):
+        self.searches += 1
+        FakeScraper.active[id(self)] = FakeScraper.active.get(id(self), 0) + 1
+        FakeScraper.overlapped |= FakeScraper.active[id(self)] > 1
+        try:
+            time.sleep(self.delay)
+        finally:
+            FakeScraper.active[id(self)] -= 1
+        if self.error:
+            raise RuntimeError(self.error)
+        return [ProductRecord(name=f'{query} {i} from {self.site}', price=price, site=self.site,
+                              url=f'https://{self.site.lower()}.example/item-i{i}.html')
+                for i, price in enumerate(self.prices)]
+
+    def close(self):
+        pass
+
+def fake_site(site, prices, delay=0.0, error=None):
+    """Stands in for a scraper class in ScraperManager._scraper_classes"""
+    return lambda **options: FakeScraper(site, prices, delay, error)
+
+def fake_manager(tmpdir, **options):
+    manager = ScraperManager(db_url=f"sqlite:///{os.path.join(tmpdir, 'products.db')}",
+                             alert_sinks=[], change_sinks=[], site_delay=0, persist_sessions=False,
+                             **options)
+    manager._scraper_classes = {
+        'Slow': fake_site('Slow', [500, 300], delay=0.3),
+        'Fast': fake_site('Fast', [900, 100, 700]),
+        'Broken': fake_site('Broken', [], error='blocked'),
+    }
+    return manager
+
+class TestStreamingCompare(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        manager = fake_manager(self.tmpdir)
+        self.original = main.scraper_manager
+        main.scraper_manager = manager
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        main.scraper_manager.engine.dispose()
+        main.scraper_manager = self.original
+        shutil.rmtree(self.tmpdir)
+
+    def test_ndjson_events_per_site(self):
+        response = self.client.get('/products/compare/phone/stream', params={'chunk_size': 2})
+        self.assertEqual(response.headers['content-type'], 'application/x-ndjson')
+        events = [json.loads(line) for line in response.text.splitlines()]
+
+        kinds = [(event['type'], event.get('site')) for event in events]
+        # The fast site is reported before the slow one; the summary comes last
+        self.assertLess(kinds.index(('site_done', 'Fast')), kinds.index(('products', 'Slow')))
+        self.assertIn(('error', 'Broken'), kinds)
+        self.assertEqual(kinds[-1], ('summary', None))
+
+        fast = [event['products'] for event in events
+                if event['type'] == 'products' and event['site'] == 'Fast']
+        self.assertEqual([[p['price'] for p in chunk] for chunk in fast], [[100.0, 700.0], [900.0]])
+        self.assertEqual(events[-1]['summary']['total_products'], 5)
+
+    def test_server_sent_events(self):
+        response = self.client.get('/products/compare/phone/stream',
+                                   headers={'Accept': 'text/event-stream'})
+        self.assertTrue(response.headers['content-type'].startswith('text/event-stream'))
+        messages = [block for block in response.text.split('\n\n') if block]
+        self.assertTrue(messages[0].startswith('event: '))
+        self.assertTrue(messages[-1].startswith('event: summary\ndata: {'))
+
+    def test_gzip_negotiation(self):
+        response = self.client.get('/products/compare/phone/stream', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['content-encoding'], 'gzip')
+        # httpx decodes the body transparently
+        self.assertEqual(json.loads(response.text.splitlines()[-1])['type'], 'summary')
+
+        response = self.client.get('/products/compare/phone', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('content-encoding', response.headers)
+        self.assertEqual([p['price'] for p in response.json()['products']], [100.0, 300.0, 500.0, 700.0, 900.0])
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0, identity'), None)
+        self.assertEqual(negotiate_encoding(''), None)
+        self.assertEqual(negotiate_encoding('*'), negotiate_encoding('br, gzip'))
+
+    def test_dumps_records(self):
+        record = ProductRecord(name='Phone', price=100, site='Daraz', url='https://x/i1.html')
+        self.assertEqual(json.loads(dumps({'products': [record]}))['products'][0]['price'], 100.0)
+
+class TestConcurrentRequests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.manager = fake_manager(self.tmpdir, detail_workers=3)
+        FakeScraper.active, FakeScraper.overlapped = {}, False
+        self.original = main.scraper_manager
+        main.scraper_manager = self.manager
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        self.manager.engine.dispose()
+        main.scraper_manager = self.original
+        shutil.rmtree(self.tmpdir)
+
+    def searches(self, site):
+        return sum(scraper.searches for scraper in self.manager.get_pool(site)._all)
+
+    def get_concurrently(self, paths):
+        threads = [threading.Thread(target=self.client.get, args=(path,)) for path in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_requests_check_out_their_own_scrapers(self):
+        self.get_concurrently([f'/products/compare/phone {i}' for i in range(8)])
+
+        # No scraper ran two searches at once, and each site's pool stayed bounded
+        self.assertFalse(FakeScraper.overlapped)
+        self.assertEqual(self.searches('Slow'), 8)
+        self.assertEqual(len(self.manager.get_pool('Slow')._all), 3)
+
+    def test_streams_check_out_their_own_scrapers(self):
+        self.get_concurrently([f'/products/compare/phone {i}/stream' for i in range(6)] +
+                              [f'/products/search/phone {i}' for i in range(2)])
+        self.assertFalse(FakeScraper.overlapped)
+        self.assertEqual(self.searches('Slow'), 8)
+        self.assertEqual(len(self.manager.get_pool('Slow')._all), 3)
+
+    def test_max_age_answers_without_searching(self):
+        self.assertEqual(len(self.client.get('/products/compare/phone').json()['products']), 5)
+        response = self.client.get('/products/compare/phone', params={'max_age': 300}).json()
+        self.assertTrue(response['cached'])
+        self.assertEqual(sorted(product['price'] for product in response['products']), [100.0, 300.0])
+        self.assertEqual(self.searches('Fast'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import os
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bs4 import BeautifulSoup
+from scrappers.structured_data import extract_product_attributes, extract_embedded_state
+
+PRODUCT_PAGE = """
+<html><head>
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@type": "Product", "name": "Redmi Note 13",
+ "image": ["//img.example.com/a.jpg", "//img.example.com/b.jpg"],
+ "brand": {"@type": "Brand", "name": "Xiaomi"},
+ "offers": {"@type": "Offer", "price": "28,999", "availability": "https://schema.org/OutOfStock"},
+ "aggregateRating": {"ratingValue": "4.6", "reviewCount": "120"}}
+</script>
+<script type="application/ld+json">
+{"@type": "BreadcrumbList", "itemListElement": [
+ {"item": {"name": "Mobiles"}}, {"item": {"name": "Smartphones"}}, {"item": {"name": "Redmi Note 13"}}]}
+</script>
+<script>var __moduleData__ = {"data": {"root": {"fields": {"specifications": {"123": {"features": {"RAM": "8GB"}}}}}}}; var other = 1;</script>
+</head><body></body></html>
+"""
+
+class TestStructuredData(unittest.TestCase):
+    def setUp(self):
+        self.soup = BeautifulSoup(PRODUCT_PAGE, 'html.parser')
+    
+    def test_json_ld_attributes(self):
+        attributes = extract_product_attributes(self.soup)
+        self.assertEqual(attributes['name'], 'Redmi Note 13')
+        self.assertEqual(attributes['brand'], 'Xiaomi')
+        self.assertEqual(attributes['price'], 28999.0)
+        self.assertEqual(attributes['category'], 'Smartphones')
+        self.assertEqual(attributes['image_url'], 'https://img.example.com/a.jpg')
+        self.assertEqual(len(attributes['images']), 2)
+        self.assertEqual(attributes['rating'], 4.6)
+        self.assertEqual(attributes['review_count'], 120)
+        self.assertFalse(attributes['in_stock'])
+    
+    def test_embedded_state_specs(self):
+        self.assertIn('data', extract_embedded_state(self.soup))
+        self.assertEqual(extract_product_attributes(self.soup)['specs'], {'RAM': '8GB'})
+    
+    def test_single_image_object(self):
+        page = PRODUCT_PAGE.replace(
+            '"image": ["//img.example.com/a.jpg", "//img.example.com/b.jpg"]',
+            '"image": {"@type": "ImageObject", "url": "//img.example.com/a.jpg", "width": 800}')
+        attributes = extract_product_attributes(BeautifulSoup(page, 'html.parser'))
+        self.assertEqual(attributes['images'], ['https://img.example.com/a.jpg'])
+        self.assertEqual(attributes['image_url'], 'https://img.example.com/a.jpg')
+    
+    def test_empty_page(self):
+        attributes = extract_product_attributes(BeautifulSoup('<html></html>', 'html.parser'))
+        self.assertEqual(attributes['brand'], '')
+        self.assertIsNone(attributes['price'])
+        self.assertIsNone(attributes['in_stock'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+import sys
+import os
+import math
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from alerts.watch_rules import AlertEngine, WatchRuleIndex
+from database.init_db import init_db, get_session
+from database.aggregates import listing_key
+from database.models import WatchRule
+
+def listing(item, price, name=None):
+    return {'name': name or f'Phone {item}', 'price': price, 'site': 'Daraz',
+            'url': f'https://www.daraz.com.np/products/phone-i{item}.html'}
+
+def listing_rule_key(item):
+    return f'listing:{listing_key(listing(item, 0))}'
+
+class CountingPrice(float):
+    """A price that counts how often it is compared against a threshold"""
+    comparisons = 0
+
+    def __lt__(self, other):
+        CountingPrice.comparisons += 1
+        return float(self) < other
+
+    def __gt__(self, other):
+        CountingPrice.comparisons += 1
+        return float(self) > other
+
+class ListSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, alert):
+        self.sent.append(alert)
+
+class BrokenSink:
+    def send(self, alert):
+        raise ConnectionError('webhook down')
+
+class TestWatchRuleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = WatchRuleIndex()
+        self.index.build([
+            (1, 'query:iphone 15', 150000.0),
+            (2, 'query:iphone 15', 120000.0),
+            (3, listing_rule_key(555), 5000.0),
+        ])
+
+    def test_keys_match_listing_key(self):
+        self.assertEqual(listing_rule_key(555), 'listing:daraz:i555')
+
+    def test_match_thresholds(self):
+        self.assertEqual(sorted(self.index.match('query:iphone 15', 149000.0)), [1])
+        self.assertEqual(sorted(self.index.match('query:iphone 15', 100000.0)), [1, 2])
+        self.assertEqual(self.index.match('query:iphone 15', 160000.0), [])
+        self.assertEqual(self.index.match('query:laptop', 1.0), [])
+
+    def test_threshold_is_inclusive(self):
+        self.assertEqual(self.index.match(listing_rule_key(555), 5000.0), [3])
+
+    def test_add_and_remove(self):
+        self.index.add(4, 'query:iphone 15', 130000.0)
+        self.assertEqual(sorted(self.index.match('query:iphone 15', 125000.0)), [1, 4])
+        self.index.remove(1)
+        self.assertEqual(self.index.match('query:iphone 15', 125000.0), [4])
+        self.assertEqual(len(self.index), 3)
+
+    def test_large_rule_set(self):
+        rng = random.Random(0)
+        rules = [(i, listing_rule_key(i % 20000), rng.uniform(100, 100000)) for i in range(100000)]
+        self.index.build(rules)
+
+        # A match is a bisect over its own key's thresholds: about log2(5)
+        # comparisons here, however many rules other keys hold
+        CountingPrice.comparisons = 0
+        for _ in range(500):
+            self.index.match(listing_rule_key(rng.randrange(20000)), CountingPrice(rng.uniform(100, 100000)))
+        self.assertLessEqual(CountingPrice.comparisons, 500 * math.ceil(math.log2(5 + 1)))
+
+        CountingPrice.comparisons = 0
+        self.assertEqual(self.index.match(listing_rule_key(20001), CountingPrice(1.0)), [])
+        self.assertEqual(CountingPrice.comparisons, 0)
+
+class TestAlertEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = init_db(f"sqlite:///{os.path.join(self.tmpdir, 'products.db')}")
+        self.sink = ListSink()
+        self.alerts = AlertEngine(self.engine, sinks=[self.sink])
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def prices(self, alerts):
+        return sorted((alert['rule_id'], alert['price']) for alert in alerts)
+
+    def test_rule_needs_query_or_url(self):
+        with self.assertRaises(ValueError):
+            self.alerts.add_rule(1000)
+        with self.assertRaises(ValueError):
+            self.alerts.add_rule(1000, query='phone', url=listing(1, 0)['url'])
+
+    def test_listing_and_query_rules(self):
+        # URL rules are keyed like the listings, so tracking parameters don't matter
+        on_listing = self.alerts.add_rule(900, url=listing(1, 0)['url'] + '?spm=a2a0e.search')
+        on_query = self.alerts.add_rule(600, query='  Phone ', label='Cheap phones')
+        self.assertEqual([rule.listing_key for rule in self.alerts.list_rules()], ['daraz:i1', None])
+
+        alerts = self.alerts.evaluate([listing(1, 850), listing(2, 500), listing(3, 550)], query='phone')
+        self.assertEqual(self.prices(alerts), [(on_listing, 850), (on_query, 500)])
+        by_rule = {alert['rule_id']: alert for alert in alerts}
+        self.assertEqual((by_rule[on_query]['label'], by_rule[on_query]['name']), ('Cheap phones', 'Phone 2'))
+        self.assertEqual(self.sink.sent, alerts)
+
+        # Query rules only fire for a batch from that query
+        self.assertEqual(self.alerts.evaluate([listing(2, 400)], query='laptop'), [])
+        self.assertEqual(self.alerts.evaluate([listing(1, 950)]), [])
+
+    def test_notifies_only_on_a_lower_price(self):
+        rule_id = self.alerts.add_rule(1000, url=listing(1, 0)['url'])
+        self.assertEqual(self.prices(self.alerts.evaluate([listing(1, 900)])), [(rule_id, 900)])
+        self.assertEqual(self.alerts.evaluate([listing(1, 900)]), [])
+        self.assertEqual(self.alerts.evaluate([listing(1, 950)]), [])
+        # The lowest price of a batch is the one reported
+        self.assertEqual(self.prices(self.alerts.evaluate([listing(1, 850), listing(1, 800)])), [(rule_id, 800)])
+
+        # The last notified price is stored, so a restart doesn't notify again
+        session = get_session(self.engine)
+        self.assertEqual(session.query(WatchRule).filter_by(id=rule_id).one().last_notified_price, 800)
+        session.close()
+        restarted = AlertEngine(self.engine, sinks=[self.sink])
+        self.assertEqual(restarted.evaluate([listing(1, 800)]), [])
+        self.assertEqual(len(self.sink.sent), 2)
+
+    def test_reloads_rules_when_the_table_changes(self):
+        self.assertEqual(self.alerts.evaluate([listing(1, 500)]), [])
+        # Added through another engine instance, as the CLI or API would
+        first = AlertEngine(self.engine).add_rule(1000, url=listing(1, 0)['url'])
+        self.assertEqual(self.prices(self.alerts.evaluate([listing(1, 500)])), [(first, 500)])
+
+        second = AlertEngine(self.engine).add_rule(1000, url=listing(2, 0)['url'])
+        self.assertTrue(AlertEngine(self.engine).remove_rule(first))
+        self.assertEqual(self.prices(self.alerts.evaluate([listing(1, 400), listing(2, 400)])), [(second, 400)])
+        self.assertEqual(len(self.alerts.index), 1)
+        self.assertFalse(self.alerts.remove_rule(first))
+
+    def test_concurrent_batches_notify_once(self):
+        rule_id = self.alerts.add_rule(1000, url=listing(1, 0)['url'])
+        start = threading.Barrier(8)
+        results, matching = [], []
+        overlapped = threading.Event()
+        match = self.alerts.index.match
+
+        def slow_match(key, price):
+            # Batches must not match (or reload the rules) while another one does
+            matching.append(key)
+            if len(matching) > 1:
+                overlapped.set()
+            time.sleep(0.01)
+            matching.pop()
+            return match(key, price)
+
+        def ingest():
+            start.wait()
+            results.extend(self.alerts.evaluate([listing(1, 900)]))
+
+        self.alerts.index.match = slow_match
+        threads = [threading.Thread(target=ingest) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(overlapped.is_set())
+        self.assertEqual(self.prices(results), [(rule_id, 900)])
+        self.assertEqual(len(self.sink.sent), 1)
+
+    def test_failing_sink_does_not_block_others(self):
+        self.alerts.sinks = [BrokenSink(), self.sink]
+        self.alerts.add_rule(1000, url=listing(1, 0)['url'])
+        self.alerts.add_rule(1000, url=listing(2, 0)['url'])
+        alerts = self.alerts.evaluate([listing(1, 900), listing(2, 900)])
+        self.assertEqual(len(alerts), 2)
+        self.assertEqual(self.sink.sent, alerts)
+
+if __name__ == '__main__':
+    unittest.main()